@@ -0,0 +1,118 @@
+import os
+import hashlib
+import json
+import sqlite3
+import threading
+
+STATE_DIR = os.getenv("SCRAPER_STATE_DIR", ".scraper_state")
+ANALYSIS_CACHE_PATH = os.getenv("ANALYSIS_CACHE_PATH", os.path.join(STATE_DIR, "analysis_cache.db"))
+# Least recently used entries are evicted above this many entries
+ANALYSIS_CACHE_MAX_ENTRIES = int(os.getenv("ANALYSIS_CACHE_MAX_ENTRIES", "200000"))
+
+ANALYSIS_CACHE_SCHEMA = """
+CREATE TABLE IF NOT EXISTS analysis (
+    key TEXT PRIMARY KEY,
+    value TEXT,
+    last_used INTEGER
+);
+CREATE INDEX IF NOT EXISTS analysis_last_used ON analysis (last_used);
+"""
+
+def cache_key(kind, version, text):
+    """
+    Content address of an analysis result: the analysis kind and version, and the text as analyzed.
+    Only surrounding whitespace is stripped: lower-casing or collapsing spaces changes the results
+    (":D" is a positive emoticon, ":d" is not).
+    """
+    return hashlib.sha256(f"{kind}\x1f{version}\x1f{text.strip()}".encode("utf-8")).hexdigest()
+
+class AnalysisCache:
+    """
+    On-disk LRU cache of NLP results (sentiment scores), in a SQLite file, shared by the scraper threads.
+
+    Entries are keyed by cache_key(kind, version, text), so bumping the version of an analysis
+    leaves its old entries unused until they are evicted. Values are stored as JSON.
+    """
+
+    def __init__(self, path=ANALYSIS_CACHE_PATH, max_entries=ANALYSIS_CACHE_MAX_ENTRIES):
+        if path != ":memory:":
+            os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self.max_entries = max_entries
+        self.connection = sqlite3.connect(path, check_same_thread=False)
+        self.lock = threading.Lock()
+        self.stats = {"hits": 0, "misses": 0, "evicted": 0}
+
+        with self.lock, self.connection:
+            self.connection.executescript(ANALYSIS_CACHE_SCHEMA)
+            self.connection.execute("PRAGMA journal_mode=WAL")
+            self.connection.execute("PRAGMA synchronous=NORMAL")
+            self.count, self.clock = self.connection.execute("SELECT COUNT(*), COALESCE(MAX(last_used), 0) FROM analysis").fetchone()
+
+    def get_many(self, kind, version, texts):
+        """
+        Look texts up, returns a dict index -> cached value for the texts found.
+        """
+        keys = [cache_key(kind, version, text) for text in texts]
+        found = {}
+        with self.lock, self.connection:
+            for start in range(0, len(keys), 500):
+                chunk = keys[start:start + 500]
+                rows = self.connection.execute(
+                    f"SELECT key, value FROM analysis WHERE key IN ({', '.join('?' for _ in chunk)})", chunk
+                ).fetchall()
+                found.update(rows)
+
+            # Mark the hits as recently used
+            self.clock += 1
+            self.connection.executemany("UPDATE analysis SET last_used = ? WHERE key = ?", [(self.clock, key) for key in found])
+
+            self.stats["hits"] += sum(1 for key in keys if key in found)
+            self.stats["misses"] += sum(1 for key in keys if key not in found)
+
+        return {i: json.loads(found[key]) for i, key in enumerate(keys) if key in found}
+
+    def put_many(self, kind, version, texts, values):
+        """
+        Store the values computed for texts, evicting the least recently used entries above max_entries.
+        """
+        rows = [(cache_key(kind, version, text), json.dumps(value)) for text, value in zip(texts, values)]
+        if not rows:
+            return
+
+        with self.lock, self.connection:
+            self.clock += 1
+            before = self.connection.total_changes
+            self.connection.executemany(
+                "INSERT OR IGNORE INTO analysis (key, value, last_used) VALUES (?, ?, ?)", [(key, value, self.clock) for key, value in rows]
+            )
+            self.count += self.connection.total_changes - before
+
+            if self.count > self.max_entries:
+                excess = self.count - self.max_entries
+                self.connection.execute(
+                    "DELETE FROM analysis WHERE key IN (SELECT key FROM analysis ORDER BY last_used LIMIT ?)", (excess,)
+                )
+                self.count -= excess
+                self.stats["evicted"] += excess
+
+    def get_or_compute(self, kind, version, text, compute):
+        """
+        Get the cached value for one text, or compute and store it.
+        """
+        cached = self.get_many(kind, version, [text])
+        if cached:
+            return cached[0]
+
+        value = compute(text)
+        self.put_many(kind, version, [text], [value])
+        return value
+
+    def print_stats(self):
+        stats = self.stats
+        total = stats["hits"] + stats["misses"]
+        print(f"Analysis cache: {stats['hits']}/{total} hits ({100 * stats['hits'] / total if total else 0:.0f}%), "
+              f"{self.count} entries, {stats['evicted']} evicted")
+
+    def close(self):
+        with self.lock:
+            self.connection.close()
@@ -0,0 +1,283 @@
+import os
+import json
+import time
+import random
+import threading
+from concurrent.futures import ThreadPoolExecutor
+import httpx
+import requests
+from postgrest.exceptions import APIError
+
+# Batches that still fail after all retries are appended here, one JSON line per batch, so they can be replayed later
+STATE_DIR = os.getenv("SCRAPER_STATE_DIR", ".scraper_state")
+FAILED_BATCHES_DIR = os.path.join(STATE_DIR, "failed_batches")
+
+class BulkWriteError(Exception):
+    """
+    Raised when batches could not be written after all retries (the rows are kept in the failed batches file).
+    """
+
+# PostgREST error codes of transient failures (PGRSTxxx: database unreachable, schema cache reloading,
+# connection pool timeout) and SQLSTATEs worth retrying (serialization failure, deadlock, statement timeout, too many connections)
+TRANSIENT_ERROR_CODES = {"PGRST000", "PGRST001", "PGRST002", "PGRST003", "40001", "40P01", "57014", "53300"}
+
+def get_status_code(error):
+    """
+    Get the HTTP status code carried by a write error, if any (httpx/requests errors carry it on the response).
+    The code of a postgrest APIError is a SQLSTATE or PGRST code, not a status, except when the error body
+    was not JSON: postgrest then puts the response's integer status code there.
+    """
+    for obj in (error, getattr(error, "response", None)):
+        status_code = getattr(obj, "status_code", None)
+        if isinstance(status_code, int):
+            return status_code
+
+    if isinstance(error, APIError) and isinstance(error.code, int):
+        return error.code
+
+    return None
+
+def is_retryable_error(error):
+    """
+    Check if a failed write is worth retrying: rate limiting (429), server errors (5xx), network errors,
+    and postgrest errors with a transient code (or no code at all, as answered by the API gateway).
+    Other postgrest errors (constraint violations, permission denied, bad columns) fail the same way on every retry.
+    """
+    status_code = get_status_code(error)
+    if status_code is not None:
+        return status_code == 429 or status_code >= 500
+
+    if isinstance(error, APIError):
+        return error.code is None or error.code in TRANSIENT_ERROR_CODES
+
+    return isinstance(error, (
+        httpx.TransportError,
+        requests.exceptions.ConnectionError,
+        requests.exceptions.Timeout,
+        ConnectionError,
+        TimeoutError,
+    ))
+
+def get_retry_after(error):
+    """
+    Get the delay requested by the server through a Retry-After header, in seconds.
+    """
+    response = getattr(error, "response", None)
+    headers = getattr(response, "headers", None) or {}
+    try:
+        return float(headers.get("Retry-After"))
+    except (TypeError, ValueError):
+        return None
+
+class BulkWriter:
+    """
+    Batched writer shared by the scrapers.
+
+    Rows are buffered and sent in batches through write_batch (a callable taking a list of rows),
+    on a small pool of writer threads. The batch size adapts to the observed latency and payload size:
+    it grows while batches are fast and small, and shrinks when they are slow, too large or failing.
+    Writes that fail with 429/5xx or a network error are retried with exponential backoff.
+    Batches that still fail are appended to a failed batches file and replayed by replay_failed_batches(),
+    so write_batch should be idempotent (e.g. an upsert on the table's key). For plain inserts, unwritten_rows
+    (a callable taking a list of rows and returning those not stored yet) is called before every retry and replay,
+    so a batch that was stored before its write timed out is not inserted twice.
+    """
+
+    def __init__(self, name, write_batch, batch_size=50, min_batch_size=1, max_batch_size=500, target_latency=1.0,
+                 max_payload_bytes=1_000_000, workers=2, max_pending_batches=None, max_retries=5, backoff=0.5,
+                 failed_batches_dir=FAILED_BATCHES_DIR, unwritten_rows=None):
+        self.name = name
+        self.write_batch = write_batch
+        self.unwritten_rows = unwritten_rows
+        self.batch_size = batch_size
+        self.min_batch_size = min_batch_size
+        self.max_batch_size = max_batch_size
+        self.target_latency = target_latency
+        self.max_payload_bytes = max_payload_bytes
+        self.max_retries = max_retries
+        self.backoff = backoff
+        self.failed_batches_path = os.path.join(failed_batches_dir, f"{name}.jsonl")
+
+        self.buffer = []
+        self.lock = threading.Lock()
+        self.executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix=f"{name}-writer")
+        # Limits the number of batches queued or being written, add() blocks when it is reached
+        self.pending_slots = threading.BoundedSemaphore(max_pending_batches or workers * 2)
+        self.pending = set()
+        self.errors = []
+
+        self.stats = {"rows": 0, "batches": 0, "bytes": 0, "retries": 0, "failed_batches": 0, "write_seconds": 0.0}
+        self.started_at = time.perf_counter()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, traceback):
+        self.close(raise_errors=exc_type is None)
+
+    def add(self, row):
+        """
+        Buffer a row, a batch is dispatched to the writer pool once the buffer reaches the current batch size.
+        """
+        with self.lock:
+            self.buffer.append(row)
+            batch = self._take_batch() if len(self.buffer) >= self.batch_size else None
+        if batch:
+            self._dispatch(batch)
+
+    def add_many(self, rows):
+        """
+        Buffer several rows.
+        """
+        for row in rows:
+            self.add(row)
+
+    def write(self, rows):
+        """
+        Write rows synchronously in the calling thread, in batches of the current batch size and with retries.
+        Raises BulkWriteError if a batch could not be written.
+        """
+        rows = list(rows)
+        while rows:
+            batch, rows = rows[:self.batch_size], rows[self.batch_size:]
+            error = self._write_with_retries(batch)
+            if error is not None:
+                raise BulkWriteError(f"{self.name}: failed to write {len(batch)} rows: {error}") from error
+
+    def flush(self):
+        """
+        Dispatch the buffered rows and wait until every pending batch is written.
+        Raises BulkWriteError if batches failed since the last flush.
+        """
+        with self.lock:
+            batch = self._take_batch(all_rows=True)
+        if batch:
+            self._dispatch(batch)
+
+        for future in list(self.pending):
+            future.result()
+
+        with self.lock:
+            errors, self.errors = self.errors, []
+        if errors:
+            raise BulkWriteError(f"{self.name}: {len(errors)} batches failed, saved to {self.failed_batches_path}: {errors[0]}")
+
+    def close(self, raise_errors=True):
+        """
+        Flush the remaining rows, stop the writer pool and print the write statistics.
+        """
+        try:
+            self.flush()
+        except BulkWriteError:
+            if raise_errors:
+                raise
+        finally:
+            self.executor.shutdown(wait=True)
+            self.print_stats()
+
+    def rows_per_second(self):
+        elapsed = time.perf_counter() - self.started_at
+        return self.stats["rows"] / elapsed if elapsed > 0 else 0.0
+
+    def print_stats(self):
+        stats = self.stats
+        print(f"{self.name}: wrote {stats['rows']} rows in {stats['batches']} batches ({self.rows_per_second():.1f} rows/sec), "
+              f"{stats['retries']} retries, {stats['failed_batches']} failed batches, final batch size {self.batch_size}")
+
+    def replay_failed_batches(self):
+        """
+        Re-send the batches saved in the failed batches file by a previous run.
+        Batches that fail again stay in the file. Returns the number of rows replayed.
+        """
+        try:
+            with open(self.failed_batches_path, "r", encoding="utf-8") as f:
+                batches = [json.loads(line) for line in f if line.strip()]
+        except FileNotFoundError:
+            return 0
+
+        os.remove(self.failed_batches_path)
+        replayed = 0
+        for batch in batches:
+            if self._write_with_retries(batch, resend=True) is None:
+                replayed += len(batch)
+
+        print(f"{self.name}: replayed {replayed} rows from {len(batches)} failed batches")
+        return replayed
+
+    def _take_batch(self, all_rows=False):
+        # Must be called with the lock held
+        size = len(self.buffer) if all_rows else self.batch_size
+        batch, self.buffer = self.buffer[:size], self.buffer[size:]
+        return batch
+
+    def _dispatch(self, batch):
+        self.pending_slots.acquire()
+        future = self.executor.submit(self._write_async, batch)
+        with self.lock:
+            self.pending.add(future)
+        future.add_done_callback(self._batch_done)
+
+    def _batch_done(self, future):
+        with self.lock:
+            self.pending.discard(future)
+        self.pending_slots.release()
+
+    def _write_async(self, batch):
+        error = self._write_with_retries(batch)
+        if error is not None:
+            with self.lock:
+                self.errors.append(error)
+
+    def _write_with_retries(self, batch, resend=False):
+        """
+        Write a batch, retrying retryable errors with exponential backoff.
+        resend is True when the batch may already be stored (a replay), like it is for every retry.
+        Returns None on success, or the last error after the batch was saved to the failed batches file.
+        """
+        payload_bytes = len(json.dumps(batch, default=str))
+        for attempt in range(self.max_retries + 1):
+            started = time.perf_counter()
+            try:
+                # A failed attempt may still have been stored (e.g. a timeout after the insert), only resend the missing rows
+                if self.unwritten_rows is not None and (resend or attempt > 0):
+                    batch = self.unwritten_rows(batch)
+                if batch:
+                    self.write_batch(batch)
+            except Exception as e:
+                self._adapt_batch_size(time.perf_counter() - started, payload_bytes, failed=True)
+                if attempt == self.max_retries or not is_retryable_error(e):
+                    self._save_failed_batch(batch)
+                    print(f"{self.name}: giving up on a batch of {len(batch)} rows: {e}")
+                    return e
+
+                with self.lock:
+                    self.stats["retries"] += 1
+                delay = get_retry_after(e) or self.backoff * (2 ** attempt) * (1 + random.random())
+                time.sleep(delay)
+                continue
+
+            latency = time.perf_counter() - started
+            self._adapt_batch_size(latency, payload_bytes)
+            with self.lock:
+                self.stats["rows"] += len(batch)
+                self.stats["batches"] += 1
+                self.stats["bytes"] += payload_bytes
+                self.stats["write_seconds"] += latency
+            return None
+
+    def _adapt_batch_size(self, latency, payload_bytes, failed=False):
+        """
+        Halve the batch size after a failure or a slow/oversized batch, grow it by half while batches are fast and small.
+        """
+        with self.lock:
+            if failed or latency > self.target_latency or payload_bytes > self.max_payload_bytes:
+                self.batch_size = max(self.min_batch_size, self.batch_size // 2)
+            elif latency < self.target_latency / 2 and payload_bytes < self.max_payload_bytes / 2:
+                self.batch_size = min(self.max_batch_size, self.batch_size + max(1, self.batch_size // 2))
+
+    def _save_failed_batch(self, batch):
+        with self.lock:
+            self.stats["failed_batches"] += 1
+            os.makedirs(os.path.dirname(self.failed_batches_path), exist_ok=True)
+            with open(self.failed_batches_path, "a", encoding="utf-8") as f:
+                f.write(json.dumps(batch, default=str) + "\n")
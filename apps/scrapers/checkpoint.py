@@ -0,0 +1,90 @@
+import os
+import json
+import threading
+
+class CheckpointJournal:
+    """
+    Append-only JSON lines journal used to resume a long scraper run.
+
+    Every entry is a dict with a "type" key, flushed and fsynced before append() returns,
+    so an entry that was recorded survives a crash or a SIGKILL of the process.
+    A partially written last line (the process died mid-write) is ignored by load().
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.file = None
+        self.lock = threading.Lock()
+
+    def load(self):
+        """
+        Read the entries recorded by a previous run, in order. Returns an empty list if there is no journal.
+        """
+        entries = []
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                for line in f:
+                    try:
+                        entries.append(json.loads(line))
+                    except json.JSONDecodeError:
+                        # Torn write at the end of the journal
+                        break
+        except FileNotFoundError:
+            pass
+        return entries
+
+    def open(self, reset=False):
+        """
+        Open the journal for appending, or start an empty one if reset is True.
+        """
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        if not reset and os.path.exists(self.path):
+            self._truncate_torn_line()
+        self.file = open(self.path, "w" if reset else "a", encoding="utf-8")
+        self._fsync_directory()
+
+    def append(self, entry_type, **data):
+        """
+        Durably record an entry.
+        """
+        line = json.dumps({"type": entry_type, **data}, default=str) + "\n"
+        with self.lock:
+            self.file.write(line)
+            self.file.flush()
+            os.fsync(self.file.fileno())
+
+    def remove(self):
+        """
+        Close and delete the journal, once the run it describes is complete.
+        """
+        self.close()
+        try:
+            os.remove(self.path)
+        except FileNotFoundError:
+            pass
+
+    def close(self):
+        if self.file:
+            self.file.close()
+            self.file = None
+
+    def _truncate_torn_line(self):
+        # Drop an incomplete last line so the next entry starts on its own line
+        with open(self.path, "rb+") as f:
+            data = f.read()
+            end = data.rfind(b"\n") + 1
+            if end != len(data):
+                f.truncate(end)
+
+    def _fsync_directory(self):
+        # Make the journal file itself (not only its content) survive a crash
+        try:
+            fd = os.open(os.path.dirname(os.path.abspath(self.path)), os.O_RDONLY)
+        except OSError:
+            return
+        try:
+            os.fsync(fd)
+        except OSError:
+            pass
+        finally:
+            os.close(fd)
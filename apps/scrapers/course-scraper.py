@@ -1,426 +1,517 @@
 import os
-from supabase import create_client, Client
+import json
+import time
+import random
+import hashlib
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
 import requests
 from requests import get
+from requests.adapters import HTTPAdapter
 from bs4 import BeautifulSoup
 import pandas as pd
 import numpy as np
+from bulk_writer import BulkWriter, is_retryable_error, get_retry_after
+from storage import create_sink
+
+HEADERS = { "Accept-Language": "en-US,en;q=0.9,en-GB;q=0.8,en-CA;q=0.7" }
+CALENDAR_BASE_URL = os.getenv("CALENDAR_BASE_URL", "https://www.queensu.ca")
+
+# Number of calendar pages fetched at the same time (1 = sequential)
+FETCH_WORKERS = int(os.getenv("COURSE_SCRAPER_WORKERS", "8"))
+# Maximum number of open keep-alive connections to a single host
+MAX_CONNECTIONS_PER_HOST = int(os.getenv("COURSE_SCRAPER_MAX_CONNECTIONS", "4"))
+REQUEST_TIMEOUT = 30
+# Retries of a calendar page that times out or answers 429/5xx, with exponential backoff starting at REQUEST_BACKOFF seconds
+REQUEST_RETRIES = int(os.getenv("COURSE_SCRAPER_RETRIES", "3"))
+REQUEST_BACKOFF = float(os.getenv("COURSE_SCRAPER_BACKOFF", "1"))
+# Maximum number of calendar pages fetched ahead of the parser
+MAX_PAGES_IN_FLIGHT = int(os.getenv("COURSE_SCRAPER_PAGES_IN_FLIGHT", "16"))
+# Number of concurrent batch writers for the course upserts
+WRITE_WORKERS = int(os.getenv("COURSE_SCRAPER_WRITERS", "2"))
+# Compare each batch with the stored rows and only send changed courses ("0" upserts every course without reading)
+COURSE_DIFF = os.getenv("COURSE_DIFF", "1") != "0"
+
+# On-disk cache of the calendar pages (ETag/Last-Modified and the courses extracted from each page), one file per page
+STATE_DIR = os.getenv("SCRAPER_STATE_DIR", ".scraper_state")
+PAGE_CACHE_DIR = os.path.join(STATE_DIR, "calendar_cache")
+USE_PAGE_CACHE = os.getenv("CALENDAR_CACHE", "1") != "0"
+# Bump when the parser changes so cached courses are re-extracted
+PAGE_CACHE_VERSION = 1
+
+# BeautifulSoup tree builder used for the calendar pages: "lxml" (C-based, fast) or "html.parser" (pure Python)
+HTML_PARSER = os.getenv("HTML_PARSER", "lxml")
+
+ART_SCI_INDEX_URL = f"{CALENDAR_BASE_URL}/academic-calendar/arts-science/course-descriptions/"
+ENGINEERING_URL = f"{CALENDAR_BASE_URL}/academic-calendar/engineering-applied-sciences/courses-instruction"
+
+# Faculties in scraping order, with the course pages of each faculty and the fields it does not publish
+FACULTIES = [
+    {
+        "name": "Arts & Science",
+        "urls": None,  # Resolved from the department links on ART_SCI_INDEX_URL
+        "skip_fields": (),
+    },
+    {
+        "name": "Education",
+        "urls": [f"{CALENDAR_BASE_URL}/academic-calendar/education/course-descriptions/"],
+        "skip_fields": (),
+    },
+    {
+        "name": "Health Sciences",
+        "urls": [f"{CALENDAR_BASE_URL}/academic-calendar/health-sciences/bhsc/courses-instruction/"],
+        "skip_fields": (),
+    },
+    {
+        "name": "Nursing",
+        "urls": [f"{CALENDAR_BASE_URL}/academic-calendar/nursing/bachelor-nursing-science-course-descriptions/"],
+        "skip_fields": ("learning_hours",),
+    },
+    {
+        "name": "Engineering",
+        "urls": [
+            f"{ENGINEERING_URL}/{dept}/"
+            for dept in ["apsc", "chee", "civl", "cmpe", "elec", "ench", "enph", "geoe", "mthe", "mech", "mren", "mine", "mntc", "soft"]
+        ],
+        "skip_fields": ("learning_hours",),
+    },
+    {
+        "name": "Commerce",
+        "urls": [f"{CALENDAR_BASE_URL}/academic-calendar/business/bachelor-commerce/courses-of-instruction/by20number/#onezerozeroleveltext"],
+        "skip_fields": ("learning_hours",),
+    },
+]
+
+# Columns of the scraped course data
+COURSE_COLUMNS = [
+    "course_code",
+    "course_name",
+    "course_description",
+    "offering_faculty",
+    "learning_hours",
+    "course_learning_outcomes",
+    "course_requirements",
+    "course_equivalencies",
+    "course_units",
+]
+
+# Fields extracted from each courseblock: css class -> (tag name, column, label prefix removed from the text)
+COURSEBLOCK_FIELDS = {
+    "detail-code": ("span", "course_code", None),
+    "detail-title": ("span", "course_name", None),
+    "detail-hours_html": ("span", "course_units", "Units: "),
+    "courseblockextra": ("div", "course_description", None),
+    "detail-requirements": ("span", "course_requirements", "Requirements: "),
+    "detail-learning_hours": ("span", "learning_hours", "Learning Hours: "),
+    "detail-course_equivalencies": ("span", "course_equivalencies", "Course Equivalencies: "),
+    "detail-offering_faculty": ("span", "offering_faculty", "Offering Faculty: "),
+}
+# The learning outcomes are the list items inside this span
+LEARNING_OUTCOMES_CLASS = "detail-cim_los"
+
+def create_http_session(max_connections_per_host=MAX_CONNECTIONS_PER_HOST):
+    """
+    Create a shared keep-alive session for the calendar pages.
+    The connection pool blocks once max_connections_per_host connections to a host are in use,
+    so the number of concurrent requests to the calendar never exceeds that limit.
+    """
+    session = requests.Session()
+    session.headers.update(HEADERS)
+    adapter = HTTPAdapter(pool_connections=4, pool_maxsize=max_connections_per_host, pool_block=True)
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    return session
+
+def fetch_page(session, url, cache_dir=None, retries=REQUEST_RETRIES, backoff=REQUEST_BACKOFF):
+    """
+    Fetch a single calendar page and return the response along with the cached copy of the page (None if not cached).
+    If the page is cached, the request is made conditional on its ETag/Last-Modified,
+    and the server answers with 304 Not Modified when the page has not changed.
+    Timeouts, network errors and 429/5xx answers are retried up to retries times with exponential backoff,
+    the last error (or any other HTTP error, e.g. a 404) is raised.
+    """
+    cached_page = load_cached_page(url, cache_dir) if cache_dir else None
+
+    headers = {}
+    if cached_page:
+        if cached_page.get("etag"):
+            headers["If-None-Match"] = cached_page["etag"]
+        if cached_page.get("last_modified"):
+            headers["If-Modified-Since"] = cached_page["last_modified"]
+
+    for attempt in range(retries + 1):
+        try:
+            response = session.get(url, headers=headers, timeout=REQUEST_TIMEOUT)
+            response.raise_for_status()
+            return response, cached_page
+        except requests.RequestException as e:
+            if attempt == retries or not is_retryable_error(e):
+                raise
+            time.sleep(get_retry_after(e) or backoff * (2 ** attempt) * (1 + random.random()))
+
+def fetch_page_or_skip(session, url, cache_dir=None, retries=REQUEST_RETRIES, backoff=REQUEST_BACKOFF):
+    """
+    Same as fetch_page, but a page that still fails is logged and skipped instead of aborting the scrape:
+    returns (None, cached_page) so the courses cached for the page by a previous run can still be used.
+    """
+    try:
+        return fetch_page(session, url, cache_dir, retries, backoff)
+    except requests.RequestException as e:
+        print(f"Skipping {url}: {e}")
+        return None, load_cached_page(url, cache_dir) if cache_dir else None
 
-def create_supabase_client():
-    """
-    Create a Supabase client using environment variables for URL and key.
-    """
-    SUPABASE_URL = os.getenv("SUPABASE_URL")
-    SUPABASE_KEY = os.getenv("SUPABASE_KEY")
-    supabase: Client = create_client(SUPABASE_URL, SUPABASE_KEY)
-    return supabase
-
-
-
-def scrape_all_course():
-    """
-    Scrape course data from Queen's University website and store it in Supabase."""
-    headers = { "Accept-Language": "en-US,en;q=0.9,en-GB;q=0.8,en-CA;q=0.7" }
-    art_sci_url = "https://www.queensu.ca/academic-calendar/arts-science/course-descriptions/"
-    education_url = "https://www.queensu.ca/academic-calendar/education/course-descriptions/"
-    health_sci_url = "https://www.queensu.ca/academic-calendar/health-sciences/bhsc/courses-instruction/"
-    nursing_url = "https://www.queensu.ca/academic-calendar/nursing/bachelor-nursing-science-course-descriptions/"
-    engineering_urls = [
-        "https://www.queensu.ca/academic-calendar/engineering-applied-sciences/courses-instruction/apsc/",
-        "https://www.queensu.ca/academic-calendar/engineering-applied-sciences/courses-instruction/chee/",
-        "https://www.queensu.ca/academic-calendar/engineering-applied-sciences/courses-instruction/civl/",
-        "https://www.queensu.ca/academic-calendar/engineering-applied-sciences/courses-instruction/cmpe/",
-        "https://www.queensu.ca/academic-calendar/engineering-applied-sciences/courses-instruction/elec/",
-        "https://www.queensu.ca/academic-calendar/engineering-applied-sciences/courses-instruction/ench/",
-        "https://www.queensu.ca/academic-calendar/engineering-applied-sciences/courses-instruction/enph/",
-        "https://www.queensu.ca/academic-calendar/engineering-applied-sciences/courses-instruction/geoe/",
-        "https://www.queensu.ca/academic-calendar/engineering-applied-sciences/courses-instruction/mthe/",
-        "https://www.queensu.ca/academic-calendar/engineering-applied-sciences/courses-instruction/mech/",
-        "https://www.queensu.ca/academic-calendar/engineering-applied-sciences/courses-instruction/mren/",
-        "https://www.queensu.ca/academic-calendar/engineering-applied-sciences/courses-instruction/mine/",
-        "https://www.queensu.ca/academic-calendar/engineering-applied-sciences/courses-instruction/mntc/",
-        "https://www.queensu.ca/academic-calendar/engineering-applied-sciences/courses-instruction/soft/",
-    ]
-
-    commerce_url = "https://www.queensu.ca/academic-calendar/business/bachelor-commerce/courses-of-instruction/by20number/#onezerozeroleveltext"
-    
-    # Create a pandas DataFrame to store the scraped data
-    columns = [
-        "course_code",
-        "course_name",
-        "course_description",
-        "offering_faculty",
-        "learning_hours",
-        "course_learning_outcomes",
-        "course_requirements",
-        "course_equivalencies"
-    ]
-    course_data = pd.DataFrame(columns=columns)
-    
-    # Faculty 1: Arts & Science
-    print("Scraping Arts & Science courses...")
-    
-    # Step 1: Get the main URL content
-    results = requests.get(art_sci_url, headers=headers)
-    art_sci_main_url_content = BeautifulSoup(results.content, "html.parser")
+def iter_pages(session, urls, max_workers=FETCH_WORKERS, cache_dir=None, max_in_flight=MAX_PAGES_IN_FLIGHT):
+    """
+    Fetch the given calendar pages, concurrently if max_workers > 1, and yield (url, response, cached_page) as they become available.
+    Pages are yielded in the same order as the urls, so the scraped output stays deterministic.
+    The response is None for a page that could not be fetched (see fetch_page_or_skip).
+    At most max_in_flight pages are fetched ahead of the consumer, which bounds the memory held by unparsed pages.
+    """
+    if max_workers <= 1:
+        for url in urls:
+            yield (url, *fetch_page_or_skip(session, url, cache_dir))
+        return
+
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        in_flight = deque()
+        for url in urls:
+            in_flight.append((url, executor.submit(fetch_page_or_skip, session, url, cache_dir)))
+            if len(in_flight) >= max_in_flight:
+                url, future = in_flight.popleft()
+                yield (url, *future.result())
+
+        while in_flight:
+            url, future = in_flight.popleft()
+            yield (url, *future.result())
+
+def cached_page_path(url, cache_dir):
+    """
+    Get the path of the cache file for a calendar page.
+    """
+    return os.path.join(cache_dir, hashlib.sha1(url.encode("utf-8")).hexdigest() + ".json")
 
-    # Step 2: Find the embedded links for the course offerings page for each department within the faculty
-    art_sci_main_url_content_container = art_sci_main_url_content.find("div", class_="sitemap") # get the container element
-    art_sci_dept_course_pages = art_sci_main_url_content_container.find_all("a") # get all the links in the container
+def load_cached_page(url, cache_dir=PAGE_CACHE_DIR):
+    """
+    Load the cached copy of a calendar page.
+    Returns {"etag", "last_modified", "bytes", "courses"}, or None if there is no usable cache entry.
+    """
+    try:
+        with open(cached_page_path(url, cache_dir), "r", encoding="utf-8") as f:
+            cached_page = json.load(f)
+    except (OSError, ValueError):
+        return None
 
-    # Step 3: For each department, go through the courses offered and scrape the data
-    for dept_course_page in art_sci_dept_course_pages:
-                
-        # Get the URL and name of the department course page
-        dept_course_page_url = dept_course_page.get("href")
-        dept_course_page_name = dept_course_page.get_text(strip=True)
-        print(f"Scraping {dept_course_page_name} courses...")
-        
-        # Make a request to the department course page
-        dept_course_page_results = requests.get("https://www.queensu.ca" + dept_course_page_url, headers=headers)
-        dept_course_page_content = BeautifulSoup(dept_course_page_results.content, "html.parser")
-        
-        # Get each course from the department course page
-        courses = dept_course_page_content.find_all("div", class_="courseblock")
-        for course in courses:
-            course_code = course.find("span", class_="detail-code").get_text(strip=True)
-            course_name = course.find("span", class_="detail-title").get_text(strip=True)
-            course_units = course.find("span", class_="detail-hours_html").get_text(strip=True).replace("Units: ", "")
-            course_description = course.find("div", class_="courseblockextra").get_text(strip=True) if course.find("div", class_="courseblockextra") else None
-            course_requirements = course.find("span", class_="detail-requirements").get_text(strip=True).replace("Requirements: ", "") if course.find("span", class_="detail-requirements") else None
-            course_learning_hours = course.find("span", class_="detail-learning_hours").get_text(strip=True).replace("Learning Hours: ", "") if course.find("span", class_="detail-learning_hours") else None
-            course_equivalencies = course.find("span", class_="detail-course_equivalencies").get_text(strip=True).replace("Course Equivalencies: ", "") if course.find("span", class_="detail-course_equivalencies") else None
-            offering_faculty = course.find("span", class_="detail-offering_faculty").get_text(strip=True).replace("Offering Faculty: ", "") if course.find("span", class_="detail-offering_faculty") else None
-
-            learning_outcomes = []
-            outcomes_section = course.find("span", class_="detail-cim_los")
-            if outcomes_section:
-                outcomes_list = outcomes_section.find_all("li")
-                for outcome in outcomes_list:
-                    learning_outcomes.append(outcome.get_text(strip=True))
-
-            # Append the course data to the DataFrame
-            course_data = pd.concat([
-            course_data,
-            pd.DataFrame([{
-                "course_code": course_code,
-                "course_name": course_name,
-                "course_description": course_description,
-                "offering_faculty": offering_faculty,
-                "learning_hours": course_learning_hours,
-                "course_learning_outcomes": learning_outcomes,
-                "course_requirements": course_requirements,
-                "course_equivalencies": course_equivalencies,
-                "course_units": course_units
-            }])
-            ], ignore_index=True)
+    if cached_page.get("version") != PAGE_CACHE_VERSION or cached_page.get("url") != url:
+        return None
 
-    # Print success message
-    print("✔ Successfully scraped Arts & Science courses!")
+    return cached_page
 
-    # Step 4: Repeat the process for other faculties
-    
-    # Faculty 2: Education
-    print("Scraping Education courses...")
-
-    # Step 1: Get the main URL content
-    results = requests.get(education_url, headers=headers)
-    education_main_url_content = BeautifulSoup(results.content, "html.parser")
-
-    # Step 2: Find all course blocks
-    course_blocks = education_main_url_content.find_all("div", class_="courseblock")
-
-    # Step 3: Extract course details
-    for course in course_blocks:
-        course_code = course.find("span", class_="detail-code").get_text(strip=True)
-        course_name = course.find("span", class_="detail-title").get_text(strip=True)
-        course_units = course.find("span", class_="detail-hours_html").get_text(strip=True).replace("Units: ", "")
-        course_description = course.find("div", class_="courseblockextra").get_text(strip=True) if course.find("div", class_="courseblockextra") else None
-        course_requirements = course.find("span", class_="detail-requirements").get_text(strip=True).replace("Requirements: ", "") if course.find("span", class_="detail-requirements") else None
-        course_learning_hours = course.find("span", class_="detail-learning_hours").get_text(strip=True).replace("Learning Hours: ", "") if course.find("span", class_="detail-learning_hours") else None
-        course_equivalencies = course.find("span", class_="detail-course_equivalencies").get_text(strip=True).replace("Course Equivalencies: ", "") if course.find("span", class_="detail-course_equivalencies") else None
-        offering_faculty = course.find("span", class_="detail-offering_faculty").get_text(strip=True).replace("Offering Faculty: ", "") if course.find("span", class_="detail-offering_faculty") else None
-
-        learning_outcomes = []
-        outcomes_section = course.find("span", class_="detail-cim_los")
-        if outcomes_section:
-            outcomes_list = outcomes_section.find_all("li")
-            for outcome in outcomes_list:
-                learning_outcomes.append(outcome.get_text(strip=True))
-
-        # Append the course data to the DataFrame
-        course_data = pd.concat([
-            course_data,
-            pd.DataFrame([{
-                "course_code": course_code,
-                "course_name": course_name,
-                "course_description": course_description,
-                "offering_faculty": offering_faculty,
-                "learning_hours": course_learning_hours,
-                "course_learning_outcomes": learning_outcomes,
-                "course_requirements": course_requirements,
-                "course_equivalencies": course_equivalencies,
-                "course_units": course_units
-            }])
-        ], ignore_index=True)
+def save_cached_page(url, cached_page, cache_dir=PAGE_CACHE_DIR):
+    """
+    Write the cached copy of a calendar page to disk, replacing the previous file atomically.
+    """
+    os.makedirs(cache_dir, exist_ok=True)
+    path = cached_page_path(url, cache_dir)
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump({**cached_page, "version": PAGE_CACHE_VERSION, "url": url}, f)
+    os.replace(tmp_path, path)
+
+def remove_stale_cached_pages(urls, cache_dir=PAGE_CACHE_DIR):
+    """
+    Delete the cache files of pages that are no longer part of the calendar.
+    """
+    if not os.path.isdir(cache_dir):
+        return
 
-    # Print success message
-    print("✔ Successfully scraped Education courses!")
-
-    # Faculty 3: Health Sciences
-    print("Scraping Health Sciences courses...")
-    results = requests.get(health_sci_url, headers=headers)
-    health_sci_main_url_content = BeautifulSoup(results.content, "html.parser")
-
-    # Step 1: Find all course blocks
-    course_blocks = health_sci_main_url_content.find_all("div", class_="courseblock")
-
-    # Step 2: Extract course details
-    for course in course_blocks:
-        course_code = course.find("span", class_="detail-code").get_text(strip=True)
-        course_name = course.find("span", class_="detail-title").get_text(strip=True)
-        course_units = course.find("span", class_="detail-hours_html").get_text(strip=True).replace("Units: ", "")
-        course_description = course.find("div", class_="courseblockextra").get_text(strip=True) if course.find("div", class_="courseblockextra") else None
-        course_requirements = course.find("span", class_="detail-requirements").get_text(strip=True).replace("Requirements: ", "") if course.find("span", class_="detail-requirements") else None
-        course_learning_hours = course.find("span", class_="detail-learning_hours").get_text(strip=True).replace("Learning Hours: ", "") if course.find("span", class_="detail-learning_hours") else None
-        course_equivalencies = course.find("span", class_="detail-course_equivalencies").get_text(strip=True).replace("Course Equivalencies: ", "") if course.find("span", class_="detail-course_equivalencies") else None
-        offering_faculty = course.find("span", class_="detail-offering_faculty").get_text(strip=True).replace("Offering Faculty: ", "") if course.find("span", class_="detail-offering_faculty") else None
-
-        learning_outcomes = []
-        outcomes_section = course.find("span", class_="detail-cim_los")
-        if outcomes_section:
-            outcomes_list = outcomes_section.find_all("li")
-            for outcome in outcomes_list:
-                learning_outcomes.append(outcome.get_text(strip=True))
-
-        # Append the course data to the DataFrame
-        course_data = pd.concat([
-            course_data,
-            pd.DataFrame([{
-                "course_code": course_code,
-                "course_name": course_name,
-                "course_description": course_description,
-                "offering_faculty": offering_faculty,
-                "learning_hours": course_learning_hours,
-                "course_learning_outcomes": learning_outcomes,
-                "course_requirements": course_requirements,
-                "course_equivalencies": course_equivalencies,
-                "course_units": course_units
-            }])
-        ], ignore_index=True)
+    current_files = {os.path.basename(cached_page_path(url, cache_dir)) for url in urls}
+    for file_name in os.listdir(cache_dir):
+        if file_name not in current_files:
+            os.remove(os.path.join(cache_dir, file_name))
 
-    # Print success message
-    print("✔ Successfully scraped Health Sciences courses!")
-
-    # Faculty 4: Nursing
-    print("Scraping Nursing courses...")
-    results = requests.get(nursing_url, headers=headers)
-    nursing_main_url_content = BeautifulSoup(results.content, "html.parser")
-
-    # Step 1: Find all course blocks
-    course_blocks = nursing_main_url_content.find_all("div", class_="courseblock")
-
-    # Step 2: Extract course details
-    for course in course_blocks:
-        course_code = course.find("span", class_="detail-code").get_text(strip=True)
-        course_name = course.find("span", class_="detail-title").get_text(strip=True)
-        course_units = course.find("span", class_="detail-hours_html").get_text(strip=True).replace("Units: ", "")
-        course_description = course.find("div", class_="courseblockextra").get_text(strip=True) if course.find("div", class_="courseblockextra") else None
-        course_requirements = course.find("span", class_="detail-requirements").get_text(strip=True).replace("Requirements: ", "") if course.find("span", class_="detail-requirements") else None
-        course_learning_hours = None  # Not available in the provided structure
-        course_equivalencies = course.find("span", class_="detail-course_equivalencies").get_text(strip=True).replace("Course Equivalencies: ", "") if course.find("span", class_="detail-course_equivalencies") else None
-        offering_faculty = course.find("span", class_="detail-offering_faculty").get_text(strip=True).replace("Offering Faculty: ", "") if course.find("span", class_="detail-offering_faculty") else None
-
-        learning_outcomes = []
-        outcomes_section = course.find("span", class_="detail-cim_los")
-        if outcomes_section:
-            outcomes_list = outcomes_section.find_all("li")
-            for outcome in outcomes_list:
-                learning_outcomes.append(outcome.get_text(strip=True))
-
-        # Append the course data to the DataFrame
-        course_data = pd.concat([
-            course_data,
-            pd.DataFrame([{
-                "course_code": course_code,
-                "course_name": course_name,
-                "course_description": course_description,
-                "offering_faculty": offering_faculty,
-                "learning_hours": course_learning_hours,
-                "course_learning_outcomes": learning_outcomes,
-                "course_requirements": course_requirements,
-                "course_equivalencies": course_equivalencies,
-                "course_units": course_units
-            }])
-        ], ignore_index=True)
+def create_course_records():
+    """
+    Create an empty column store for scraped courses, one list per column in COURSE_COLUMNS.
+    Appending to lists is O(1) per course, unlike growing a DataFrame row by row.
+    """
+    return {column: [] for column in COURSE_COLUMNS}
 
-    # Print success message
-    print("✔ Successfully scraped Nursing courses!")
-
-    # Faculty 5: Engineering
-    print("Scraping Engineering courses...")
-
-    for engineering_url in engineering_urls:
-        # Make a request to the engineering URL
-        results = requests.get(engineering_url, headers=headers)
-        engineering_main_url_content = BeautifulSoup(results.content, "html.parser")
-
-        # Find all course blocks
-        course_blocks = engineering_main_url_content.find_all("div", class_="courseblock")
-
-        # Extract course details
-        for course in course_blocks:
-            course_code = course.find("span", class_="detail-code").get_text(strip=True)
-            course_name = course.find("span", class_="detail-title").get_text(strip=True)
-            course_units = course.find("span", class_="detail-hours_html").get_text(strip=True).replace("Units: ", "")
-            course_description = course.find("div", class_="courseblockextra").get_text(strip=True) if course.find("div", class_="courseblockextra") else None
-            course_requirements = course.find("span", class_="detail-requirements").get_text(strip=True).replace("Requirements: ", "") if course.find("span", class_="detail-requirements") else None
-            course_learning_hours = None  # Not available in the provided structure
-            course_equivalencies = course.find("span", class_="detail-course_equivalencies").get_text(strip=True).replace("Course Equivalencies: ", "") if course.find("span", class_="detail-course_equivalencies") else None
-            offering_faculty = course.find("span", class_="detail-offering_faculty").get_text(strip=True).replace("Offering Faculty: ", "") if course.find("span", class_="detail-offering_faculty") else None
-
-            learning_outcomes = []
-            outcomes_section = course.find("span", class_="detail-cim_los")
-            if outcomes_section:
-                outcomes_list = outcomes_section.find_all("li")
-                for outcome in outcomes_list:
-                    learning_outcomes.append(outcome.get_text(strip=True))
-
-            # Append the course data to the DataFrame
-            course_data = pd.concat([
-                course_data,
-                pd.DataFrame([{
-                    "course_code": course_code,
-                    "course_name": course_name,
-                    "course_description": course_description,
-                    "offering_faculty": offering_faculty,
-                    "learning_hours": course_learning_hours,
-                    "course_learning_outcomes": learning_outcomes,
-                    "course_requirements": course_requirements,
-                    "course_equivalencies": course_equivalencies,
-                    "course_units": course_units
-                }])
-            ], ignore_index=True)
-
-        print(f"✔ Successfully scraped courses from {engineering_url}")
-
-    # Faculty 6: Commerce
-    print("Scraping Commerce courses...")
-
-    # Make a request to the Commerce URL
-    response = requests.get(commerce_url, headers=headers)
-    soup = BeautifulSoup(response.content, "html.parser")
-
-    # Find all course blocks
-    course_blocks = soup.find_all("div", class_="courseblock")
-
-    # Extract course details
-    for course in course_blocks:
-        course_code = course.find("span", class_="detail-code").get_text(strip=True)
-        course_name = course.find("span", class_="detail-title").get_text(strip=True)
-        course_units = course.find("span", class_="detail-hours_html").get_text(strip=True).replace("Units: ", "")
-        course_description = course.find("div", class_="courseblockextra").get_text(strip=True) if course.find("div", class_="courseblockextra") else None
-        course_requirements = course.find("span", class_="detail-requirements").get_text(strip=True).replace("Requirements: ", "") if course.find("span", class_="detail-requirements") else None
-        course_equivalencies = course.find("span", class_="detail-course_equivalencies").get_text(strip=True).replace("Course Equivalencies: ", "") if course.find("span", class_="detail-course_equivalencies") else None
-        offering_faculty = course.find("span", class_="detail-offering_faculty").get_text(strip=True).replace("Offering Faculty: ", "") if course.find("span", class_="detail-offering_faculty") else None
-
-        learning_outcomes = []
-        outcomes_section = course.find("span", class_="detail-cim_los")
-        if outcomes_section:
-            outcomes_list = outcomes_section.find_all("li")
-            for outcome in outcomes_list:
-                learning_outcomes.append(outcome.get_text(strip=True))
-
-        # Append the course data to the DataFrame
-        course_data = pd.concat([
-            course_data,
-            pd.DataFrame([{
-                "course_code": course_code,
-                "course_name": course_name,
-                "course_description": course_description,
-                "offering_faculty": offering_faculty,
-                "learning_hours": None,  # Not available in this structure
-                "course_learning_outcomes": learning_outcomes,
-                "course_requirements": course_requirements,
-                "course_equivalencies": course_equivalencies,
-                "course_units": course_units
-            }])
-        ], ignore_index=True)
+def append_course_record(course_records, course):
+    """
+    Append a single course (dict keyed by column name) to the column store.
+    """
+    for column in COURSE_COLUMNS:
+        course_records[column].append(course.get(column))
 
-    # Print success message
-    print("✔ Successfully scraped Commerce courses!")
+def parse_courseblock(course, skip_fields=()):
+    """
+    Extract a single course from a courseblock element.
+    The courseblock subtree is walked once and every field in COURSEBLOCK_FIELDS is filled from the first element carrying its class.
+    Fields listed in skip_fields (e.g. learning_hours for faculties that do not publish them) are left as None.
+    """
+    course_data = {column: None for column in COURSE_COLUMNS}
+    course_data["course_learning_outcomes"] = []
+    found = set(skip_fields)
+    outcomes_found = False
+
+    for element in course.find_all(True):
+        for css_class in element.get("class") or ():
+            if css_class == LEARNING_OUTCOMES_CLASS and element.name == "span" and not outcomes_found:
+                outcomes_found = True
+                course_data["course_learning_outcomes"] = [outcome.get_text(strip=True) for outcome in element.find_all("li")]
+                continue
+
+            field = COURSEBLOCK_FIELDS.get(css_class)
+            if field is None:
+                continue
+
+            tag_name, column, label = field
+            if element.name != tag_name or column in found:
+                continue
+
+            found.add(column)
+            text = element.get_text(strip=True)
+            course_data[column] = text.replace(label, "") if label else text
+
+    return course_data
 
-    # Drop duplicates
-    course_data.drop_duplicates(subset=["course_code"], inplace=True)
+def parse_course_page(content, skip_fields=()):
+    """
+    Parse every courseblock on a calendar page and return the courses in page order.
+    Courseblocks without a course code are skipped.
+    """
+    page_content = BeautifulSoup(content, HTML_PARSER)
+    courses = []
+    for course in page_content.find_all("div", class_="courseblock"):
+        course_data = parse_courseblock(course, skip_fields)
+        if course_data["course_code"] is None:
+            continue
+        courses.append(course_data)
+    return courses
+
+def get_art_sci_department_urls(session):
+    """
+    Get the URL of every Arts & Science department course page from the sitemap on the faculty index page.
+    """
+    response, _ = fetch_page(session, ART_SCI_INDEX_URL)
+    art_sci_main_url_content = BeautifulSoup(response.content, HTML_PARSER)
+    art_sci_main_url_content_container = art_sci_main_url_content.find("div", class_="sitemap") # get the container element
+    art_sci_dept_course_pages = art_sci_main_url_content_container.find_all("a") # get all the links in the container
+    return [CALENDAR_BASE_URL + dept_course_page.get("href") for dept_course_page in art_sci_dept_course_pages]
+
+def iter_courses(max_workers=FETCH_WORKERS, max_connections_per_host=MAX_CONNECTIONS_PER_HOST, use_cache=USE_PAGE_CACHE, cache_dir=PAGE_CACHE_DIR):
+    """
+    Scrape course data from Queen's University website, yielding each course as soon as its page is parsed.
+    Department pages are fetched with up to max_workers concurrent requests over a shared session, while earlier pages are being parsed.
+    With use_cache, pages that answer 304 Not Modified reuse the courses extracted on a previous run instead of being parsed again.
+    Courses are deduplicated by course_code as they stream, the first occurrence wins.
+    """
+    # Shared keep-alive session for every calendar request
+    session = create_http_session(max_connections_per_host)
+
+    # Step 1: Resolve the course pages of every faculty (Arts & Science lists its departments on an index page)
+    page_faculties = {}
+    page_urls = []
+    # Cleared when a faculty index could not be fetched, its cached pages must then be kept
+    all_pages_listed = True
+    for faculty in FACULTIES:
+        urls = faculty["urls"]
+        if urls is None:
+            try:
+                urls = get_art_sci_department_urls(session)
+            except requests.RequestException as e:
+                print(f"Skipping {faculty['name']}, its course index could not be fetched: {e}")
+                all_pages_listed = False
+                continue
+        for url in urls:
+            if url not in page_faculties:
+                page_faculties[url] = faculty
+                page_urls.append(url)
+
+    # Step 2: Fetch the course pages in the background and parse them in order as they arrive
+    cache_stats = {"hits": 0, "misses": 0, "bytes_saved": 0}
+    skipped_pages = 0
+    seen_course_codes = set()
+    current_faculty = None
+    print(f"Fetching {len(page_urls)} calendar pages with {max_workers} workers...")
+
+    for url, response, cached_page in iter_pages(session, page_urls, max_workers, cache_dir if use_cache else None):
+        faculty = page_faculties[url]
+        if faculty is not current_faculty:
+            if current_faculty is not None:
+                print(f"✔ Successfully scraped {current_faculty['name']} courses!")
+            print(f"Scraping {faculty['name']} courses...")
+            current_faculty = faculty
+
+        # Page could not be fetched, fall back to the courses cached by a previous run (if any)
+        if response is None:
+            skipped_pages += 1
+            if cached_page is None:
+                continue
+        # Page not modified since the last run, reuse the courses extracted back then
+        elif response.status_code == 304 and cached_page is not None:
+            cache_stats["hits"] += 1
+            cache_stats["bytes_saved"] += cached_page["bytes"]
+        else:
+            cached_page = {
+                "etag": response.headers.get("ETag"),
+                "last_modified": response.headers.get("Last-Modified"),
+                "bytes": len(response.content),
+                "courses": parse_course_page(response.content, faculty["skip_fields"]),
+            }
+            cache_stats["misses"] += 1
+            if use_cache:
+                save_cached_page(url, cached_page, cache_dir)
+
+        for course_data in cached_page["courses"]:
+            if course_data["course_code"] in seen_course_codes:
+                continue
+            seen_course_codes.add(course_data["course_code"])
+            yield course_data
+
+    if current_faculty is not None:
+        print(f"✔ Successfully scraped {current_faculty['name']} courses!")
+
+    if skipped_pages:
+        print(f"Skipped {skipped_pages} calendar pages that could not be fetched")
+
+    if use_cache:
+        if all_pages_listed:
+            remove_stale_cached_pages(page_urls, cache_dir)
+        print(f"Calendar cache: {cache_stats['hits']} hits, {cache_stats['misses']} misses, {cache_stats['bytes_saved']} bytes saved")
+
+    print(f"Total number of courses scraped: {len(seen_course_codes)}")
+
+def scrape_all_course(max_workers=FETCH_WORKERS, max_connections_per_host=MAX_CONNECTIONS_PER_HOST, use_cache=USE_PAGE_CACHE, cache_dir=PAGE_CACHE_DIR):
+    """
+    Scrape course data from Queen's University website into a DataFrame.
+    Department pages are fetched with up to max_workers concurrent requests over a shared session."""
+    # Collect the scraped rows column by column, the DataFrame is built once at the end
+    course_records = create_course_records()
+    for course_data in iter_courses(max_workers, max_connections_per_host, use_cache, cache_dir):
+        append_course_record(course_records, course_data)
+
+    # Build the DataFrame from the collected columns
+    course_data = pd.DataFrame(course_records, columns=COURSE_COLUMNS)
 
     # Clean the dataframe
     course_data.replace({np.nan: None, float("inf"): None, float("-inf"): None}, inplace=True)
-    
-    # Print hte number of rows in the DataFrame
-    print(f"Total number of courses scraped: {len(course_data)}")
 
     return course_data
 
-def upsert_course_data_to_supabase(supabase, course_data, batch_size=50):
+def iter_batches(items, batch_size):
     """
-    Upsert course data into Supabase, updating if already exists.
-    Preserve average_gpa and average_enrollment if course already exists.
+    Group an iterable into lists of at most batch_size items.
     """
+    batch = []
+    for item in items:
+        batch.append(item)
+        if len(batch) == batch_size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+def normalize_course_value(value):
+    """
+    Normalize a course field so scraped values and values read back from the database hash the same way.
+    """
+    if value is None:
+        return None
+    if isinstance(value, (list, tuple)):
+        return [str(item).strip() for item in value]
+    return str(value).strip()
 
-    existing_courses_response = supabase.table("courses").select("course_code, average_gpa, average_enrollment").execute()
-
-    existing_courses = {
-        course["course_code"]: {
-            "average_gpa": course["average_gpa"],
-            "average_enrollment": course["average_enrollment"]
-        }
-        for course in existing_courses_response.data
-    }
+def course_content_hash(course):
+    """
+    Compute a stable hash over the scraped fields of a course (COURSE_COLUMNS).
+    Two records with the same content always get the same hash, regardless of key order or where they came from.
+    """
+    content = {column: normalize_course_value(course.get(column)) for column in COURSE_COLUMNS}
+    return hashlib.sha256(json.dumps(content, sort_keys=True).encode("utf-8")).hexdigest()
 
-    upsert_payload = []
+def diff_courses(courses, existing_courses):
+    """
+    Compare scraped courses with the courses stored in the database.
+    Returns the courses that are new or changed, and the number of inserted, updated and unchanged courses.
+    """
+    changed_courses = []
+    diff_stats = {"inserted": 0, "updated": 0, "unchanged": 0}
 
-    for index, row in course_data.iterrows():
-        course_code = row["course_code"]
+    for course in courses:
+        existing_course = existing_courses.get(course["course_code"])
 
-        if course_code in existing_courses:
-            avg_gpa = existing_courses[course_code]["average_gpa"]
-            avg_enroll = existing_courses[course_code]["average_enrollment"]
+        if existing_course is None:
+            diff_stats["inserted"] += 1
+        elif course_content_hash(course) != course_content_hash(existing_course):
+            diff_stats["updated"] += 1
         else:
-            avg_gpa = None
-            avg_enroll = None
-
-        upsert_payload.append({
-            "course_code": course_code,
-            "course_name": row["course_name"],
-            "course_description": row["course_description"],
-            "offering_faculty": row["offering_faculty"],
-            "learning_hours": row["learning_hours"],
-            "course_learning_outcomes": row["course_learning_outcomes"],
-            "course_requirements": row["course_requirements"],
-            "course_equivalencies": row["course_equivalencies"],
-            "course_units": row["course_units"],
-            "average_gpa": avg_gpa,
-            "average_enrollment": avg_enroll,
-        })
-
-        # If batch size reached or last row, send to Supabase
-        if len(upsert_payload) == batch_size or index == len(course_data) - 1:
-            supabase.table("courses").upsert(upsert_payload, on_conflict=["course_code"]).execute()
-            print(f"✅ Upserted {len(upsert_payload)} courses")
-            upsert_payload.clear()
+            diff_stats["unchanged"] += 1
+            continue
+
+        changed_courses.append(course)
 
+    return changed_courses, diff_stats
+
+def get_existing_courses(sink, course_codes):
+    """
+    Get the stored scraped fields of the given courses, keyed by course_code.
+    Only the requested codes are read (paginated by the sink), so the read never hits the server's row limit.
+    """
+    return {course["course_code"]: course for course in sink.get_courses(course_codes, COURSE_COLUMNS)}
+
+def upsert_course_data_to_supabase(sink, course_data, batch_size=50, write_workers=WRITE_WORKERS, diff=COURSE_DIFF):
+    """
+    Upsert course data into the storage sink (Supabase by default), updating if already exists.
+    course_data is a DataFrame or any iterable of course dicts, e.g. the iter_courses() generator.
+    Courses are written through a BulkWriter while the rest of the input is still being produced;
+    it adapts the batch size, retries rate-limited or failed batches and replays batches left over by a previous run.
+    With diff, each batch is compared with the stored rows of the same course codes and only new or changed courses are sent;
+    without it every course is sent and nothing is read from the database.
+    average_gpa and average_enrollment are left out of the payload, so the upsert keeps their stored values for existing courses.
+    """
+
+    if isinstance(course_data, pd.DataFrame):
+        course_data = course_data.to_dict("records")
+
+    diff_stats = {"inserted": 0, "updated": 0, "unchanged": 0}
+
+    writer = BulkWriter("courses", sink.upsert_courses, batch_size=batch_size, workers=write_workers)
+    writer.replay_failed_batches()
+
+    with writer:
+        for courses in iter_batches(course_data, batch_size):
+            if diff:
+                # Skip the courses that did not change since the last run
+                existing_courses = get_existing_courses(sink, [course["course_code"] for course in courses])
+                changed_courses, batch_stats = diff_courses(courses, existing_courses)
+                for key, count in batch_stats.items():
+                    diff_stats[key] += count
+            else:
+                changed_courses = courses
+
+            if not changed_courses:
+                continue
+
+            # Hand the courses to the writer, it blocks when too many batches are pending
+            writer.add_many({column: course[column] for column in COURSE_COLUMNS} for course in changed_courses)
+
+    if diff:
+        print(f"Course diff: {diff_stats['inserted']} new, {diff_stats['updated']} changed, {diff_stats['unchanged']} unchanged")
     print("✔ Successfully batch upserted all course data into Supabase!")
 
+    return diff_stats
+
 
 if __name__ == "__main__":
-    # Create Supabase client
-    supabase = create_supabase_client()
+    # Create the storage sink (Supabase unless STORAGE_BACKEND says otherwise)
+    sink = create_sink()
     
-    # Scrape course data
-    course_data = scrape_all_course()
+    # Scrape course data, parsed courses stream into the batched upsert while later pages are still being fetched
+    courses = iter_courses()
     
     # Check for new courses and add them to Supabase
-    upsert_course_data_to_supabase(supabase, course_data)
+    upsert_course_data_to_supabase(sink, courses)
 
     # Print success message
     print("✔ Periodic course data check and update completed successfully!")
\ No newline at end of file
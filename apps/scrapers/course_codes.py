@@ -0,0 +1,225 @@
+import os
+import re
+import json
+import hashlib
+import threading
+
+PREFIX_REGEX = re.compile(r"^[A-Z]+")
+NUMBER_REGEX = re.compile(r"\d+")
+VALID_DEPT_REGEX = re.compile(r"[A-Z]+")
+VALID_NUMBER_REGEX = re.compile(r"\d{3}")
+
+STATE_DIR = os.getenv("SCRAPER_STATE_DIR", ".scraper_state")
+LABEL_CACHE_PATH = os.path.join(STATE_DIR, "course_label_cache.json")
+
+def normalize_label(label):
+    """
+    Normalize a raw course label the way the mapping compares them: no spaces, upper-case.
+    """
+    return label.strip().replace(" ", "").upper()
+
+def catalog_version(valid_courses):
+    """
+    Hash of the course catalog, changes whenever a course is added or removed.
+    """
+    return hashlib.sha256("\n".join(sorted(valid_courses)).encode("utf-8")).hexdigest()[:16]
+
+class CourseCodeIndex:
+    """
+    Lookup tables over the set of valid course codes (e.g. "CISC 121"), built once per run
+    and used to map the messy course labels scraped from RMP (e.g. "cisc121", "121", "CISC121124").
+
+    It behaves like the set of valid courses it was built from (in, iteration, len), so it can be
+    passed wherever valid_courses is expected.
+    """
+
+    def __init__(self, valid_courses):
+        self.valid_courses = valid_courses
+
+        # Valid course with its spaces removed and upper-cased -> valid course
+        self.courses_no_space = {course.replace(" ", "").upper(): course for course in valid_courses}
+
+        # Every leading run of letters of a valid course (without spaces), and each of its prefixes:
+        # "CISC121" gives C, CI, CIS and CISC
+        self.dept_prefixes = set()
+        for course in valid_courses:
+            match = PREFIX_REGEX.match(course.replace(" ", ""))
+            if match:
+                letters = match.group(0)
+                self.dept_prefixes.update(letters[:i] for i in range(1, len(letters) + 1))
+
+        # 3-digit number -> departments offering a course "<DEPT> <number>"
+        self.depts_by_number = {}
+        for course in valid_courses:
+            parts = course.split(" ")
+            if len(parts) == 2 and VALID_DEPT_REGEX.fullmatch(parts[0]) and VALID_NUMBER_REGEX.fullmatch(parts[1]):
+                self.depts_by_number.setdefault(parts[1], set()).add(parts[0])
+
+    def __contains__(self, course):
+        return course in self.valid_courses
+
+    def __iter__(self):
+        return iter(self.valid_courses)
+
+    def __len__(self):
+        return len(self.valid_courses)
+
+    def map_course_codes(self, course_codes):
+        """
+        Map each raw course label to a single valid course ([course]) or None when it is unknown or ambiguous.
+
+        Two passes over the labels of one professor:
+        1) collect the department prefixes seen in the labels, and the valid courses "<DEPT> <number>"
+           formed by the numbers in the labels with the departments seen so far
+        2) map each label: exact match first, else the courses of pass 1 built from its 3-character chunks,
+           or from a bare 3-digit number
+        """
+        # --- Step 1: Build valid dept codes and the derived clean courses, indexed by number ---
+        valid_dept_codes = set()
+        derived_by_number = {}
+
+        for raw_code in course_codes:
+            cleaned = normalize_label(raw_code)
+
+            prefix_match = PREFIX_REGEX.match(cleaned)
+            if prefix_match and prefix_match.group(0) in self.dept_prefixes:
+                valid_dept_codes.add(prefix_match.group(0))
+
+            for num in NUMBER_REGEX.findall(cleaned):
+                if len(num) >= 3:
+                    num = num[:3]
+                    for dept in self.depts_by_number.get(num, ()):
+                        if dept in valid_dept_codes:
+                            derived_by_number.setdefault(num, set()).add(f"{dept} {num}")
+
+        # --- Step 2: Build mapping ---
+        course_mapping = {}
+
+        for raw_code in course_codes:
+            cleaned = normalize_label(raw_code)
+            matches = None
+
+            # Exact match to known valid courses first
+            if cleaned in self.courses_no_space:
+                matches = [self.courses_no_space[cleaned]]
+
+            else:
+                prefix_match = PREFIX_REGEX.match(cleaned)
+
+                if prefix_match and NUMBER_REGEX.search(cleaned):
+                    # Try to build full courses from the 3-character chunks after the prefix
+                    suffix = cleaned[len(prefix_match.group(0)):]
+                    matches = []
+                    for idx in range(0, len(suffix), 3):
+                        matches.extend(derived_by_number.get(suffix[idx:idx + 3], ()))
+
+                elif cleaned.isdigit() and len(cleaned) == 3:
+                    # Just numbers, only when the number formed a course in step 1
+                    if cleaned in derived_by_number:
+                        matches = list(derived_by_number[cleaned])
+
+                # Otherwise, only letters (ANAT) or unrecognised => ambiguous
+
+            if matches and len(matches) == 1:
+                course_mapping[raw_code] = matches
+            else:
+                course_mapping[raw_code] = None
+
+        return course_mapping
+
+    def is_contextual(self, label):
+        """
+        Check if the mapping of a normalized label depends on the other labels of the professor
+        (a prefix with numbers, or a bare 3-digit number, that is not a valid course by itself).
+        """
+        if label in self.courses_no_space:
+            return False
+        return bool(PREFIX_REGEX.match(label) and NUMBER_REGEX.search(label)) or (label.isdigit() and len(label) == 3)
+
+class CourseLabelCache(CourseCodeIndex):
+    """
+    CourseCodeIndex that memoizes label resolutions across professors and runs, in a JSON file.
+
+    Labels that resolve on their own (exact courses, letters only, ...) are cached by normalized label.
+    Labels that depend on the other labels of a professor are cached by the sorted set of that professor's
+    normalized labels, which are resolved in sorted order so the result does not depend on set iteration order.
+    The file is tagged with the catalog version, a changed course catalog starts an empty cache.
+    """
+
+    def __init__(self, valid_courses, path=LABEL_CACHE_PATH):
+        super().__init__(valid_courses)
+        self.path = path
+        self.version = catalog_version(valid_courses)
+        self.lock = threading.Lock()
+        self.stats = {"label_hits": 0, "label_misses": 0, "set_hits": 0, "set_misses": 0}
+
+        self.labels = {}
+        self.label_sets = {}
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                cache = json.load(f)
+            if cache.get("version") == self.version:
+                self.labels = cache["labels"]
+                self.label_sets = cache["label_sets"]
+            else:
+                print("Course catalog changed, starting an empty course label cache")
+        except (FileNotFoundError, json.JSONDecodeError, KeyError):
+            pass
+
+    def resolve_label(self, label):
+        """
+        Get the valid course a label names on its own (e.g. "cisc 121" -> "CISC 121"), or None.
+        """
+        label = normalize_label(label)
+        with self.lock:
+            if label in self.labels:
+                self.stats["label_hits"] += 1
+                return self.labels[label]
+
+            self.stats["label_misses"] += 1
+            course = self.courses_no_space.get(label)
+            self.labels[label] = course
+            return course
+
+    def map_course_codes(self, course_codes):
+        course_codes = list(course_codes)
+        labels = sorted({normalize_label(raw_code) for raw_code in course_codes})
+
+        resolved = {}
+        contextual = [label for label in labels if self.is_contextual(label)]
+        if contextual:
+            key = "\x1f".join(labels)
+            with self.lock:
+                mapping = self.label_sets.get(key)
+                self.stats["set_hits" if mapping is not None else "set_misses"] += 1
+            if mapping is None:
+                mapping = {label: courses[0] if courses else None for label, courses in super().map_course_codes(labels).items()}
+                with self.lock:
+                    self.label_sets[key] = mapping
+            resolved.update(mapping)
+
+        for label in labels:
+            if label not in resolved:
+                resolved[label] = self.resolve_label(label)
+
+        return {raw_code: [resolved[normalize_label(raw_code)]] if resolved[normalize_label(raw_code)] else None for raw_code in course_codes}
+
+    def save(self):
+        """
+        Write the cache file (atomically, through a temporary file).
+        """
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        with self.lock:
+            data = json.dumps({"version": self.version, "labels": self.labels, "label_sets": self.label_sets})
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            f.write(data)
+        os.replace(tmp_path, self.path)
+
+    def print_stats(self):
+        stats = self.stats
+        label_total = stats["label_hits"] + stats["label_misses"]
+        set_total = stats["set_hits"] + stats["set_misses"]
+        print(f"Course label cache: {stats['label_hits']}/{label_total} label hits"
+              f" ({100 * stats['label_hits'] / label_total if label_total else 0:.0f}%), "
+              f"{stats['set_hits']}/{set_total} label set hits ({100 * stats['set_hits'] / set_total if set_total else 0:.0f}%)")
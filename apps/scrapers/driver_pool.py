@@ -0,0 +1,178 @@
+import os
+import queue
+import threading
+from contextlib import contextmanager
+from selenium import webdriver
+from selenium.webdriver.chrome.options import Options
+from selenium.common.exceptions import WebDriverException, InvalidSessionIdException, SessionNotCreatedException, NoSuchWindowException
+
+# Default number of headless Chrome instances kept alive by a pool
+DRIVER_POOL_SIZE = 4
+# A driver is restarted after this many pages, to bound the memory a long-lived Chrome accumulates
+DRIVER_MAX_PAGES = int(os.getenv("WEBDRIVER_MAX_PAGES", "50"))
+PAGE_LOAD_TIMEOUT = 20
+# Errors meaning the browser session is gone, as opposed to page-level errors (missing element, wait timeout)
+SESSION_LOST_ERRORS = (InvalidSessionIdException, SessionNotCreatedException, NoSuchWindowException)
+
+def create_chrome_driver(page_load_timeout=PAGE_LOAD_TIMEOUT):
+    """
+    Start a headless Chrome with the options used by the scrapers.
+    """
+    options = Options()
+    options.add_argument("--headless")
+    options.add_argument("--disable-gpu")
+    options.add_argument("--no-sandbox")
+    options.add_argument("--log-level=3")
+
+    driver = webdriver.Chrome(options=options)
+    driver.set_page_load_timeout(page_load_timeout)
+    return driver
+
+def quit_driver(driver):
+    """
+    Quit a driver, ignoring the errors of a browser that already crashed.
+    """
+    try:
+        driver.quit()
+    except Exception:
+        pass
+
+@contextmanager
+def pooled_driver(driver_pool=None):
+    """
+    Borrow a driver from driver_pool, or start a one-off driver when no pool is given.
+    """
+    if driver_pool is not None:
+        with driver_pool.driver() as driver:
+            yield driver
+        return
+
+    driver = create_chrome_driver()
+    try:
+        yield driver
+    finally:
+        quit_driver(driver)
+
+class DriverPool:
+    """
+    Pool of long-lived headless Chrome drivers shared by scraper threads.
+
+    Drivers are started lazily, one per slot, and handed out with `with pool.driver() as driver:`.
+    Before a driver is handed out it is health-checked, and restarted if it crashed or already loaded max_pages pages.
+    When it is given back its cookies, storage and HTTP cache are cleared, so every page starts from a clean session.
+    A lost session raised inside the with block (or a WebDriverException after which the browser no longer answers)
+    marks the driver as broken, it is restarted on its next use. Page-level errors such as NoSuchElementException or
+    TimeoutException propagate, and the driver is reset and given back to the pool as usual.
+    """
+
+    def __init__(self, size=DRIVER_POOL_SIZE, max_pages=DRIVER_MAX_PAGES, create_driver=create_chrome_driver):
+        self.size = size
+        self.max_pages = max_pages
+        self.create_driver = create_driver
+
+        # Each slot is a dict holding a driver (None until first use) and the number of pages it loaded
+        self.slots = queue.Queue()
+        for _ in range(size):
+            self.slots.put({"driver": None, "pages": 0})
+
+        self.lock = threading.Lock()
+        self.closed = False
+        self.stats = {"started": 0, "recycled": 0, "crashed": 0, "pages": 0}
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, traceback):
+        self.close()
+
+    @contextmanager
+    def driver(self):
+        """
+        Borrow a driver for one page, blocking until one is free.
+        """
+        slot = self.slots.get()
+        try:
+            self._prepare(slot)
+            try:
+                yield slot["driver"]
+            except SESSION_LOST_ERRORS:
+                self._discard(slot, crashed=True)
+                raise
+            except WebDriverException:
+                if not self._is_healthy(slot["driver"]):
+                    self._discard(slot, crashed=True)
+                raise
+            finally:
+                if slot["driver"] is not None and not self._reset(slot["driver"]):
+                    self._discard(slot, crashed=True)
+        finally:
+            self.slots.put(slot)
+
+    def close(self):
+        """
+        Quit every driver of the pool and print the pool statistics.
+        """
+        with self.lock:
+            if self.closed:
+                return
+            self.closed = True
+
+        for _ in range(self.size):
+            slot = self.slots.get()
+            if slot["driver"] is not None:
+                quit_driver(slot["driver"])
+                slot["driver"] = None
+
+        stats = self.stats
+        print(f"Driver pool: {stats['pages']} pages on {stats['started']} browsers started, "
+              f"{stats['recycled']} recycled, {stats['crashed']} crashed")
+
+    def _prepare(self, slot):
+        if slot["driver"] is not None and slot["pages"] >= self.max_pages:
+            self._discard(slot)
+            with self.lock:
+                self.stats["recycled"] += 1
+
+        if slot["driver"] is not None and not self._is_healthy(slot["driver"]):
+            self._discard(slot, crashed=True)
+
+        if slot["driver"] is None:
+            slot["driver"] = self.create_driver()
+            slot["pages"] = 0
+            with self.lock:
+                self.stats["started"] += 1
+
+        slot["pages"] += 1
+        with self.lock:
+            self.stats["pages"] += 1
+
+    def _discard(self, slot, crashed=False):
+        if slot["driver"] is not None:
+            quit_driver(slot["driver"])
+        slot["driver"] = None
+        slot["pages"] = 0
+        if crashed:
+            with self.lock:
+                self.stats["crashed"] += 1
+
+    def _is_healthy(self, driver):
+        """
+        Check that the browser still answers commands.
+        """
+        try:
+            return driver.execute_script("return 1") == 1
+        except Exception:
+            return False
+
+    def _reset(self, driver):
+        """
+        Clear the cookies, web storage and HTTP cache of a driver. Returns False if the browser did not answer.
+        """
+        try:
+            driver.delete_all_cookies()
+            driver.execute_script("try { window.localStorage.clear(); window.sessionStorage.clear(); } catch (e) {}")
+            driver.execute_cdp_cmd("Network.clearBrowserCache", {})
+            driver.get("about:blank")
+            return True
+        except Exception:
+            return False
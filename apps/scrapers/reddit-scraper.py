@@ -2,22 +2,31 @@ import praw
 import os
 import re
 import uuid
+import json
+import argparse
+from collections import deque
+from itertools import islice
 from datetime import datetime
-from supabase import create_client, Client
-from textblob import TextBlob
+from bulk_writer import BulkWriter
+from storage import create_sink, dedup_key, unstored_rag_chunks, GENERAL_COURSE, GENERAL_PROF
+from course_codes import CourseLabelCache
+from sentiment import SentimentService
+from analysis_cache import AnalysisCache
+from tags import detect_tags
+from url_index import UrlIndex
 
 # Precompiled regex patterns
 PROF_NAME_REGEX = re.compile(r'\b(?:Prof\.?|Dr\.?)\s+[A-Z][a-z]+\s+[A-Z][a-z]+\b')
 COURSE_CODE_REGEX = re.compile(r'\b[A-Za-z]{4}\s?\d{3}\b')
 
-def create_supabase_client():
-    """
-    Create a Supabase client using environment variables for URL and key.
-    """
-    SUPABASE_URL = os.getenv("SUPABASE_URL")
-    SUPABASE_KEY = os.getenv("SUPABASE_KEY")
-    supabase: Client = create_client(SUPABASE_URL, SUPABASE_KEY)
-    return supabase
+# Number of posts whose urls are checked against the stored chunks in one lookup (a listing page holds 100 posts)
+POST_LOOKUP_BATCH_SIZE = int(os.getenv("REDDIT_POST_LOOKUP_BATCH_SIZE", "100"))
+
+# High-water mark of the subreddit listing: the newest post listed by the last complete run
+LISTING_CURSOR_PATH = os.path.join(os.getenv("SCRAPER_STATE_DIR", ".scraper_state"), "reddit_listing_cursor.json")
+# The listing stops at posts created this many hours before the high-water mark, so posts that show up late
+# in the listing (approved by a moderator, released from the spam filter) are still seen
+LISTING_OVERLAP_HOURS = float(os.getenv("REDDIT_LISTING_OVERLAP_HOURS", "48"))
 
 def setup_reddit():
     """
@@ -32,61 +41,6 @@ def setup_reddit():
     )
     return reddit
 
-def detect_sentiment(text):
-    """
-    Determine the sentiment of a given text using TextBlob.
-    returns a sentiment_score (float between -1 and 1) and a sentiment_label (very positive, positive, neutral, negative, very negative).
-    """
-    blob = TextBlob(text)
-    sentiment_score = blob.sentiment.polarity
-    if sentiment_score > 0.5:
-        sentiment_label = "very positive"
-    elif sentiment_score > 0.2:
-        sentiment_label = "positive"
-    elif sentiment_score < -0.5:
-        sentiment_label = "very negative"
-    elif sentiment_score < -0.2:
-        sentiment_label = "negative"
-    else:
-        sentiment_label = "neutral"
-
-    return sentiment_score, sentiment_label
-
-def detect_tags(text):
-    """
-    Creates tags based on the text content.
-    Returns a list of tags.
-    Possible tag values: easy, hard, professor_review, course_structure (i.e final exams, assignments, workload), tips
-    """
-    body = text.lower()
-    tags = []
-
-    # Preprocessing: detect negations manually
-    is_not_easy = bool(re.search(r"not\s+(easy|light|bird course|straightforward)", body))
-    is_not_hard = bool(re.search(r"not\s+(hard|tough|difficult|challenging|brutal|intense)", body))
-
-    # Difficulty (easy)
-    if not is_not_easy and any(word in body for word in ["easy", "light", "bird course", "manageable", "straightforward"]):
-        tags.append("easy")
-
-    # Difficulty (hard)
-    if not is_not_hard and any(word in body for word in ["hard", "tough", "difficult", "challenging", "brutal", "intense"]):
-        tags.append("hard")
-
-    # Professor reviews
-    if any(word in body for word in ["professor", "lecturer", "teaching", "instructor", "teaches", "taught"]):
-        tags.append("professor_review")
-
-    # Course structure (exams, assignments, workload)
-    if any(word in body for word in ["exam", "midterm", "final", "assignment", "homework", "reading", "workload", "labs", "quizzes", "group project"]):
-        tags.append("course_structure")
-
-    # Tips and advice
-    if any(word in body for word in ["recommend", "tip", "advice", "suggest", "strategy", "resource", "how to study"]):
-        tags.append("tips")
-
-    return tags
-
 def extract_prof_name_from_post(post):
     """
     Extract the first detected professor name from a Reddit post's title or selftext.
@@ -144,23 +98,30 @@ def is_comment_of_interest(comment):
     # ✅ Passed all checks
     return True
 
-def extract_course_code_from_post(post):
+def extract_course_code_from_post(post, label_cache=None):
     full_text = f"{post.title} {post.selftext}"
     match = COURSE_CODE_REGEX.search(full_text)
     
     if match:
         course_code = match.group(0).replace(" ", "").upper()
+        # Valid courses resolve through the label cache shared with the RMP scraper
+        resolved = label_cache.resolve_label(course_code) if label_cache is not None else None
+        if resolved:
+            return resolved
         # Insert a space between letters and digits
         course_code = re.sub(r"([A-Z]{4})(\d{3})", r"\1 \2", course_code)
         return course_code
     else:
         return None
 
-def extract_course_code_from_comment(comment):
+def extract_course_code_from_comment(comment, label_cache=None):
     match = COURSE_CODE_REGEX.search(comment.body)
     
     if match:
         course_code = match.group(0).replace(" ", "").upper()
+        resolved = label_cache.resolve_label(course_code) if label_cache is not None else None
+        if resolved:
+            return resolved
         course_code = re.sub(r"([A-Z]{4})(\d{3})", r"\1 \2", course_code)
         return course_code
     else:
@@ -208,108 +169,224 @@ def clean_text(text):
     text = re.sub(r'^[a-z]\)', '-', text, flags=re.MULTILINE)
     return text
 
-def scrape_and_store(courses, professors):
-    subreddit = reddit.subreddit("queensuniversity")
-    results = []
-
-    # Fetch already processed posts from Supabase by using post url (source_url)
-    processed_posts = supabase.table("rag_chunks").select("source_url").eq("source", "reddit").execute()
-    processed_posts_urls = {post["source_url"] for post in processed_posts.data}
+def write_scored_comments(pending_batches, review_writer, wait=False):
+    """
+    Fill in the sentiment of the comment batches whose scoring finished (all of them if wait is True)
+    and hand them to the writer, oldest batch first.
+    """
+    while pending_batches and (wait or pending_batches[0][0].done()):
+        future, batch = pending_batches.popleft()
+        for comment_data, (sentiment_score, sentiment_label) in zip(batch, future.result()):
+            comment_data["sentiment_score"] = sentiment_score
+            comment_data["sentiment_label"] = sentiment_label
+            review_writer.add(comment_data)
+
+def load_listing_cursor(path=LISTING_CURSOR_PATH):
+    """
+    Get the high-water mark saved by the last complete run ({"post_id", "created_utc"}), or None.
+    """
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            cursor = json.load(f)
+        return cursor if "created_utc" in cursor else None
+    except (FileNotFoundError, json.JSONDecodeError):
+        return None
 
-    for post in subreddit.new(limit=1000):
-       
-        # Check if the post has already been processed
-        if post.url in processed_posts_urls:
-            print(f"Skipping already processed post: {post.title[:60]}...")
-            continue
+def save_listing_cursor(cursor, path=LISTING_CURSOR_PATH):
+    """
+    Write the high-water mark (atomically, through a temporary file).
+    """
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(cursor, f)
+    os.replace(tmp_path, path)
 
-        # Determine if this is a post of interest, if not, skip it
-        if not is_post_of_interest(post):
-            continue
-        
-        # If the post title/description contains a course code, extract it, otherwise set to None
-        course_code = extract_course_code_from_post(post)
-        if not course_code:
-            course_code = None
-
-        # If the post title/description contains a prof name, extract it, otherwise set to None
-        prof_name = extract_prof_name_from_post(post)
-        if not prof_name:
-            prof_name = None
-
-        # Iterate through the comments of the post
-        post.comments.replace_more(limit=None)
-        for comment in post.comments:
-            # Check to see if the comment is a valid comment
-            if not is_comment_of_interest(comment):
+def posts_since(posts, cursor, newest, overlap_hours=LISTING_OVERLAP_HOURS):
+    """
+    Yield posts from a newest-first listing until one was created more than overlap_hours before the cursor
+    (all of them when cursor is None). Stopping early also stops fetching listing pages.
+    The newest post yielded is recorded in newest ({"post_id", "created_utc"}).
+    """
+    cutoff = cursor["created_utc"] - overlap_hours * 3600 if cursor else None
+    for post in posts:
+        if cutoff is not None and post.created_utc < cutoff:
+            print(f"Reached the posts listed by the last run (post {cursor['post_id']}), stopping the listing")
+            return
+        if post.created_utc > newest.get("created_utc", 0):
+            newest.update(post_id=post.id, created_utc=post.created_utc)
+        yield post
+
+def unprocessed_posts(posts, url_index=None, batch_size=POST_LOOKUP_BATCH_SIZE):
+    """
+    Yield the posts that have no stored comment yet, in order.
+    Their urls (source_url) are checked in the synced url_index, or without one looked up in bulk, batch_size posts at a time.
+    """
+    posts = iter(posts)
+    while True:
+        batch = list(islice(posts, batch_size))
+        if not batch:
+            return
+
+        if url_index is not None:
+            processed_posts_urls = {post.url for post in batch if post.url in url_index}
+        else:
+            processed_posts_urls = sink.existing_keys("source_url", [post.url for post in batch], source="reddit")
+        for post in batch:
+            if post.url in processed_posts_urls:
+                print(f"Skipping already processed post: {post.title[:60]}...")
                 continue
-            
-            # If course_code is not None, use it, otherwise try to find the course code in the comment.
-            # If that fails, skip the comment.
-            # This is to ensure that we have a course code for every comment.
-            temp_course_code = course_code or extract_course_code_from_comment(comment)
-            if not temp_course_code:
+            yield post
+
+def scrape_and_store(courses, professors, label_cache=None, sentiment_service=None, url_index=None, listing_cursor=None, review_writer=None):
+    subreddit = reddit.subreddit("queensuniversity")
+    results = []
+
+    # The comments of a post are scored in the background while the next posts are fetched
+    sentiment_service = sentiment_service or SentimentService(workers=0)
+    pending_batches = deque()
+
+    # Comments are inserted in batches in the background while the next posts are being fetched
+    if review_writer is None:
+        review_writer = BulkWriter("rag_chunks", sink.insert_rag_chunks, unwritten_rows=lambda rows: unstored_rag_chunks(sink, rows))
+        review_writer.replay_failed_batches()
+
+    # Skip the posts already processed, checked by post url (source_url) one listing page at a time
+    # Only list the posts created since the last run (minus the overlap window), or the whole history without a cursor
+    newest = dict(listing_cursor or {})
+    listing = posts_since(subreddit.new(limit=1000 if listing_cursor else None), listing_cursor, newest)
+    # Write every comment already handled even when the listing or a post fails (PRAW errors),
+    # the error is raised once they are written or saved for replay
+    completed = False
+    try:
+        for post in unprocessed_posts(listing, url_index):
+
+            # Determine if this is a post of interest, if not, skip it
+            if not is_post_of_interest(post):
                 continue
+        
+            # If the post title/description contains a course code, extract it, otherwise set to None
+            course_code = extract_course_code_from_post(post, label_cache)
+            if not course_code:
+                course_code = None
 
-            # If the professor name is not None, use it, otherwise try to find the professor name in the comment.
+            # If the post title/description contains a prof name, extract it, otherwise set to None
+            prof_name = extract_prof_name_from_post(post)
             if not prof_name:
-                prof_name = extract_prof_name_from_comment(comment)
-
-            # Extract tags from the comment
-            tags = detect_tags(comment.body)
-
-            # Extract sentiment from the comment
-            sentiment_score, sentiment_label = detect_sentiment(comment.body)
-
-            comment_data = {
-                "text": comment.body,
-                "source": "reddit",
-                "course_code": temp_course_code,
-                "source_url": post.url,
-                "tags": tags,
-                "professor_name": prof_name,
-                "sentiment_score": sentiment_score,
-                "sentiment_label": sentiment_label,
-                "upvotes": comment.score,
-                "created_at": datetime.utcfromtimestamp(comment.created_utc).date().isoformat(),
-            }
-
-            # If the course code is None (aka 'general_course'), check if there is an associated professor, if not, skip the comment
-            if temp_course_code is None:
-                if prof_name is not None:
-                    comment_data["course_code"] = "general_course"
-                    supabase.table("rag_chunks").insert(comment_data).execute()
+                prof_name = None
+
+            # Iterate through the comments of the post
+            post.comments.replace_more(limit=None)
+            post_comments = []
+            for comment in post.comments:
+                # Check to see if the comment is a valid comment
+                if not is_comment_of_interest(comment):
+                    continue
+            
+                # If course_code is not None, use it, otherwise try to find the course code in the comment.
+                # If that fails, skip the comment.
+                # This is to ensure that we have a course code for every comment.
+                temp_course_code = course_code or extract_course_code_from_comment(comment, label_cache)
+                if not temp_course_code:
+                    continue
+
+                # If the professor name is not None, use it, otherwise try to find the professor name in the comment.
+                if not prof_name:
+                    prof_name = extract_prof_name_from_comment(comment)
+
+                # Extract tags from the comment (a few substring checks, cheaper than an analysis cache lookup)
+                tags = detect_tags(comment.body)
+
+                created_at = datetime.utcfromtimestamp(comment.created_utc).date().isoformat()
+                comment_data = {
+                    "text": comment.body,
+                    "source": "reddit",
+                    "course_code": temp_course_code,
+                    "source_url": post.url,
+                    "tags": tags,
+                    "professor_name": prof_name,
+                    "sentiment_score": None,
+                    "sentiment_label": None,
+                    "upvotes": comment.score,
+                    "created_at": created_at,
+                    "dedup_key": dedup_key(comment.body, created_at),
+                }
+
+                # If the course code is None (aka 'general_course'), check if there is an associated professor, if not, skip the comment
+                if temp_course_code is None:
+                    if prof_name is not None:
+                        comment_data["course_code"] = GENERAL_COURSE
+                        post_comments.append(comment_data)
+                        results.append(comment_data)
+
+                # If the course code is in the list of valid courses, insert the comment into the database
+                if temp_course_code is not None and temp_course_code in courses:
+                    # If the professor name is in the list of valid professors, insert the comment into the database
+                    if prof_name in professors:
+                        comment_data["professor_name"] = prof_name
+                    else:
+                        comment_data["professor_name"] = GENERAL_PROF
+                
+                    post_comments.append(comment_data)
                     results.append(comment_data)
 
-            # If the course code is in the list of valid courses, insert the comment into the database
-            if temp_course_code is not None and temp_course_code in courses:
-                # If the professor name is in the list of valid professors, insert the comment into the database
-                if prof_name in professors:
-                    comment_data["professor_name"] = prof_name
-                else:
-                    comment_data["professor_name"] = 'general_prof'
-                
-                supabase.table("rag_chunks").insert(comment_data).execute()
-                results.append(comment_data)
+            # Score the post's comments in the background, write the batches that are already scored
+            if post_comments:
+                pending_batches.append((sentiment_service.submit(comment_data["text"] for comment_data in post_comments), post_comments))
+            write_scored_comments(pending_batches, review_writer)
+        completed = True
+    finally:
+        write_scored_comments(pending_batches, review_writer, wait=True)
+        review_writer.close(raise_errors=completed)
+
+    # Every listed post is written (or saved for replay), the next run can stop at this one
+    if newest:
+        save_listing_cursor(newest)
 
     return results
 
 if __name__ == "__main__":
-    # Initialize Supabase client and Reddit client
-    supabase = create_supabase_client()
+    parser = argparse.ArgumentParser(description="Scrape course comments from r/queensuniversity.")
+    parser.add_argument("--backfill", action="store_true", help="walk the whole subreddit listing instead of stopping at the last run's posts")
+    args = parser.parse_args()
+
+    # Sentiment is scored in worker processes, started before any other thread.
+    # Sentiment is cached on disk by text, so comments seen by a previous run are not scored again
+    analysis_cache = AnalysisCache()
+    sentiment_service = SentimentService(cache=analysis_cache)
+
+    # Initialize the storage sink (Supabase unless STORAGE_BACKEND says otherwise) and Reddit client
+    sink = create_sink()
     reddit = setup_reddit()
 
-   # Get all valid courses from Supabase
-    courses_response = supabase.table("courses").select("course_code").execute()
-    courses = courses_response.data  # <-- .data gives you the list
-    courses = [c for c in courses if c["course_code"] != "general_course"]
-    courses = {c["course_code"] for c in courses}
+   # Get all valid courses from the database
+    courses = sink.get_course_codes()
+    courses = {c for c in courses if c != GENERAL_COURSE}
 
-    # Get all valid professors from Supabase
-    professors_response = supabase.table("professors").select("name").execute()
-    professors = professors_response.data
-    professors = [p for p in professors if p["name"] != "general_prof"]
+    # Get all valid professors from the database
+    professors = sink.get_professors(["name"])
+    professors = [p for p in professors if p["name"] != GENERAL_PROF]
     professors = {p["name"] for p in professors}
 
+    # Course labels resolved by a previous run are reused (the cache resets when the catalog changes)
+    label_cache = CourseLabelCache(courses)
+
+    # Resend the comments that failed on a previous run first, so the url index synced below includes their posts
+    # (that run did not save its listing cursor, it lists the same posts again)
+    review_writer = BulkWriter("rag_chunks", sink.insert_rag_chunks, unwritten_rows=lambda rows: unstored_rag_chunks(sink, rows))
+    review_writer.replay_failed_batches()
+
+    # Urls of the posts already processed, only the rows stored since the last run are read
+    url_index = UrlIndex()
+    rows_read = url_index.sync(sink)
+    url_index.save()
+    print(f"Url index: {len(url_index)} processed post urls ({rows_read} new rows synced)")
+
     # Scrape and store comments
-    scraped_data = scrape_and_store(courses, professors)
+    listing_cursor = None if args.backfill else load_listing_cursor()
+    scraped_data = scrape_and_store(courses, professors, label_cache, sentiment_service, url_index, listing_cursor, review_writer)
+    sentiment_service.close()
+    analysis_cache.print_stats()
+    analysis_cache.close()
+    label_cache.save()
+    label_cache.print_stats()
@@ -1,18 +1,27 @@
 import requests
 from bs4 import BeautifulSoup
-from selenium import webdriver
 from selenium.webdriver.common.by import By
-from selenium.webdriver.chrome.options import Options
-from selenium.webdriver.support.ui import WebDriverWait
 from selenium.webdriver.support import expected_conditions as EC
 from selenium.common.exceptions import NoSuchElementException
 from selenium.common.exceptions import TimeoutException
-import time
-from textblob import TextBlob
-from supabase import create_client, Client
 import re
 from datetime import datetime
 import os
+import html
+import argparse
+import base64
+import threading
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from bulk_writer import BulkWriter, is_retryable_error, get_retry_after
+from storage import create_sink, dedup_key, unstored_rag_chunks, GENERAL_COURSE, GENERAL_PROF
+from driver_pool import DriverPool, pooled_driver
+from scheduler import TokenBucket, Progress
+from checkpoint import CheckpointJournal
+from course_codes import CourseCodeIndex, CourseLabelCache
+from sentiment import SentimentService
+from analysis_cache import AnalysisCache
+from waits import wait_for, element_count_above, WAIT_METRICS
 
 HEADERS = {
     "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/119.0.0.0 Safari/537.36",
@@ -22,14 +31,124 @@ HEADERS = {
 UNIVERSITY_ID = 1466
 UNIVERSITY_NAME = "Queen's University at Kingston"
 
-def create_supabase_client():
+RMP_BASE_URL = "https://www.ratemyprofessors.com"
+GRAPHQL_URL = os.getenv("RMP_GRAPHQL_URL", f"{RMP_BASE_URL}/graphql")
+# The public web client authenticates its GraphQL calls with these fixed credentials
+GRAPHQL_HEADERS = {**HEADERS, "Authorization": "Basic dGVzdDp0ZXN0", "Content-Type": "application/json"}
+REQUEST_TIMEOUT = 30
+REQUEST_RETRIES = 3
+
+# The run is stopped once more than this share of the professors failed (after at least FAILURE_RATE_MIN_PROFESSORS),
+# a failure rate that high means the API changed or is down rather than a few bad professors
+MAX_FAILURE_RATE = float(os.getenv("RMP_MAX_FAILURE_RATE", "0.1"))
+FAILURE_RATE_MIN_PROFESSORS = 20
+
+# Global budget for requests to RMP (API calls and page loads), shared by every worker thread
+REQUESTS_PER_SECOND = float(os.getenv("RMP_REQUESTS_PER_SECOND", "4"))
+RATE_LIMITER = TokenBucket(REQUESTS_PER_SECOND)
+
+# How the professor list is fetched: "graphql" pages through the search API, "selenium" clicks "Show More" in a browser
+LISTING_MODE = os.getenv("RMP_LISTING_MODE", "graphql")
+LISTING_PAGE_SIZE = 100
+LISTING_WORKERS = int(os.getenv("RMP_LISTING_WORKERS", "8"))
+
+TEACHER_SEARCH_QUERY = """
+query TeacherSearchPaginationQuery($count: Int!, $cursor: String, $query: TeacherSearchQuery!) {
+  search: newSearch {
+    teachers(query: $query, first: $count, after: $cursor) {
+      edges {
+        node {
+          legacyId
+          firstName
+          lastName
+          department
+          avgRating
+          numRatings
+          school {
+            name
+          }
+        }
+      }
+      pageInfo {
+        hasNextPage
+        endCursor
+      }
+      resultCount
+    }
+  }
+}
+"""
+
+# How the ratings of a professor are fetched: "graphql" pages through the ratings API, "selenium" clicks "Load More Ratings" in a browser
+RATINGS_MODE = os.getenv("RMP_RATINGS_MODE", "graphql")
+RATINGS_PAGE_SIZE = 50
+# Number of professors scraped in parallel, also the size of the browser pool in selenium mode
+PROFESSOR_WORKERS = int(os.getenv("RMP_PROFESSOR_WORKERS", "4"))
+# Number of tags shown under "Top Tags" on the professor page
+TOP_TAGS_COUNT = 5
+
+RATINGS_LIST_QUERY = """
+query RatingsListQuery($count: Int!, $id: ID!, $courseFilter: String, $cursor: String) {
+  node(id: $id) {
+    ... on Teacher {
+      avgRating
+      avgDifficulty
+      wouldTakeAgainPercent
+      teacherRatingTags {
+        tagName
+        tagCount
+      }
+      courseCodes {
+        courseName
+        courseCount
+      }
+      ratings(first: $count, after: $cursor, courseFilter: $courseFilter) {
+        edges {
+          node {
+            class
+            comment
+            date
+            clarityRating
+            helpfulRating
+            difficultyRating
+            ratingTags
+          }
+        }
+        pageInfo {
+          hasNextPage
+          endCursor
+        }
+      }
+    }
+  }
+}
+"""
+
+# Sentiment scoring of the reviews, in the calling thread unless __main__ starts a process pool
+SENTIMENT_SERVICE = SentimentService(workers=0)
+
+# Journal of the current run (listing, worklist, committed professors), used by --resume after a crash
+JOURNAL_PATH = os.path.join(os.getenv("SCRAPER_STATE_DIR", ".scraper_state"), "rmp_journal.jsonl")
+
+# BeautifulSoup tree builder used for the professor pages: "lxml" (C-based, fast) or "html.parser" (pure Python)
+HTML_PARSER = os.getenv("HTML_PARSER", "lxml")
+
+# Outer HTML of the review cards (same selector as the page soup) from index arguments[0] on
+NEW_RATING_ITEMS_SCRIPT = """
+return Array.from(document.querySelectorAll("ul#ratingsList li")).slice(arguments[0]).map(item => item.outerHTML);
+"""
+
+def create_professor_writer(sink):
     """
-    Create a Supabase client using environment variables for URL and key.
+    Create the batched writer for professor upserts (keyed by id, so replaying a batch is safe).
     """
-    SUPABASE_URL = os.getenv("SUPABASE_URL")
-    SUPABASE_KEY = os.getenv("SUPABASE_KEY")
-    supabase: Client = create_client(SUPABASE_URL,SUPABASE_KEY)
-    return supabase
+    return BulkWriter("professors", sink.upsert_professors)
+
+def create_review_writer(sink):
+    """
+    Create the batched writer for review inserts into rag_chunks.
+    """
+    return BulkWriter("rag_chunks", sink.insert_rag_chunks, unwritten_rows=lambda rows: unstored_rag_chunks(sink, rows))
 
 def is_valid_comment(comment):
     """
@@ -41,153 +160,156 @@ def is_valid_comment(comment):
     
     return True
 
-def get_all_valid_courses(supabase):
+def get_all_valid_courses(sink):
     """
     Get all valid courses from the database.
     """
-    # Query the database for all valid courses
-    valid_courses = supabase.table("courses").select("course_code").execute().data
-    # Extract course codes from the result if the course_code is not 'general_course'
-    valid_course_codes = {course["course_code"] for course in valid_courses if course["course_code"] != "general_course"}
+    # Query the database for all valid course codes, ignoring the 'general_course' entry
+    valid_course_codes = {course_code for course_code in sink.get_course_codes() if course_code != GENERAL_COURSE}
     
     return valid_course_codes
 
 def clean_and_map_course_codes(course_codes, valid_courses):
     """
     Refined two-pass system to clean messy scraped course codes.
+    valid_courses is preferably a CourseCodeIndex built once per run, a plain set is indexed on the fly.
     """
+    if not isinstance(valid_courses, CourseCodeIndex):
+        valid_courses = CourseCodeIndex(valid_courses)
 
-    # --- Step 1: Build valid dept codes, number codes, and derived clean courses ---
-    valid_dept_codes = set()
-    valid_num_codes = set()
-    derived_valid_courses = set()
-
-    valid_courses_no_space = {course.replace(" ", "").upper(): course for course in valid_courses}
-
-    for raw_code in course_codes:
-        cleaned = raw_code.strip().replace(" ", "").upper()
-
-        # Extract prefix and number parts
-        prefix_match = re.match(r"^[A-Z]+", cleaned)
-        number_parts = re.findall(r"\d+", cleaned)
+    return valid_courses.map_course_codes(course_codes)
 
-        if prefix_match:
-            prefix = prefix_match.group(0)
-
-            # Check if prefix matches any valid course
-            for valid in valid_courses:
-                if valid.replace(" ", "").startswith(prefix):
-                    valid_dept_codes.add(prefix)
-                    break
+def graphql_id(type_name, legacy_id):
+    """
+    Build the global GraphQL id of an RMP object (e.g. School-1466), which is base64 encoded.
+    """
+    return base64.b64encode(f"{type_name}-{legacy_id}".encode()).decode()
 
-        for num in number_parts:
-            if len(num) >= 3:
-                num = num[:3]
-                # Try matching this number with known prefixes
-                for dept in valid_dept_codes:
-                    candidate = f"{dept} {num}"
-                    if candidate in valid_courses:
-                        valid_num_codes.add(num)
-                        derived_valid_courses.add(candidate)
+def offset_cursor(offset):
+    """
+    Build the pagination cursor that starts a page at the given offset.
+    RMP uses relay array connection cursors, so the cursor of item n is base64("arrayconnection:n").
+    """
+    return base64.b64encode(f"arrayconnection:{offset - 1}".encode()).decode()
 
-    # --- Step 2: Build mapping ---
-    course_mapping = {}
+class RmpApiError(Exception):
+    """
+    Raised when RMP's API answers with GraphQL errors or a reply that does not have the expected shape.
+    """
 
-    for raw_code in course_codes:
-        matches = []
-        cleaned = raw_code.strip().replace(" ", "").upper()
+def post_graphql(session, query, variables):
+    """
+    Send a GraphQL query within the global request budget and return its data.
+    Rate limiting (429), server errors and timeouts slow every worker down and are retried.
+    Raises RmpApiError for a reply that is not JSON, carries GraphQL errors or has no data.
+    """
+    for attempt in range(REQUEST_RETRIES + 1):
+        RATE_LIMITER.acquire()
+        try:
+            response = session.post(GRAPHQL_URL, json={"query": query, "variables": variables}, headers=GRAPHQL_HEADERS, timeout=REQUEST_TIMEOUT)
+            response.raise_for_status()
+        except requests.RequestException as e:
+            if attempt == REQUEST_RETRIES or not is_retryable_error(e):
+                raise
+            RATE_LIMITER.backoff(get_retry_after(e))
+            continue
+
+        RATE_LIMITER.success()
+        try:
+            payload = response.json()
+        except ValueError as e:
+            raise RmpApiError(f"reply is not JSON: {e}") from e
+        if not isinstance(payload, dict) or payload.get("errors") or payload.get("data") is None:
+            errors = payload.get("errors") if isinstance(payload, dict) else None
+            messages = "; ".join(str(error.get("message", error)) if isinstance(error, dict) else str(error) for error in errors or [])
+            raise RmpApiError(f"reply has no data: {messages or str(payload)[:200]}")
+        return payload["data"]
+
+def fetch_professor_page(session, cursor=None, count=LISTING_PAGE_SIZE):
+    """
+    Fetch one page of the school's professor search results.
+    """
+    variables = {
+        "count": count,
+        "cursor": cursor,
+        "query": {"text": "", "schoolID": graphql_id("School", UNIVERSITY_ID), "fallback": True},
+    }
+    return post_graphql(session, TEACHER_SEARCH_QUERY, variables)["search"]["teachers"]
 
-        # Exact match to known valid courses first
-        if cleaned in valid_courses_no_space:
-            matches.append(valid_courses_no_space[cleaned])
+def professor_from_node(node):
+    """
+    Convert a GraphQL teacher node into the professor dict produced by the listing page.
+    """
+    return {
+        "id": str(node["legacyId"]),
+        "name": f"{node['firstName'].strip()} {node['lastName'].strip()}",
+        "department": node["department"],
+        "school": node["school"]["name"],
+        "overall_rating": f"{node['avgRating']:.1f}" if node["numRatings"] else "N/A",
+        "num_ratings": node["numRatings"],
+        "url": f"{RMP_BASE_URL}/professor/{node['legacyId']}",
+    }
 
-        else:
-            prefix_match = re.match(r"^[A-Z]+", cleaned)
-            number_parts = re.findall(r"\d+", cleaned)
-
-            if prefix_match and number_parts:
-                prefix = prefix_match.group(0)
-                suffix = cleaned[len(prefix):]
-
-                # Try to build full courses
-                idx = 0
-                while idx < len(suffix):
-                    num = suffix[idx:idx+3]
-                    idx += 3
-
-                    for dept in valid_dept_codes:
-                        candidate = f"{dept} {num}"
-                        if candidate in derived_valid_courses:
-                            matches.append(candidate)
-
-            elif cleaned.isdigit() and len(cleaned) == 3:
-                # Just numbers
-                num = cleaned
-                if num in valid_num_codes:
-                    for dept in valid_dept_codes:
-                        candidate = f"{dept} {num}"
-                        if candidate in derived_valid_courses:
-                            matches.append(candidate)
-                else:
-                    matches = None
+def scrape_professors_graphql(testing=True, workers=LISTING_WORKERS, page_size=LISTING_PAGE_SIZE):
+    """
+    Get every professor of the school from RMP's search API, without a browser.
+    The first page gives the total number of results, the remaining pages are then fetched concurrently
+    from their offset cursors and concatenated in order.
+    """
+    session = requests.Session()
 
-            elif cleaned.isalpha():
-                # Only letters (ANAT) => ambiguous
-                matches = None
+    first_page = fetch_professor_page(session, None, page_size)
+    pages = [first_page]
 
-            else:
-                matches = None
+    if not testing:
+        offsets = range(page_size, first_page["resultCount"], page_size)
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            pages.extend(executor.map(lambda offset: fetch_professor_page(session, offset_cursor(offset), page_size), offsets))
 
-        if len(matches) == 1:
-            course_mapping[raw_code] = matches
-        else:
-            course_mapping[raw_code] = None
+        # Professors added while paging: follow the cursors from the last page until the end
+        while pages[-1]["pageInfo"]["hasNextPage"] and pages[-1]["edges"]:
+            pages.append(fetch_professor_page(session, pages[-1]["pageInfo"]["endCursor"], page_size))
 
-    return course_mapping   
+    professors = []
+    seen_professor_ids = set()
+    for page in pages:
+        for edge in page["edges"]:
+            prof = professor_from_node(edge["node"])
+            if prof["id"] not in seen_professor_ids:
+                seen_professor_ids.add(prof["id"])
+                professors.append(prof)
+
+    print(f"Listed {len(professors)} professors from {len(pages)} pages")
+    return professors
 
-def detect_sentiment(text):
+def scrape_professors(sink, testing=True, mode=LISTING_MODE, driver_pool=None):
     """
-    Determine the sentiment of a given text using TextBlob.
-    returns a sentiment_score (float between -1 and 1) and a sentiment_label (very positive, positive, neutral, negative, very negative).
+    Get the professors of the school, through the search API (mode "graphql") or the search page in a browser (mode "selenium").
     """
-    blob = TextBlob(text)
-    sentiment_score = blob.sentiment.polarity
-    if sentiment_score > 0.5:
-        sentiment_label = "very positive"
-    elif sentiment_score > 0.2:
-        sentiment_label = "positive"
-    elif sentiment_score < -0.5:
-        sentiment_label = "very negative"
-    elif sentiment_score < -0.2:
-        sentiment_label = "negative"
+    if mode == "graphql":
+        professors = scrape_professors_graphql(testing)
     else:
-        sentiment_label = "neutral"
+        professors = scrape_professors_selenium(testing, driver_pool)
 
-    return sentiment_score, sentiment_label
+    # Professors are supposed to be unique according to the name
+    professors = {prof["name"]: prof for prof in professors}.values()
 
-def scrape_professors(supabase, testing=True):
-    url = f"https://www.ratemyprofessors.com/search/professors/{UNIVERSITY_ID}?q=*"
+    return professors
 
-    options = Options()
-    options.add_argument("--headless")
-    options.add_argument("--disable-gpu")
-    options.add_argument("--no-sandbox")
-    options.add_argument("--log-level=3")
-    driver = webdriver.Chrome(options=options)
+def scrape_professors_selenium(testing=True, driver_pool=None):
+    url = f"{RMP_BASE_URL}/search/professors/{UNIVERSITY_ID}?q=*"
 
     professors = []
     seen_professor_ids = set()
     previous_count = 0
     
-    try:
+    with pooled_driver(driver_pool) as driver:
+        RATE_LIMITER.acquire()
         driver.get(url)
-        WebDriverWait(driver, 10).until(
-            EC.presence_of_element_located((By.CLASS_NAME, "TeacherCard__StyledTeacherCard-syjs0d-0"))
-        )
+        wait_for(driver, "professor cards",
+                 EC.presence_of_element_located((By.CLASS_NAME, "TeacherCard__StyledTeacherCard-syjs0d-0")), required=True)
 
         while True:
-            time.sleep(1)  # tiny wait to avoid rapid clicking
-
             # Get professor cards
             professor_cards = driver.find_elements(By.CLASS_NAME, "TeacherCard__StyledTeacherCard-syjs0d-0")
             for card in professor_cards[previous_count:]:
@@ -204,7 +326,7 @@ def scrape_professors(supabase, testing=True):
                     
                     # Make URL absolute if needed
                     if prof_url.startswith("/"):
-                        prof_url = f"https://www.ratemyprofessors.com{prof_url}"
+                        prof_url = f"{RMP_BASE_URL}{prof_url}"
 
                     prof_id = prof_url.rstrip('/').split('/')[-1]
 
@@ -234,6 +356,7 @@ def scrape_professors(supabase, testing=True):
                 
                 # Safety: check if it's visible and enabled
                 if show_more_button.is_displayed() and show_more_button.is_enabled():
+                    RATE_LIMITER.acquire()
                     show_more_button.click()
                     # print("Clicked 'Show More'")
                 else:
@@ -248,29 +371,29 @@ def scrape_professors(supabase, testing=True):
             if testing and len(professors) > 20:
                 break
 
-    finally:
-        driver.quit()
-
-    # Professors are supposed to be unique according to the name
-    professors = {prof["name"]: prof for prof in professors}.values()
+            # Wait for the click to append cards
+            if not wait_for(driver, "more professor cards",
+                            element_count_above((By.CLASS_NAME, "TeacherCard__StyledTeacherCard-syjs0d-0"), previous_count)):
+                print("No new professor cards after 'Show More', stopping")
+                break
 
     return professors
 
 def normalize_comment(text):
     return re.sub(r"\s+", " ", text.strip().lower())    
 
-def to_scrape_professor(supabase, professors):
+def to_scrape_professor(sink, professors):
     '''
     Returns a list of the professors that need to be scraped.    
     '''
     professors_to_scrape = []
     
     # Query the database for the professors that have already been scraped - from the professors table get the name, num_ratings, latest_comment_date - ignore the entry where the name is 'general_professor'
-    previous_professors = supabase.table("professors").select("name, num_ratings, latest_comment_date").execute().data
+    previous_professors = sink.get_professors(["name", "num_ratings", "latest_comment_date"])
     previous_professors_dict = {
         prof["name"]: (prof["num_ratings"], prof["latest_comment_date"])
         for prof in previous_professors
-        if prof["name"] != "general_prof"
+        if prof["name"] != GENERAL_PROF
     }
 
     # Iterate through the professors scraped from the website
@@ -281,11 +404,14 @@ def to_scrape_professor(supabase, professors):
             if prof["num_ratings"] != previous_professors_dict[prof["name"]][0]:
                 # Also, attach the latest_comment_date to the professor object
                 prof["latest_comment_date"] = previous_professors_dict[prof["name"]][1]
+                # Number of ratings added (or removed) since the last scrape, used to prioritize the professors
+                prof["num_ratings_delta"] = abs(prof["num_ratings"] - (previous_professors_dict[prof["name"]][0] or 0))
                 professors_to_scrape.append(prof)
         else:
             # If the professor is not in the database, we need to scrape it
             # Since they have not been scraped before, we can assume the latest_comment_date is None
             prof["latest_comment_date"] = None
+            prof["num_ratings_delta"] = prof["num_ratings"]
             professors_to_scrape.append(prof)
             
     return professors_to_scrape
@@ -294,60 +420,395 @@ def safe_float(text):
     try:
         return float(text)
     except (ValueError, TypeError):
-        return None 
+        return None
 
-def scrape_professor_comments(supabase, prof, valid_courses):
+def graphql_date(text):
     """
-    Given a professor object scrape detailed rating information.
+    Convert an RMP API timestamp (e.g. "2023-04-12 18:33:19 +0000 UTC") to the ISO date shown on the page.
     """
-    
-    # --- Set up headless Chrome ---
-    options = Options()
-    options.add_argument("--headless")
-    options.add_argument("--disable-gpu")
-    options.add_argument("--no-sandbox")
-    options.add_argument("--log-level=3")
+    return datetime.strptime(text[:10], "%Y-%m-%d").date().isoformat()
+
+def fetch_professor_ratings_page(session, prof, cursor=None, count=RATINGS_PAGE_SIZE):
+    """
+    Fetch the professor's summary, course list and one page of ratings (newest first).
+    Returns None if RMP has no teacher with this id.
+    """
+    variables = {"count": count, "id": graphql_id("Teacher", prof["id"]), "courseFilter": None, "cursor": cursor}
+    return post_graphql(session, RATINGS_LIST_QUERY, variables)["node"]
+
+def professor_summary_from_teacher(teacher):
+    """
+    Get the overall rating, % would take again, difficulty and top tags as they are displayed on the professor page.
+    """
+    would_take_again = teacher["wouldTakeAgainPercent"]
+    top_tags = sorted(teacher["teacherRatingTags"] or [], key=lambda tag: tag["tagCount"], reverse=True)[:TOP_TAGS_COUNT]
+
+    return {
+        "overall_rating": safe_float(f"{teacher['avgRating']:.1f}") if teacher["avgRating"] is not None else None,
+        # -1 means no rating answered the question, the page shows "N/A"
+        "percent_retake": float(int(would_take_again + 0.5)) if would_take_again is not None and would_take_again >= 0 else None,
+        "level_of_difficulty": safe_float(f"{teacher['avgDifficulty']:.1f}") if teacher["avgDifficulty"] is not None else None,
+        "professor_tags": [tag["tagName"].strip() for tag in top_tags],
+    }
+
+def rating_from_node(node, summary):
+    """
+    Convert a GraphQL rating node into the rating read from a review card on the page.
+    The quality shown on the card is the average of the clarity and helpfulness ratings.
+    """
+    if node["clarityRating"] is not None and node["helpfulRating"] is not None:
+        quality = (node["clarityRating"] + node["helpfulRating"]) / 2
+    else:
+        quality = summary["overall_rating"]  # fallback
+
+    if node["difficultyRating"] is not None:
+        difficulty = float(node["difficultyRating"])
+    else:
+        difficulty = summary["level_of_difficulty"]  # fallback
+
+    return {
+        "date": graphql_date(node["date"]),
+        "course": (node["class"] or "").strip(),
+        "quality": quality,
+        "difficulty": difficulty,
+        "comment": html.unescape(node["comment"] or "").strip(),
+        "tags": [tag.strip() for tag in (node["ratingTags"] or "").split("--") if tag.strip()],
+    }
+
+def iter_ratings_graphql(session, prof, teacher, summary):
+    """
+    Yield the professor's ratings, newest first, following the ratings cursor one page at a time.
+    Pages are only requested when the previous one has been consumed, so stopping early skips them.
+    """
+    ratings = teacher["ratings"]
+    while True:
+        for edge in ratings["edges"]:
+            yield rating_from_node(edge["node"], summary)
+
+        if not ratings["pageInfo"]["hasNextPage"] or not ratings["edges"]:
+            return
+        teacher = fetch_professor_ratings_page(session, prof, ratings["pageInfo"]["endCursor"])
+        if teacher is None:
+            raise RmpApiError(f"teacher {prof['id']} disappeared while paging its ratings")
+        ratings = teacher["ratings"]
+
+def parse_review_block(block, summary):
+    """
+    Read the rating of a review card (li of the ratings list). Returns None for ads and unreadable cards.
+    """
+    # Check if it is not an ad
+    rating_div = block.select_one("div.Rating__StyledRating-sc-1rhvpxz-1")
+    if not rating_div:
+        return None
+
+    try:
+        # Get the date
+        date = block.select_one("div.TimeStamp__StyledTimeStamp-sc-9q2r30-0").text.strip()
+        # Remove the "th", "st", "nd", "rd" from the date string
+        date = re.sub(r"(\d+)(st|nd|rd|th)", r"\1", date)
+        # Convert the date to a datetime object
+        date = datetime.strptime(date, "%b %d, %Y").date().isoformat()
+
+        scraped_course_code = block.select_one("div.RatingHeader__StyledClass-sc-1dlkqw1-3").text.strip()
+
+        quality_elem = block.select_one("div.CardNumRating__CardNumRatingNumber-sc-17t4b9u-2.ERCLc")
+        difficulty_elem = block.select_one("div.CardNumRating__CardNumRatingNumber-sc-17t4b9u-2.eBKGNg")
+
+        if quality_elem:
+            quality = float(quality_elem.text.strip())
+        else:
+            quality = summary["overall_rating"]  # fallback
+
+        if difficulty_elem:
+            difficulty = float(difficulty_elem.text.strip())
+        else:
+            difficulty = summary["level_of_difficulty"]  # fallback
+
+        comment = block.select_one("div.Comments__StyledComments-dzzyvm-0").text.strip()
+
+        tag_spans = block.select("span.Tag-bs9vf4-0")
+        review_tags = [tag.text.strip() for tag in tag_spans]
+
+    except Exception as e:
+        print(f"Skipping one review, error: {e}")
+        return None
 
-    driver = webdriver.Chrome(options=options)
-    driver.set_page_load_timeout(20)
+    return {
+        "date": date,
+        "course": scraped_course_code,
+        "quality": quality,
+        "difficulty": difficulty,
+        "comment": comment,
+        "tags": review_tags,
+    }
+
+def fetch_new_review_blocks(driver, start):
+    """
+    Read the review cards (li of the ratings list) from index start on, straight from the live DOM.
+    Each card is parsed on its own, so a click on "Load More Ratings" only costs the cards it appended.
+    """
+    items_html = driver.execute_script(NEW_RATING_ITEMS_SCRIPT, start) or []
+    return [BeautifulSoup(item_html, HTML_PARSER).li for item_html in items_html]
+
+def iter_ratings_selenium(driver, soup, summary):
+    """
+    Yield the ratings of the review cards on the page, newest first, clicking "Load More Ratings" when they run out.
+    The cards of the first page come from soup, the cards appended by each click are read incrementally from the DOM.
+    """
+    # --- Extract Student Reviews ---
+    reviews_list = soup.select_one("ul#ratingsList")
+    review_items = reviews_list.select("li") if reviews_list else []
+    parsed_count = 0
+
+    while True:
+        parsed_count += len(review_items)
+
+        # Loop through the reviews not seen yet
+        for block in review_items:
+            rating = parse_review_block(block, summary)
+            if rating:
+                yield rating
+
+        # Check for "Load More Ratings" button
+        try:
+            load_more_button = driver.find_element(By.XPATH, "//button[contains(text(), 'Load More Ratings')]")
+
+            # Safety: check if it's visible and enabled
+            if load_more_button.is_displayed() and load_more_button.is_enabled():
+                RATE_LIMITER.acquire()
+                load_more_button.click()
+                # print("Clicked 'Load More Ratings'")
+            else:
+                # print("'Load More Ratings' button not clickable anymore.")
+                return
+        except NoSuchElementException:
+            # print("No 'Load More Ratings' button found at all.")
+            return
+
+        # Wait for the click to append cards, then read only those
+        if not wait_for(driver, "more ratings", element_count_above((By.CSS_SELECTOR, "ul#ratingsList li"), parsed_count)):
+            print("No new ratings after 'Load More Ratings', stopping")
+            return
+        review_items = fetch_new_review_blocks(driver, parsed_count)
+
+def build_review_records(prof, ratings, course_code_mappings, existing_keys):
+    """
+    Turn the professor's ratings (newest first, from either fetcher) into review records.
+    Stops at the first rating that is not newer than the professor's latest_comment_date,
+    and skips invalid comments and reviews that are already stored (their dedup_key is in existing_keys) or seen.
+    Sentiment is scored by SENTIMENT_SERVICE in the background, one batch per page of reviews,
+    while the next pages are fetched.
+    """
+    reviews = []
+    seen_reviews_set = set()
+    sentiment_futures = []
+    comments_to_score = []
+
+    for rating in ratings:
+        try:
+            date = rating["date"]
+
+            # Check to see if the date is more recent than the latest comment date
+            if prof["latest_comment_date"] is not None:
+                if date <= prof["latest_comment_date"]:
+                    break
+
+            # Get the mapped course code
+            course_codes = course_code_mappings[rating["course"]]
+
+            comment = rating["comment"]
+
+            # Check to see if the review is valid
+            if not is_valid_comment(comment):
+                continue
+
+            if not course_codes:
+                course_codes = [GENERAL_COURSE]
+
+            # Check to see if the review is a duplicate
+            normalized_comment = normalize_comment(comment)
+            review_key = dedup_key(normalized_comment, date)
+            if review_key in existing_keys or review_key in seen_reviews_set:
+                continue
+            seen_reviews_set.add(review_key)
+
+            parsed_review = {
+                "date": date,
+                "quality": rating["quality"],
+                "difficulty": rating["difficulty"],
+                "comment": normalized_comment,
+                "tags": rating["tags"],
+                "sentiment_score": None,
+                "sentiment_label": None,
+                "course_code": course_codes[0],
+                "dedup_key": review_key,
+            }
+
+            reviews.append(parsed_review)
+            comments_to_score.append(comment)
+            if len(comments_to_score) >= RATINGS_PAGE_SIZE:
+                sentiment_futures.append(SENTIMENT_SERVICE.submit(comments_to_score))
+                comments_to_score = []
+
+        except Exception as e:
+            print(f"Skipping one review, error: {e}")
+
+    if comments_to_score:
+        sentiment_futures.append(SENTIMENT_SERVICE.submit(comments_to_score))
+
+    scores = [score for future in sentiment_futures for score in future.result()]
+    for review, (sentiment_score, sentiment_label) in zip(reviews, scores):
+        review["sentiment_score"] = sentiment_score
+        review["sentiment_label"] = sentiment_label
+
+    return reviews
+
+def store_professor_ratings(sink, prof, summary, all_courses, ratings, valid_courses, professor_writer, review_writer):
+    """
+    Build the professor row and the review records from what a fetcher read, and write them (reviews first).
+    all_courses holds the course names listed for the professor, ratings is an iterable of ratings (newest first).
+    """
+    has_reviews = prof["num_ratings"] > 0
+
+    # The page shows no numbers for a professor without reviews
+    overall_rating = summary["overall_rating"] if has_reviews else None
+    percent_take_again = summary["percent_retake"] if has_reviews else None
+    level_of_difficulty = summary["level_of_difficulty"] if has_reviews else None
+
+    course_code_mappings = clean_and_map_course_codes(all_courses, valid_courses)
+
+    # Get the dedup keys of the stored comments that could be read again: only reviews posted after
+    # latest_comment_date are kept, so older comments are not fetched (stored reviews above it come from an interrupted run)
+    existing_keys = sink.existing_keys("dedup_key", since=prof["latest_comment_date"], professor_name=prof["name"])
+
+    # If the prof has no reviews, there is nothing to read
+    reviews = build_review_records(prof, ratings, course_code_mappings, existing_keys) if has_reviews else []
+
+    date = None
+    if len(reviews) > 0:
+        date = reviews[0]["date"]
+
+    # Update the professor object with the scraped data
+    updated_prof = {
+        "id": prof["id"],
+        "name": prof["name"],
+        "overall_rating": overall_rating,
+        "percent_retake": percent_take_again,
+        "level_of_difficulty": level_of_difficulty,
+        "professor_tags": summary["professor_tags"],
+        "latest_comment_date": date,
+        "num_ratings": prof["num_ratings"],
+        "url": prof["url"],
+    }
+
+    # Insert the reviews into the database
+    if reviews:
+        comment_data_batch = []
+        for review in reviews:
+            comment_data = {
+                "text": review["comment"],
+                "source": "ratemyprofessors",
+                "course_code": review["course_code"],
+                "professor_name": prof["name"],
+                "source_url": prof["url"],
+                "tags": review["tags"],
+                "created_at": review["date"],
+                "quality_rating": review["quality"],
+                "sentiment_score": review["sentiment_score"],
+                "sentiment_label": review["sentiment_label"],
+                "difficulty_rating": review["difficulty"],
+                "dedup_key": review["dedup_key"],
+            }
+            comment_data_batch.append(comment_data)
+
+        review_writer.write(comment_data_batch)
+        print(f"Inserted {len(comment_data_batch)} reviews for {prof['name']}")
+    else:
+        print(f"No reviews found for {prof['name']}")
+
+    # The professor row goes last: its latest_comment_date only moves forward once the reviews before it are stored
+    professor_writer.write([updated_prof])
+    return True
+
+def scrape_professor_comments(sink, prof, valid_courses, professor_writer=None, review_writer=None, mode=RATINGS_MODE, session=None, driver_pool=None):
+    """
+    Given a professor object scrape detailed rating information.
+    The ratings come from RMP's API (mode "graphql") or from the professor page in a browser (mode "selenium").
+    The professor and its reviews are written synchronously through the given writers (retried on 429/5xx).
+    Returns True once they are written, None if the professor was skipped.
+    """
+    professor_writer = professor_writer or create_professor_writer(sink)
+    review_writer = review_writer or create_review_writer(sink)
 
     # Log Message
     print(f"Scraping comments for {prof['name']}...")
     # print url
     print(prof["url"])
 
+    if mode == "graphql":
+        return scrape_professor_comments_graphql(sink, prof, valid_courses, professor_writer, review_writer, session or requests.Session())
+    else:
+        return scrape_professor_comments_selenium(sink, prof, valid_courses, professor_writer, review_writer, driver_pool)
+
+def scrape_professor_comments_graphql(sink, prof, valid_courses, professor_writer, review_writer, session):
+    """
+    Read the professor's ratings through RMP's GraphQL API, without a browser.
+    """
     try:
+        teacher = fetch_professor_ratings_page(session, prof)
+    except requests.RequestException as e:
+        print(f"Error while loading the ratings of {prof['name']}: {e}. Skipping...")
+        return
+
+    if teacher is None:
+        print(f"No RMP profile found for {prof['url']}. Skipping...")
+        return
+
+    summary = professor_summary_from_teacher(teacher)
+
+    # All of the courses that the professor has been reviewed on
+    all_courses = set()
+    for course in teacher["courseCodes"] or []:
+        cleaned = course["courseName"].strip()
+        if cleaned and cleaned.lower() != "all courses":
+            all_courses.add(cleaned)
+
+    ratings = iter_ratings_graphql(session, prof, teacher, summary)
+    return store_professor_ratings(sink, prof, summary, all_courses, ratings, valid_courses, professor_writer, review_writer)
+
+def scrape_professor_comments_selenium(sink, prof, valid_courses, professor_writer, review_writer, driver_pool=None):
+    """
+    Read the professor's ratings from the professor page in a headless Chrome.
+    """
+    # Borrow a headless Chrome, its cookies and cache are cleared when it goes back to the pool
+    with pooled_driver(driver_pool) as driver:
+        RATE_LIMITER.acquire()
         try:
             driver.get(prof["url"])
         except TimeoutException:
+            RATE_LIMITER.backoff()
             print(f"Timeout while loading {prof['url']}. Skipping...")
             return
-        
-        WebDriverWait(driver, 5).until(
-            EC.presence_of_element_located((By.CLASS_NAME, "RatingValue__Numerator-qw8sqy-2"))
-        )
-        soup = BeautifulSoup(driver.page_source, "html.parser")
 
-        has_reviews = prof["num_ratings"] > 0
+        wait_for(driver, "professor page",
+                 EC.presence_of_element_located((By.CLASS_NAME, "RatingValue__Numerator-qw8sqy-2")), timeout=5, required=True)
+        soup = BeautifulSoup(driver.page_source, HTML_PARSER)
 
         # Extract items from the professors page
 
         # 1) Overall Rating
         rating_elem = soup.select_one("div.RatingValue__Numerator-qw8sqy-2")
-        overall_rating = None
-        if has_reviews:
-            text = rating_elem.text.strip() if rating_elem else None
-            overall_rating = safe_float(text)
+        text = rating_elem.text.strip() if rating_elem else None
+        overall_rating = safe_float(text)
 
         # 2) % would take again and overall difficulty rating
         feedback_numbers = soup.select("div.FeedbackItem__FeedbackNumber-uof32n-1")
         percent_take_again = None
         level_of_difficulty = None
-        if has_reviews:
-            if len(feedback_numbers) > 0:
-                percent_take_again = safe_float(feedback_numbers[0].text.strip('%'))
-            if len(feedback_numbers) > 1:
-                level_of_difficulty = safe_float(feedback_numbers[1].text.strip())
+        if len(feedback_numbers) > 0:
+            percent_take_again = safe_float(feedback_numbers[0].text.strip('%'))
+        if len(feedback_numbers) > 1:
+            level_of_difficulty = safe_float(feedback_numbers[1].text.strip())
 
         # 3) Top Tags
         top_tags = [
@@ -355,16 +816,23 @@ def scrape_professor_comments(supabase, prof, valid_courses):
             for tag in soup.select("div.TeacherTags__TagsContainer-sc-16vmh1y-0 span.Tag-bs9vf4-0")
         ]
 
+        summary = {
+            "overall_rating": overall_rating,
+            "percent_retake": percent_take_again,
+            "level_of_difficulty": level_of_difficulty,
+            "professor_tags": top_tags,
+        }
+
         # 4) All of the courses that the professor has been reviewed on
         # Find the dropdown div and click it to open
         dropdown_button = driver.find_element(By.CLASS_NAME, "Select__getDropdownIndicator-sc-9f4k3m-0")
         dropdown_button.click()
 
-        # After clicking the dropdown
-        time.sleep(1)  # Wait for animation to open (can also do WebDriverWait instead)
-
-        # Scrape all course options
-        course_menu = driver.find_element(By.CLASS_NAME, "css-1ogydhz-menu")
+        # Wait for the menu to open, then scrape all course options
+        course_menu = wait_for(driver, "course menu", EC.visibility_of_element_located((By.CLASS_NAME, "css-1ogydhz-menu")))
+        if course_menu is None:
+            print(f"Course menu did not open for {prof['name']}. Skipping...")
+            return
         menu_text = course_menu.text
         # split if by newlines
         raw_courses = menu_text.split("\n")
@@ -375,191 +843,145 @@ def scrape_professor_comments(supabase, prof, valid_courses):
             if cleaned and cleaned.lower() != "all courses":
                 all_courses.add(cleaned)
 
-        course_code_mappings = clean_and_map_course_codes(all_courses, valid_courses)
-
-        # Get all of the previous comments from the database
-        response = supabase.table("rag_chunks").select("text", "created_at").eq("professor_name", prof["name"]).execute()
-        existing_reviews_set = set((r["text"].strip(), r["created_at"]) for r in response.data)
-        seen_reviews_set = set()
-        
-        # Start loopin through all of the comments
-        reviews = []
-        stop_scraping = False
-
-        while True:
-            time.sleep(1)
-
-            # If the prof has no reviews, skip to the next one
-            if not has_reviews:
-                break
-
-            # --- Extract Student Reviews ---
-            reviews_list = soup.select_one("ul#ratingsList")
-            review_items = reviews_list.select("li") if reviews_list else []
-            
-            # Loop through all of the reviews
-            for block in review_items:
-                # Check if it is not an ad
-                rating_div = block.select_one("div.Rating__StyledRating-sc-1rhvpxz-1")
-
-                if rating_div:
-                    try:
-                        # Get the date
-                        date = block.select_one("div.TimeStamp__StyledTimeStamp-sc-9q2r30-0").text.strip()
-                        # Remove the "th", "st", "nd", "rd" from the date string
-                        date = re.sub(r"(\d+)(st|nd|rd|th)", r"\1", date)
-                        # Convert the date to a datetime object
-                        date = datetime.strptime(date, "%b %d, %Y").date().isoformat()
-
-                        # Check to see if the date is more recent than the latest comment date
-
-                        if prof["latest_comment_date"] is not None:
-                            if date <= prof["latest_comment_date"]:
-                                stop_scraping = True
-                                break
-
-                        # Get the mapped course code
-                        scraped_course_code = block.select_one("div.RatingHeader__StyledClass-sc-1dlkqw1-3").text.strip()
-                        course_codes = course_code_mappings[scraped_course_code]
-                        
-                        quality_elem = block.select_one("div.CardNumRating__CardNumRatingNumber-sc-17t4b9u-2.ERCLc")
-                        difficulty_elem = block.select_one("div.CardNumRating__CardNumRatingNumber-sc-17t4b9u-2.eBKGNg")
-
-                        if quality_elem:
-                            quality = float(quality_elem.text.strip())
-                        else:
-                            quality = overall_rating  # fallback
-                        
-                        if difficulty_elem:
-                            difficulty = float(difficulty_elem.text.strip())
-                        else:
-                            difficulty = level_of_difficulty  # fallback
-                        
-                        comment = block.select_one("div.Comments__StyledComments-dzzyvm-0").text.strip()
-                        
-                        # Check to see if the review is valid
-                        if not is_valid_comment(comment):
-                            continue
-
-                        sentiment_score, sentiment_label = detect_sentiment(comment)
-                    
-                        tag_spans = block.select("span.Tag-bs9vf4-0")
-                        review_tags = [tag.text.strip() for tag in tag_spans]
-
-                        if not course_codes:
-                            course_codes = ["general_course"]
-
-                        # Check to see if the review is a duplicate
-                        normalized_comment = normalize_comment(comment)
-                        if (normalized_comment, date) in existing_reviews_set or (normalized_comment, date) in seen_reviews_set:
-                            continue
-                        seen_reviews_set.add((normalized_comment, date))
-
-                        parsed_review = {
-                            "date": date,
-                            "quality": quality,
-                            "difficulty": difficulty,
-                            "comment": normalized_comment,
-                            "tags": review_tags,
-                            "sentiment_score": sentiment_score,
-                            "sentiment_label": sentiment_label,
-                            "course_code": course,
-                        }
-
-                        reviews.append(parsed_review)
-                        
-                    except Exception as e:
-                        print(f"Skipping one review, error: {e}")
-            if stop_scraping:
-                break
-            # Check for "Load More Ratings" button
-            try:
-                load_more_button = driver.find_element(By.XPATH, "//button[contains(text(), 'Load More Ratings')]")
-                
-                # Safety: check if it's visible and enabled
-                if load_more_button.is_displayed() and load_more_button.is_enabled():
-                    load_more_button.click()
-                    # print("Clicked 'Load More Ratings'")
-                else:
-                    # print("'Load More Ratings' button not clickable anymore.")
-                    break
-            except NoSuchElementException:
-                # print("No 'Load More Ratings' button found at all.")
-                break
-
-        date = None
-        if len(reviews) > 0:
-            date = reviews[0]["date"]
-        
-        # Update the professor object with the scraped data
-        updated_prof = {
-            "id": prof["id"],
-            "name": prof["name"],
-            "overall_rating": overall_rating,
-            "percent_retake": percent_take_again,
-            "level_of_difficulty": level_of_difficulty,
-            "professor_tags": top_tags,
-            "latest_comment_date": date,
-            "num_ratings": prof["num_ratings"],
-            "url": prof["url"],
-        }
-        
-        supabase.table("professors").upsert(updated_prof, on_conflict=["id"]).execute()
-
-        # Insert the reviews into the database
-        if reviews:
-            comment_data_batch = []
-            for review in reviews:
-                comment_data = {
-                    "text": review["comment"],
-                    "source": "ratemyprofessors",
-                    "course_code": review["course_code"],
-                    "professor_name": prof["name"],
-                    "source_url": prof["url"],
-                    "tags": review["tags"],
-                    "created_at": review["date"],
-                    "quality_rating": review["quality"],
-                    "sentiment_score": review["sentiment_score"],
-                    "sentiment_label": review["sentiment_label"],
-                    "difficulty_rating": review["difficulty"],
-                }
-                comment_data_batch.append(comment_data)
-
-            supabase.table("rag_chunks").insert(comment_data_batch).execute()
-            print(f"Inserted {len(comment_data_batch)} reviews for {prof['name']}")
-        else:
-            print(f"No reviews found for {prof['name']}")
-
-    finally:
-        driver.quit()
+        ratings = iter_ratings_selenium(driver, soup, summary)
+        return store_professor_ratings(sink, prof, summary, all_courses, ratings, valid_courses, professor_writer, review_writer)
 
+def read_journal(entries):
+    """
+    Get what an interrupted run recorded in its journal: the professor listing, the worklist
+    (None when the run stopped before recording them) and the ids of the professors already committed.
+    """
+    listing = next((entry["professors"] for entry in entries if entry["type"] == "listing"), None)
+    worklist = next((entry["professors"] for entry in entries if entry["type"] == "worklist"), None)
+    committed_ids = {entry["id"] for entry in entries if entry["type"] == "committed"}
+    return listing, worklist, committed_ids
     
 
 
 if __name__ == "__main__":
-    # Create Supabase client
-    supabase = create_supabase_client()
+    parser = argparse.ArgumentParser(description="Scrape professors and their reviews from RateMyProfessors.")
+    parser.add_argument("--resume", action="store_true", help="continue the run recorded in the checkpoint journal, if any")
+    args = parser.parse_args()
+
+    # Sentiment is scored in worker processes, started before any other thread.
+    # Scores are cached on disk by text, so reviews seen by a previous run are not scored again
+    analysis_cache = AnalysisCache()
+    SENTIMENT_SERVICE = SentimentService(cache=analysis_cache)
+
+    # Create the storage sink (Supabase unless STORAGE_BACKEND says otherwise)
+    sink = create_sink()
+
+    # Chunks stored before the dedup_key column existed get their key, reviews are deduplicated by it
+    backfilled = sink.backfill_dedup_keys()
+    if backfilled:
+        print(f"Backfilled the dedup_key of {backfilled} stored chunks")
+
+    # Long-lived browsers shared by every Selenium page, only started when a selenium mode is used
+    driver_pool = DriverPool(size=PROFESSOR_WORKERS) if "selenium" in (LISTING_MODE, RATINGS_MODE) else None
+
+    # Entries recorded by an interrupted run, only used with --resume
+    journal = CheckpointJournal(JOURNAL_PATH)
+    entries = journal.load() if args.resume else []
+    listing, worklist, committed_ids = read_journal(entries)
+    journal.open(reset=not entries)
+
+    if worklist is not None:
+        # Resume: the listing and the worklist were recorded, skip the professors already committed
+        professors_to_scrape = [prof for prof in worklist if prof["id"] not in committed_ids]
+        print(f"Resuming: {len(committed_ids)} professors already committed, {len(professors_to_scrape)} left")
+    else:
+        # Get all of the professors from the website
+        if listing is not None:
+            professors = listing
+            print(f"Resuming from the recorded listing of {len(professors)} professors")
+        else:
+            professors = list(scrape_professors(sink, testing=False, driver_pool=driver_pool))
+            journal.append("listing", professors=professors)
 
-    # Get all of the professors from the website
-    professors = scrape_professors(supabase, testing=False)
+        # Get the professors that need to be scraped
+        professors_to_scrape = to_scrape_professor(sink, professors)
+        journal.append("worklist", professors=professors_to_scrape)
 
-    # Get the professors that need to be scraped
-    professors_to_scrape = to_scrape_professor(supabase, professors)
     count_professors_to_scrape = len(professors_to_scrape)
     print(f"Number of professors to scrape: {count_professors_to_scrape}")
 
-    # Get all of the valid courses from the database
-    valid_courses = get_all_valid_courses(supabase)
-
-    # Iterate through the professors that need to be scraped
-    scraped_count = 0
-    for prof in professors_to_scrape:
-        scrape_professor_comments(supabase, prof, valid_courses)
-        # Print what the current count is, and the remaining profs to be scraped
-        scraped_count += 1
-        print(f"Scraped {scraped_count}/{count_professors_to_scrape} professors")
-        # Sleep for a bit to avoid being blocked
-        time.sleep(1)
+    # Get all of the valid courses from the database, indexed once for the course code mapping of every professor.
+    # Label resolutions are memoized across professors and runs (the cache resets when the catalog changes)
+    valid_courses = CourseLabelCache(get_all_valid_courses(sink))
+
+    # Writers shared by every professor, resend the batches that failed on a previous run first
+    professor_writer = create_professor_writer(sink)
+    review_writer = create_review_writer(sink)
+    professor_writer.replay_failed_batches()
+    review_writer.replay_failed_batches()
+
+    # Keep-alive connection reused for every API request
+    session = requests.Session()
+
+    # Scrape the professors with the most new ratings first, in parallel.
+    # The request rate is bounded by RATE_LIMITER (shared by every worker), which slows down when RMP pushes back
+    professors_to_scrape = sorted(professors_to_scrape, key=lambda prof: prof["num_ratings_delta"], reverse=True)
+    progress = Progress(count_professors_to_scrape, "professors")
+
+    failed_professors = []
+    failure_reasons = Counter()
+    finished = [0]
+    failure_lock = threading.Lock()
+    stopped = threading.Event()
+
+    def scrape_professor(prof):
+        # Stopped because too many professors failed, the professors left are scraped by --resume
+        if stopped.is_set():
+            return
+
+        # The writes are synchronous, the professor is only journaled as committed once they succeeded.
+        # A failure (network error on a later ratings page, unexpected reply, failed write) only skips this professor:
+        # it is not journaled, the journal is kept and the run exits with an error, so re-running the job retries it
+        failure_reason = None
+        try:
+            if scrape_professor_comments(sink, prof, valid_courses, professor_writer, review_writer, session=session, driver_pool=driver_pool):
+                journal.append("committed", id=prof["id"])
+        except Exception as e:
+            failure_reason = type(e).__name__
+            print(f"Error scraping {prof['name']}, skipping: {failure_reason}: {e}")
+
+        with failure_lock:
+            finished[0] += 1
+            if failure_reason is not None:
+                failed_professors.append(prof["name"])
+                failure_reasons[failure_reason] += 1
+            failure_rate = len(failed_professors) / finished[0]
+            if finished[0] >= FAILURE_RATE_MIN_PROFESSORS and failure_rate > MAX_FAILURE_RATE and not stopped.is_set():
+                print(f"Stopping: {len(failed_professors)} of {finished[0]} professors failed ({failure_rate:.0%}), {dict(failure_reasons)}")
+                stopped.set()
+        progress.step(prof["name"])
+
+    with ThreadPoolExecutor(max_workers=PROFESSOR_WORKERS) as executor:
+        list(executor.map(scrape_professor, professors_to_scrape))
+
+    professor_writer.close()
+    review_writer.close()
+    if driver_pool:
+        driver_pool.close()
+        WAIT_METRICS.print_stats()
+    print(f"RMP requests: {RATE_LIMITER.stats['requests']}, {RATE_LIMITER.stats['backoffs']} backoffs, final rate {RATE_LIMITER.rate:.2f}/sec")
+
+    valid_courses.save()
+    valid_courses.print_stats()
+    SENTIMENT_SERVICE.close()
+    analysis_cache.print_stats()
+    analysis_cache.close()
+
+    # Keep the journal of a run with failed professors, re-running it with --resume retries only those
+    if failed_professors:
+        journal.close()
+        not_scraped = count_professors_to_scrape - finished[0]
+        raise SystemExit(f"Failed to scrape {len(failed_professors)} of {finished[0]} professors {dict(failure_reasons)}"
+                         f"{f', stopped before the {not_scraped} left' if not_scraped else ''}. "
+                         f"The journal is kept for --resume: {', '.join(failed_professors[:10])}")
+
+    # The run is complete, the next run starts from a fresh listing
+    journal.remove()
 
     print("Scraping complete") 
     
\ No newline at end of file
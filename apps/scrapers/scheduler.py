@@ -0,0 +1,90 @@
+import time
+import threading
+from datetime import timedelta
+
+class TokenBucket:
+    """
+    Thread-safe token bucket shared by every worker that calls a rate-limited site.
+
+    acquire() blocks until a request may be sent, so all workers together stay under `rate` requests per second
+    (with bursts of at most `burst` requests). The rate adapts to the site's answers (AIMD):
+    backoff() halves it and pauses every worker, after a 429, a 5xx or a timeout,
+    success() raises it again in small steps, up to the configured rate.
+    """
+
+    def __init__(self, rate, burst=None, min_rate=0.2):
+        self.max_rate = rate
+        self.min_rate = min(min_rate, rate)
+        self.rate = rate
+        self.burst = burst or max(1, int(rate))
+        self.tokens = float(self.burst)
+        self.updated_at = time.monotonic()
+        self.paused_until = 0.0
+        self.lock = threading.Lock()
+        self.stats = {"requests": 0, "backoffs": 0, "waited_seconds": 0.0}
+
+    def acquire(self):
+        """
+        Wait for a token and take it.
+        """
+        started = time.monotonic()
+        while True:
+            with self.lock:
+                now = time.monotonic()
+                self._refill(now)
+                if now >= self.paused_until and self.tokens >= 1:
+                    self.tokens -= 1
+                    self.stats["requests"] += 1
+                    self.stats["waited_seconds"] += now - started
+                    return
+                wait = max(self.paused_until - now, (1 - self.tokens) / self.rate)
+            time.sleep(wait)
+
+    def success(self):
+        """
+        Record a successful request, the rate grows back by 5% of the configured rate.
+        """
+        with self.lock:
+            self.rate = min(self.max_rate, self.rate + self.max_rate / 20)
+
+    def backoff(self, retry_after=None):
+        """
+        Record a throttled or failed request: halve the rate, drop the saved burst,
+        and pause every worker for retry_after seconds (or one request interval).
+        """
+        with self.lock:
+            now = time.monotonic()
+            self._refill(now)
+            self.rate = max(self.min_rate, self.rate / 2)
+            self.tokens = min(self.tokens, 0.0)
+            self.paused_until = max(self.paused_until, now + (retry_after or 1 / self.rate))
+            self.stats["backoffs"] += 1
+
+    def _refill(self, now):
+        # Must be called with the lock held
+        self.tokens = min(self.burst, self.tokens + (now - self.updated_at) * self.rate)
+        self.updated_at = now
+
+class Progress:
+    """
+    Thread-safe progress counter printing the completion rate and the estimated time remaining.
+    """
+
+    def __init__(self, total, label="items"):
+        self.total = total
+        self.label = label
+        self.done = 0
+        self.started_at = time.monotonic()
+        self.lock = threading.Lock()
+
+    def step(self, name=None):
+        """
+        Count one finished item and print the progress line.
+        """
+        with self.lock:
+            self.done += 1
+            elapsed = time.monotonic() - self.started_at
+            per_item = elapsed / self.done
+            eta = timedelta(seconds=round(per_item * (self.total - self.done)))
+            suffix = f" - {name}" if name else ""
+            print(f"[{self.done}/{self.total} {self.label}] {60 / per_item if per_item else 0:.1f}/min, ETA {eta}{suffix}")
@@ -0,0 +1,123 @@
+import os
+from importlib import metadata
+from concurrent.futures import Future, ProcessPoolExecutor
+# TextBlob's default analyzer (PatternAnalyzer) scores a text with this function, calling it directly
+# gives the same polarity without building a TextBlob for every comment
+from textblob.en import sentiment as pattern_sentiment
+
+# Number of processes scoring sentiment, 0 scores in the calling thread
+SENTIMENT_WORKERS = int(os.getenv("SENTIMENT_WORKERS", str(os.cpu_count() or 1)))
+# Number of texts sent to a worker process at once by score()
+SENTIMENT_BATCH_SIZE = int(os.getenv("SENTIMENT_BATCH_SIZE", "256"))
+# Version of the scores stored in the analysis cache, bump it when detect_sentiment or the thresholds change
+SENTIMENT_VERSION = f"pattern-{metadata.version('textblob')}-1"
+
+def sentiment_label(sentiment_score):
+    """
+    Map a polarity to its label (very positive, positive, neutral, negative, very negative).
+    """
+    if sentiment_score > 0.5:
+        return "very positive"
+    elif sentiment_score > 0.2:
+        return "positive"
+    elif sentiment_score < -0.5:
+        return "very negative"
+    elif sentiment_score < -0.2:
+        return "negative"
+    else:
+        return "neutral"
+
+def detect_sentiment(text):
+    """
+    Determine the sentiment of a given text using TextBlob's pattern analyzer.
+    returns a sentiment_score (float between -1 and 1) and a sentiment_label (very positive, positive, neutral, negative, very negative).
+    """
+    sentiment_score = pattern_sentiment(text)[0]
+    return sentiment_score, sentiment_label(sentiment_score)
+
+def score_texts(texts):
+    """
+    Score a batch of texts, returns a list of (sentiment_score, sentiment_label) in the same order.
+    """
+    return [detect_sentiment(text) for text in texts]
+
+class SentimentService:
+    """
+    Sentiment scoring off the scraping threads, in a pool of worker processes.
+
+    submit() sends a batch of texts and returns a future of their scores, so a scraper can keep fetching
+    while the batch is scored. score() scores a large list in parallel, in batches of batch_size texts.
+    With workers=0 texts are scored in the calling thread.
+    Create it before starting other threads, the worker processes are forked when it is created.
+    With an AnalysisCache, texts scored before (by this or a previous run) are not scored again.
+    """
+
+    def __init__(self, workers=SENTIMENT_WORKERS, batch_size=SENTIMENT_BATCH_SIZE, cache=None):
+        self.batch_size = batch_size
+        self.cache = cache
+        self.executor = ProcessPoolExecutor(max_workers=workers) if workers > 0 else None
+        if self.executor is not None:
+            # Start the worker processes now, before the scrapers start their threads
+            self.executor.submit(score_texts, []).result()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, traceback):
+        self.close()
+
+    def submit(self, texts):
+        """
+        Score a batch of texts asynchronously, returns a future of the list of (sentiment_score, sentiment_label).
+        """
+        texts = list(texts)
+        cached, missing = self._lookup(texts)
+
+        future = Future()
+        if not missing:
+            future.set_result(self._merge(texts, cached, missing, []))
+        elif self.executor is None:
+            future.set_result(self._merge(texts, cached, missing, score_texts([texts[i] for i in missing])))
+        else:
+            def batch_done(batch_future):
+                try:
+                    future.set_result(self._merge(texts, cached, missing, batch_future.result()))
+                except Exception as e:
+                    future.set_exception(e)
+
+            self.executor.submit(score_texts, [texts[i] for i in missing]).add_done_callback(batch_done)
+        return future
+
+    def score(self, texts):
+        """
+        Score texts, spread over the worker processes in batches. Returns the list of (sentiment_score, sentiment_label).
+        """
+        texts = list(texts)
+        cached, missing = self._lookup(texts)
+
+        missing_texts = [texts[i] for i in missing]
+        batches = [missing_texts[i:i + self.batch_size] for i in range(0, len(missing_texts), self.batch_size)]
+        if self.executor is None:
+            results = map(score_texts, batches)
+        else:
+            results = self.executor.map(score_texts, batches)
+        return self._merge(texts, cached, missing, [score for batch in results for score in batch])
+
+    def _lookup(self, texts):
+        # Split texts into the cached scores (index -> score) and the indexes left to score
+        cached = {}
+        if self.cache is not None:
+            cached = {i: tuple(score) for i, score in self.cache.get_many("sentiment", SENTIMENT_VERSION, texts).items()}
+        return cached, [i for i in range(len(texts)) if i not in cached]
+
+    def _merge(self, texts, cached, missing, scores):
+        # Store the new scores and put every score back in the order of texts
+        if self.cache is not None:
+            self.cache.put_many("sentiment", SENTIMENT_VERSION, [texts[i] for i in missing], scores)
+        merged = dict(cached)
+        merged.update(zip(missing, scores))
+        return [merged[i] for i in range(len(texts))]
+
+    def close(self):
+        if self.executor is not None:
+            self.executor.shutdown(wait=True)
@@ -0,0 +1,334 @@
+import os
+import re
+import json
+import hashlib
+import sqlite3
+import threading
+from supabase import create_client, Client
+
+# Storage backend used by the scrapers: "supabase" (production) or "sqlite" (local file, for offline runs and benchmarks)
+STORAGE_BACKEND = os.getenv("STORAGE_BACKEND", "supabase")
+STATE_DIR = os.getenv("SCRAPER_STATE_DIR", ".scraper_state")
+SQLITE_PATH = os.getenv("SQLITE_PATH", os.path.join(STATE_DIR, "coursify.db"))
+
+# Sentinel rows used by rag_chunks when a comment has no course or no professor (see database.txt)
+GENERAL_COURSE = "general_course"
+GENERAL_PROF = "general_prof"
+
+def dedup_key(text, created_at):
+    """
+    Compact duplicate key of a rag_chunks row, stored in its dedup_key column:
+    hash of the text (trimmed, lower-cased, whitespace collapsed) and of the date it was posted.
+    """
+    normalized = re.sub(r"\s+", " ", (text or "").strip().lower())
+    return hashlib.sha256(f"{normalized}\x1f{str(created_at)[:10]}".encode("utf-8")).hexdigest()[:32]
+
+def unstored_rag_chunks(sink, rows):
+    """
+    Get the rag_chunks rows whose dedup_key is not stored yet (used as the unwritten_rows of the rag_chunks writers).
+    """
+    keys = [row.get("dedup_key") or dedup_key(row["text"], row["created_at"]) for row in rows]
+    stored = sink.existing_keys("dedup_key", keys)
+    return [row for row, key in zip(rows, keys) if key not in stored]
+
+def create_supabase_client():
+    """
+    Create a Supabase client using environment variables for URL and key.
+    """
+    SUPABASE_URL = os.getenv("SUPABASE_URL")
+    SUPABASE_KEY = os.getenv("SUPABASE_KEY")
+    supabase: Client = create_client(SUPABASE_URL, SUPABASE_KEY)
+    return supabase
+
+def create_sink(backend=STORAGE_BACKEND):
+    """
+    Create the storage sink selected by STORAGE_BACKEND.
+    """
+    if backend == "supabase":
+        return SupabaseSink(create_supabase_client())
+    if backend == "sqlite":
+        return SQLiteSink(SQLITE_PATH)
+    raise ValueError(f"Unknown storage backend: {backend}")
+
+def chunks(items, size):
+    """
+    Split a list into lists of at most size items.
+    """
+    items = list(items)
+    return [items[i:i + size] for i in range(0, len(items), size)]
+
+class SupabaseSink:
+    """
+    Storage sink backed by the Supabase tables courses, professors and rag_chunks.
+    """
+
+    def __init__(self, supabase):
+        self.supabase = supabase
+
+    def _select_all(self, table, columns, order_by, page_size=1000):
+        """
+        Get the given columns of every row of table, page by page in order_by order (a unique column),
+        since a single request is capped at the API's max rows (page_size must not exceed it).
+        """
+        rows = []
+        while True:
+            page = self.supabase.table(table).select(", ".join(columns)).order(order_by).range(len(rows), len(rows) + page_size - 1).execute().data
+            rows.extend(page)
+            if len(page) < page_size:
+                return rows
+
+    # --- courses ---
+
+    def get_course_codes(self):
+        """
+        Get the code of every course, including the general_course sentinel.
+        """
+        return [course["course_code"] for course in self._select_all("courses", ["course_code"], "course_code")]
+
+    def get_courses(self, course_codes, columns, page_size=100):
+        """
+        Get the given columns of the given courses, at most page_size codes per request.
+        """
+        courses = []
+        for codes in chunks(course_codes, page_size):
+            courses.extend(self.supabase.table("courses").select(", ".join(columns)).in_("course_code", codes).execute().data)
+        return courses
+
+    def upsert_courses(self, rows):
+        self.supabase.table("courses").upsert(rows, on_conflict=["course_code"]).execute()
+
+    # --- professors ---
+
+    def get_professors(self, columns):
+        """
+        Get the given columns of every professor, including the general_prof sentinel.
+        """
+        return self._select_all("professors", columns, "id")
+
+    def upsert_professors(self, rows):
+        self.supabase.table("professors").upsert(rows, on_conflict=["id"]).execute()
+
+    # --- rag_chunks ---
+
+    def existing_keys(self, column, keys=None, since=None, page_size=1000, **filters):
+        """
+        Get the distinct values of column (e.g. dedup_key, source_url) among the chunks matching filters (column=value),
+        posted on or after since, and among keys if given. Only that column is fetched, page by page in id order
+        (page_size must not exceed the API's max rows, a shorter page is taken as the last one).
+        """
+        def query(key_chunk):
+            request = self.supabase.table("rag_chunks").select(column).order("id")
+            for name, value in filters.items():
+                request = request.eq(name, value)
+            if since is not None:
+                request = request.gte("created_at", since)
+            if key_chunk is not None:
+                request = request.in_(column, key_chunk)
+            return request
+
+        found = set()
+        for key_chunk in chunks(set(keys), 100) if keys is not None else [None]:
+            start = 0
+            while True:
+                rows = query(key_chunk).range(start, start + page_size - 1).execute().data
+                found.update(row[column] for row in rows)
+                if len(rows) < page_size:
+                    break
+                start += len(rows)
+        return found
+
+    def get_chunks_after(self, columns, after_id, limit=1000, **filters):
+        """
+        Get the id and the given columns of at most limit chunks matching filters (column=value) with an id above after_id,
+        by increasing id. Passing the last id returned as after_id reads the next page (keyset pagination).
+        """
+        request = self.supabase.table("rag_chunks").select(", ".join(["id", *columns])).gt("id", after_id)
+        for name, value in filters.items():
+            request = request.eq(name, value)
+        return request.order("id").limit(limit).execute().data
+
+    def backfill_dedup_keys(self, page_size=500):
+        """
+        Fill the dedup_key of the chunks stored before the column existed. Returns the number of chunks updated.
+        Only the columns of the key are read, by increasing id, and each chunk gets an update of its dedup_key alone.
+        """
+        updated = 0
+        last_id = 0
+        while True:
+            rows = (
+                self.supabase.table("rag_chunks").select("id, text, created_at").is_("dedup_key", "null")
+                .gt("id", last_id).order("id").limit(page_size).execute().data
+            )
+            if not rows:
+                return updated
+            for row in rows:
+                self.supabase.table("rag_chunks").update({"dedup_key": dedup_key(row["text"], row["created_at"])}).eq("id", row["id"]).execute()
+            updated += len(rows)
+            last_id = rows[-1]["id"]
+
+    def insert_rag_chunks(self, rows):
+        self.supabase.table("rag_chunks").insert(rows).execute()
+
+# Local mirror of the Supabase schema, list columns are stored as JSON text
+SQLITE_SCHEMA = """
+CREATE TABLE IF NOT EXISTS courses (
+    course_code TEXT PRIMARY KEY,
+    course_name TEXT,
+    course_description TEXT,
+    offering_faculty TEXT,
+    learning_hours TEXT,
+    course_learning_outcomes TEXT,
+    course_requirements TEXT,
+    course_equivalencies TEXT,
+    course_units TEXT,
+    average_gpa REAL,
+    average_enrollment REAL
+);
+CREATE TABLE IF NOT EXISTS professors (
+    id TEXT PRIMARY KEY,
+    name TEXT,
+    overall_rating REAL,
+    percent_retake REAL,
+    level_of_difficulty REAL,
+    professor_tags TEXT,
+    latest_comment_date TEXT,
+    num_ratings INTEGER,
+    url TEXT
+);
+CREATE TABLE IF NOT EXISTS rag_chunks (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    text TEXT,
+    source TEXT,
+    course_code TEXT,
+    professor_name TEXT,
+    source_url TEXT,
+    tags TEXT,
+    created_at TEXT,
+    upvotes INTEGER,
+    quality_rating REAL,
+    difficulty_rating REAL,
+    sentiment_score REAL,
+    sentiment_label TEXT,
+    dedup_key TEXT
+);
+CREATE INDEX IF NOT EXISTS rag_chunks_professor_name ON rag_chunks (professor_name);
+CREATE INDEX IF NOT EXISTS rag_chunks_professor_date ON rag_chunks (professor_name, created_at);
+CREATE INDEX IF NOT EXISTS rag_chunks_source ON rag_chunks (source, source_url);
+CREATE INDEX IF NOT EXISTS rag_chunks_source_id ON rag_chunks (source, id);
+"""
+# Created once older files have been migrated (their rag_chunks table has no dedup_key column)
+SQLITE_DEDUP_KEY_INDEX = "CREATE INDEX IF NOT EXISTS rag_chunks_dedup_key ON rag_chunks (dedup_key)"
+SQLITE_JSON_COLUMNS = {"course_learning_outcomes", "professor_tags", "tags"}
+
+class SQLiteSink:
+    """
+    Storage sink backed by a local SQLite file with the same tables, keys and sentinel rows as Supabase.
+    Used to run and benchmark the scrapers without network access.
+    """
+
+    def __init__(self, path=SQLITE_PATH):
+        if path != ":memory:":
+            os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        # The connection is shared by the BulkWriter threads, every access goes through the lock
+        self.connection = sqlite3.connect(path, check_same_thread=False)
+        self.connection.row_factory = sqlite3.Row
+        self.lock = threading.Lock()
+
+        with self.lock, self.connection:
+            self.connection.executescript(SQLITE_SCHEMA)
+            columns = {row["name"] for row in self.connection.execute("PRAGMA table_info(rag_chunks)")}
+            if "dedup_key" not in columns:
+                self.connection.execute("ALTER TABLE rag_chunks ADD COLUMN dedup_key TEXT")
+            self.connection.execute(SQLITE_DEDUP_KEY_INDEX)
+            self.connection.execute("INSERT OR IGNORE INTO courses (course_code) VALUES (?)", (GENERAL_COURSE,))
+            self.connection.execute("INSERT OR IGNORE INTO professors (id, name) VALUES (?, ?)", (GENERAL_PROF, GENERAL_PROF))
+
+    def _select(self, sql, params=()):
+        with self.lock:
+            rows = self.connection.execute(sql, params).fetchall()
+        return [
+            {key: json.loads(row[key]) if key in SQLITE_JSON_COLUMNS and row[key] is not None else row[key] for key in row.keys()}
+            for row in rows
+        ]
+
+    def _write(self, table, rows, conflict_column=None):
+        """
+        Insert rows, or upsert them on conflict_column. Like PostgREST, an upsert only updates the columns present in the rows.
+        """
+        if not rows:
+            return
+
+        columns = list(rows[0].keys())
+        sql = f"INSERT INTO {table} ({', '.join(columns)}) VALUES ({', '.join('?' for _ in columns)})"
+        if conflict_column:
+            updates = ", ".join(f"{column} = excluded.{column}" for column in columns if column != conflict_column)
+            sql += f" ON CONFLICT ({conflict_column}) DO UPDATE SET {updates}" if updates else f" ON CONFLICT ({conflict_column}) DO NOTHING"
+
+        values = [
+            [json.dumps(row.get(column)) if column in SQLITE_JSON_COLUMNS and row.get(column) is not None else row.get(column) for column in columns]
+            for row in rows
+        ]
+        with self.lock, self.connection:
+            self.connection.executemany(sql, values)
+
+    # --- courses ---
+
+    def get_course_codes(self):
+        return [course["course_code"] for course in self._select("SELECT course_code FROM courses")]
+
+    def get_courses(self, course_codes, columns, page_size=500):
+        courses = []
+        for codes in chunks(course_codes, page_size):
+            courses.extend(self._select(
+                f"SELECT {', '.join(columns)} FROM courses WHERE course_code IN ({', '.join('?' for _ in codes)})", codes
+            ))
+        return courses
+
+    def upsert_courses(self, rows):
+        self._write("courses", rows, "course_code")
+
+    # --- professors ---
+
+    def get_professors(self, columns):
+        return self._select(f"SELECT {', '.join(columns)} FROM professors")
+
+    def upsert_professors(self, rows):
+        self._write("professors", rows, "id")
+
+    # --- rag_chunks ---
+
+    def existing_keys(self, column, keys=None, since=None, page_size=500, **filters):
+        conditions = [f"{name} = ?" for name in filters]
+        params = list(filters.values())
+        if since is not None:
+            conditions.append("created_at >= ?")
+            params.append(since)
+
+        found = set()
+        for key_chunk in chunks(set(keys), page_size) if keys is not None else [None]:
+            chunk_conditions = list(conditions)
+            chunk_params = list(params)
+            if key_chunk is not None:
+                chunk_conditions.append(f"{column} IN ({', '.join('?' for _ in key_chunk)})")
+                chunk_params.extend(key_chunk)
+            where = f" WHERE {' AND '.join(chunk_conditions)}" if chunk_conditions else ""
+            found.update(row[column] for row in self._select(f"SELECT DISTINCT {column} FROM rag_chunks{where}", chunk_params))
+        return found
+
+    def get_chunks_after(self, columns, after_id, limit=1000, **filters):
+        conditions = "".join(f" AND {name} = ?" for name in filters)
+        return self._select(
+            f"SELECT {', '.join(['id', *columns])} FROM rag_chunks WHERE id > ?{conditions} ORDER BY id LIMIT ?",
+            [after_id, *filters.values(), limit],
+        )
+
+    def backfill_dedup_keys(self):
+        rows = self._select("SELECT id, text, created_at FROM rag_chunks WHERE dedup_key IS NULL")
+        with self.lock, self.connection:
+            self.connection.executemany(
+                "UPDATE rag_chunks SET dedup_key = ? WHERE id = ?", [(dedup_key(row["text"], row["created_at"]), row["id"]) for row in rows]
+            )
+        return len(rows)
+
+    def insert_rag_chunks(self, rows):
+        self._write("rag_chunks", rows)
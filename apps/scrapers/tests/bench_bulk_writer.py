@@ -0,0 +1,112 @@
+"""
+Throughput of BulkWriter against a local REST stand-in, compared with one insert per row.
+
+The stand-in answers each POST after a fixed latency plus a per-row cost, and fails FAILURE_RATE of the requests
+with a 429 (with Retry-After) or a 503.
+
+Usage: python apps/scrapers/tests/bench_bulk_writer.py
+"""
+import json
+import time
+import random
+import tempfile
+import threading
+import http.server
+import requests
+import support  # noqa: F401 (puts the scrapers directory on sys.path)
+from bulk_writer import BulkWriter, BulkWriteError
+
+ROWS = 5000
+PER_ROW_ROWS = 1000
+REQUEST_LATENCY = 0.03
+ROW_LATENCY = 0.0002
+FAILURE_RATE = 0.05
+
+class RestServer(http.server.ThreadingHTTPServer):
+    def __init__(self):
+        super().__init__(("127.0.0.1", 0), RestHandler)
+        self.rows = {}
+        self.requests = 0
+        self.failures = 0
+        self.lock = threading.Lock()
+        self.random = random.Random(1)
+
+    @property
+    def url(self):
+        return f"http://127.0.0.1:{self.server_address[1]}/rest/v1/rag_chunks"
+
+class RestHandler(http.server.BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, *args):
+        pass
+
+    def do_POST(self):
+        server = self.server
+        rows = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+        time.sleep(REQUEST_LATENCY + ROW_LATENCY * len(rows))
+        with server.lock:
+            server.requests += 1
+            status = server.random.choice([429, 503]) if server.random.random() < FAILURE_RATE else 201
+            if status == 201:
+                server.rows.update((row["id"], row) for row in rows)
+            else:
+                server.failures += 1
+
+        self.send_response(status)
+        if status == 429:
+            self.send_header("Retry-After", "0.05")
+        self.send_header("Content-Length", "0")
+        self.end_headers()
+
+def main():
+    server = RestServer()
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    sessions = threading.local()
+
+    def post(rows):
+        session = getattr(sessions, "session", None) or requests.Session()
+        sessions.session = session
+        session.post(server.url, json=rows, timeout=10).raise_for_status()
+
+    rows = [{"id": i, "text": "comment text " * 20} for i in range(ROWS)]
+
+    # Baseline: one insert per row, without retries
+    started = time.perf_counter()
+    lost = 0
+    for row in rows[:PER_ROW_ROWS]:
+        try:
+            post([row])
+        except requests.RequestException:
+            lost += 1
+    print(f"one insert per row: {PER_ROW_ROWS / (time.perf_counter() - started):.0f} rows/sec, {lost} rows lost to 429/503")
+
+    for workers in (1, 4):
+        server.rows.clear()
+        writer = BulkWriter("bench", post, batch_size=50, workers=workers, backoff=0.05, failed_batches_dir=tempfile.mkdtemp())
+        started = time.perf_counter()
+        with writer:
+            writer.add_many(rows)
+        print(f"BulkWriter workers={workers}: {ROWS / (time.perf_counter() - started):.0f} rows/sec, "
+              f"stored {len(server.rows)}/{ROWS}, {writer.stats['retries']} retries, final batch size {writer.batch_size}")
+
+    # Failed batches: the table is unreachable, then replayed on the next run
+    failed_batches_dir = tempfile.mkdtemp()
+    server.rows.clear()
+
+    def unreachable(rows):
+        raise requests.ConnectionError("connection refused")
+
+    writer = BulkWriter("bench", unreachable, batch_size=100, min_batch_size=100, max_retries=1, backoff=0.01, failed_batches_dir=failed_batches_dir)
+    writer.add_many(rows[:300])
+    try:
+        writer.close()
+    except BulkWriteError:
+        pass
+    replayed = BulkWriter("bench", post, backoff=0.05, failed_batches_dir=failed_batches_dir).replay_failed_batches()
+    print(f"Replay: {replayed} rows replayed, {len(server.rows)} stored")
+
+    server.shutdown()
+
+if __name__ == "__main__":
+    main()
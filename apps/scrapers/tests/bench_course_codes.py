@@ -0,0 +1,42 @@
+"""
+Benchmark of the RMP course label mapping: the original clean_and_map_course_codes against CourseCodeIndex.
+
+Uses a random catalog of about 5,000 valid courses and professors with 1 to 12 messy labels each.
+
+Usage: python apps/scrapers/tests/bench_course_codes.py [valid_courses] [professors]
+"""
+import sys
+import time
+import random
+import support  # noqa: F401 (puts the scrapers directory on sys.path)
+from course_codes import CourseCodeIndex
+from reference_course_codes import original_map_course_codes, random_catalog, random_label
+
+VALID_COURSES = 5000
+PROFESSORS = 3000
+
+def main(valid_count=VALID_COURSES, professor_count=PROFESSORS):
+    rnd = random.Random(16)
+    valid_courses = random_catalog(rnd, valid_count)
+    valid_list = sorted(valid_courses)
+    professors = [[random_label(rnd, valid_list) for _ in range(rnd.randint(1, 12))] for _ in range(professor_count)]
+    print(f"{len(valid_courses)} valid courses, {len(professors)} professors, {sum(map(len, professors))} labels")
+
+    started = time.perf_counter()
+    original = [original_map_course_codes(labels, valid_courses) for labels in professors]
+    original_seconds = time.perf_counter() - started
+
+    started = time.perf_counter()
+    index = CourseCodeIndex(valid_courses)
+    build_seconds = time.perf_counter() - started
+    started = time.perf_counter()
+    mapped = [index.map_course_codes(labels) for labels in professors]
+    index_seconds = time.perf_counter() - started
+
+    print(f"original:        {original_seconds:6.2f}s ({original_seconds / len(professors) * 1000:.3f} ms per professor)")
+    print(f"CourseCodeIndex: {index_seconds:6.2f}s ({index_seconds / len(professors) * 1000:.3f} ms per professor, "
+          f"{original_seconds / index_seconds:.0f}x), plus {build_seconds * 1000:.1f} ms to build the index once")
+    print("Identical mapping:", original == mapped)
+
+if __name__ == "__main__":
+    main(*(int(arg) for arg in sys.argv[1:3]))
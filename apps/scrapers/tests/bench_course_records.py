@@ -0,0 +1,86 @@
+"""
+Time and peak memory (tracemalloc) of collecting the scraped courses.
+
+Compares growing a DataFrame with pd.concat once per course (the original scraper) with the column store
+(create_course_records / append_course_record), over courses parsed from synthetic courseblocks, then measures
+iter_courses and scrape_all_course end to end against a local calendar stand-in without latency.
+
+Usage: python apps/scrapers/tests/bench_course_records.py [courses]
+"""
+import io
+import os
+import sys
+import time
+import tracemalloc
+import contextlib
+import pandas as pd
+from support import load_script
+from calendar_standin import CalendarStandIn, calendar_pages, course_page
+
+COURSES = 5000
+COURSES_PER_PAGE = 100
+
+def measure(function, untraced_timing=False):
+    """
+    Run function and return (result, seconds, peak bytes allocated while it ran).
+    With untraced_timing, the time comes from a second run without tracemalloc, which slows parsing down several times.
+    """
+    tracemalloc.start()
+    started = time.perf_counter()
+    result = function()
+    seconds = time.perf_counter() - started
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    if untraced_timing:
+        started = time.perf_counter()
+        function()
+        seconds = time.perf_counter() - started
+    return result, seconds, peak
+
+def report(label, seconds, peak, rows):
+    print(f"{label:28s} {seconds:7.2f}s   peak {peak / 1e6:6.1f} MB   {rows} rows")
+
+def main(courses):
+    server = CalendarStandIn(calendar_pages(departments=courses // COURSES_PER_PAGE, courses_per_page=COURSES_PER_PAGE), latency=0).start()
+    # The calendar urls are built when the scraper is imported
+    os.environ["CALENDAR_BASE_URL"] = server.base_url
+    course_scraper = load_script("course-scraper")
+    columns = course_scraper.COURSE_COLUMNS
+
+    # Step 1: Parse the synthetic courseblocks once, both collectors then receive the same courses
+    parsed_courses = []
+    for page in range(-(-courses // COURSES_PER_PAGE)):
+        parsed_courses.extend(course_scraper.parse_course_page(course_page(f"S{page:03d}", COURSES_PER_PAGE)))
+    parsed_courses = parsed_courses[:courses]
+
+    def concat_per_course():
+        course_data = pd.DataFrame(columns=columns)
+        for course in parsed_courses:
+            course_data = pd.concat([course_data, pd.DataFrame([course])], ignore_index=True)
+        return course_data
+
+    def column_store():
+        course_records = course_scraper.create_course_records()
+        for course in parsed_courses:
+            course_scraper.append_course_record(course_records, course)
+        return pd.DataFrame(course_records, columns=columns)
+
+    # Step 2: Collect them into a DataFrame both ways
+    frames = {}
+    for label, collect in [("pd.concat per course", concat_per_course), ("column store", column_store)]:
+        frames[label], seconds, peak = measure(collect)
+        report(label, seconds, peak, len(frames[label]))
+    before, after = frames.values()
+    print("Same rows:", before[columns].astype(str).equals(after[columns].astype(str)))
+
+    # Step 3: The whole scrape against the stand-in, streamed and into a DataFrame
+    print(f"Stand-in calendar: {len(server.pages)} pages")
+    with contextlib.redirect_stdout(io.StringIO()):
+        streamed, streamed_seconds, streamed_peak = measure(lambda: sum(1 for _ in course_scraper.iter_courses(use_cache=False)), untraced_timing=True)
+        course_data, seconds, peak = measure(lambda: course_scraper.scrape_all_course(use_cache=False), untraced_timing=True)
+    report("iter_courses", streamed_seconds, streamed_peak, streamed)
+    report("scrape_all_course", seconds, peak, len(course_data))
+    server.shutdown()
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else COURSES)
@@ -0,0 +1,98 @@
+"""
+Per-professor latency of the Selenium paths with a new browser per professor (before DriverPool) and with a pool.
+
+Chrome is simulated: starting a driver costs BROWSER_STARTUP seconds, and each professor page is loaded
+from a local stand-in that answers after PAGE_LATENCY seconds.
+
+Usage: python apps/scrapers/tests/bench_driver_pool.py
+"""
+import time
+import statistics
+import threading
+import http.server
+from concurrent.futures import ThreadPoolExecutor
+import requests
+import support  # noqa: F401 (puts the scrapers directory on sys.path)
+import driver_pool
+from driver_pool import DriverPool, pooled_driver
+
+PROFESSORS = 40
+BROWSER_STARTUP = 1.2
+PAGE_LATENCY = 0.2
+PARSE_SECONDS = 0.1
+PAGE_BYTES = 200_000
+
+class ProfessorPageHandler(http.server.BaseHTTPRequestHandler):
+    def log_message(self, *args):
+        pass
+
+    def do_GET(self):
+        time.sleep(PAGE_LATENCY)
+        body = b"<html>" + b"x" * PAGE_BYTES + b"</html>"
+        self.send_response(200)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+class SimulatedDriver:
+    """
+    Driver with Chrome's startup cost that loads pages over HTTP.
+    """
+    started = 0
+
+    def __init__(self):
+        time.sleep(BROWSER_STARTUP)
+        SimulatedDriver.started += 1
+        self.session = requests.Session()
+
+    def get(self, url):
+        if url != "about:blank":
+            self.session.get(url).content
+
+    def execute_script(self, script, *args):
+        return 1
+
+    def delete_all_cookies(self):
+        self.session.cookies.clear()
+
+    def execute_cdp_cmd(self, command, params):
+        pass
+
+    def quit(self):
+        self.session.close()
+
+def scrape_professor(url, pool):
+    started = time.perf_counter()
+    with pooled_driver(pool) as driver:
+        driver.get(url)
+        time.sleep(PARSE_SECONDS)
+    return time.perf_counter() - started
+
+def report(label, latencies, total):
+    print(f"{label}: {statistics.mean(latencies):.2f}s per professor (p95 {sorted(latencies)[int(len(latencies) * 0.95)]:.2f}s), "
+          f"{total:.1f}s total, {SimulatedDriver.started} browsers started")
+
+def main():
+    server = http.server.ThreadingHTTPServer(("127.0.0.1", 0), ProfessorPageHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    url = f"http://127.0.0.1:{server.server_address[1]}/professor"
+    driver_pool.create_chrome_driver = SimulatedDriver
+
+    started = time.perf_counter()
+    latencies = [scrape_professor(url, None) for _ in range(PROFESSORS)]
+    report("before: new browser per professor", latencies, time.perf_counter() - started)
+
+    for size in (1, 4):
+        SimulatedDriver.started = 0
+        pool = DriverPool(size=size, max_pages=15, create_driver=SimulatedDriver)
+        started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=size) as executor:
+            latencies = list(executor.map(lambda _: scrape_professor(url, pool), range(PROFESSORS)))
+        total = time.perf_counter() - started
+        pool.close()
+        report(f"after: pool of {size}", latencies, total)
+
+    server.shutdown()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,52 @@
+"""
+Speedup of the concurrent calendar fetch (iter_pages over a shared session) against a local stand-in with latency.
+
+Fetches every calendar page with 1 worker (the sequential behaviour) and with more workers, first through
+iter_pages alone and then through the whole scrape_all_course, and checks that the scraped output is identical.
+
+Usage: python apps/scrapers/tests/bench_fetch.py [latency_seconds]
+"""
+import io
+import os
+import sys
+import time
+import contextlib
+from support import load_script
+from calendar_standin import CalendarStandIn, calendar_pages
+
+WORKERS = [1, 4, 8, 16]
+LATENCY = 0.2
+
+def main(latency):
+    server = CalendarStandIn(calendar_pages(), latency).start()
+    # The calendar urls are built when the scraper is imported
+    os.environ["CALENDAR_BASE_URL"] = server.base_url
+    course_scraper = load_script("course-scraper")
+    page_urls = [server.base_url + path for path in server.pages]
+    print(f"{len(page_urls)} pages, {latency * 1000:.0f} ms latency per request")
+
+    baseline = None
+    for workers in WORKERS:
+        session = course_scraper.create_http_session(workers)
+        started = time.perf_counter()
+        fetched = [response.status_code for _, response, _ in course_scraper.iter_pages(session, page_urls, workers)]
+        seconds = time.perf_counter() - started
+        baseline = baseline or seconds
+        print(f"iter_pages        {workers:2d} workers: {seconds:5.1f}s ({baseline / seconds:4.1f}x), {fetched.count(200)} pages fetched")
+
+    outputs = {}
+    baseline = None
+    for workers in WORKERS:
+        started = time.perf_counter()
+        with contextlib.redirect_stdout(io.StringIO()):
+            course_data = course_scraper.scrape_all_course(max_workers=workers, max_connections_per_host=workers, use_cache=False)
+        seconds = time.perf_counter() - started
+        baseline = baseline or seconds
+        outputs[workers] = course_data.to_json()
+        print(f"scrape_all_course {workers:2d} workers: {seconds:5.1f}s ({baseline / seconds:4.1f}x), {len(course_data)} courses")
+
+    print("Identical output:", len(set(outputs.values())) == 1)
+    server.shutdown()
+
+if __name__ == "__main__":
+    main(float(sys.argv[1]) if len(sys.argv) > 1 else LATENCY)
@@ -0,0 +1,71 @@
+"""
+Benchmark of the HTML_PARSER backends on saved pages.
+
+Usage: python apps/scrapers/tests/bench_parsers.py [calendar_page.html ...]
+Without arguments the fixtures are used, with each courseblock and review card repeated to the size of a real page.
+"""
+import io
+import sys
+import time
+import contextlib
+from bs4 import BeautifulSoup
+from support import load_script, read_fixture
+
+PARSERS = ["html.parser", "lxml"]
+REPEATS = 5
+# Courseblocks on a large department page, review cards on a professor page after a few "Load More Ratings"
+COURSEBLOCK_COPIES = 20
+REVIEW_COPIES = 40
+
+def enlarge(page, start_marker, end_marker, copies):
+    """
+    Repeat the part of page between start_marker and end_marker.
+    """
+    start = page.index(start_marker)
+    end = page.rindex(end_marker) + len(end_marker)
+    return page[:start] + page[start:end] * copies + page[end:]
+
+def best_time(function, repeats=REPEATS):
+    times = []
+    for _ in range(repeats):
+        started = time.perf_counter()
+        function()
+        times.append(time.perf_counter() - started)
+    return min(times)
+
+def main(paths):
+    course_scraper = load_script("course-scraper")
+    rmp_scraper = load_script("rmp-scraper")
+
+    if paths:
+        calendar_pages = []
+        for path in paths:
+            with open(path, "rb") as f:
+                calendar_pages.append(f.read())
+    else:
+        calendar_pages = [enlarge(read_fixture("calendar_page.html"), b'<div class="courseblock">', b"Faculty of Arts and Science</span>\n</div>\n", COURSEBLOCK_COPIES)]
+    rmp_page = enlarge(read_fixture("rmp_professor_page.html"), b"<li>", b"</li>", REVIEW_COPIES)
+    summary = {"overall_rating": 4.2, "level_of_difficulty": 3.1}
+
+    def parse_calendar():
+        return sum(len(course_scraper.parse_course_page(page)) for page in calendar_pages)
+
+    def parse_rmp():
+        soup = BeautifulSoup(rmp_page, course_scraper.HTML_PARSER)
+        return [rmp_scraper.parse_review_block(block, summary) for block in soup.select_one("ul#ratingsList").select("li")]
+
+    results = {}
+    # The unreadable review card of the fixture prints a message on every parse
+    with contextlib.redirect_stdout(io.StringIO()):
+        for parser in PARSERS:
+            course_scraper.HTML_PARSER = parser
+            results[parser] = (parse_calendar(), parse_rmp(), best_time(parse_calendar), best_time(parse_rmp))
+
+    for parser, (courses, reviews, calendar_seconds, rmp_seconds) in results.items():
+        print(f"{parser:12s} calendar: {courses / calendar_seconds:,.0f} courses/sec ({calendar_seconds * 1000:.1f} ms for {len(calendar_pages)} pages)"
+              f"   rmp: {rmp_seconds * 1000:.1f} ms for {len(reviews)} review cards")
+
+    print("Identical records:", len({repr(result[:2]) for result in results.values()}) == 1)
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
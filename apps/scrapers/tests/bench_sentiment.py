@@ -0,0 +1,33 @@
+"""
+Sentiment throughput: the original TextBlob per comment against SentimentService inline and with worker processes.
+
+Usage: python apps/scrapers/tests/bench_sentiment.py [texts]
+"""
+import os
+import sys
+import time
+import random
+import support  # noqa: F401 (puts the scrapers directory on sys.path)
+from sentiment import SentimentService
+from reference_sentiment import original_detect_sentiment, random_review
+
+TEXTS = 50000
+
+def main(count=TEXTS):
+    rnd = random.Random(18)
+    texts = [random_review(rnd) for _ in range(count)]
+
+    started = time.perf_counter()
+    reference = [original_detect_sentiment(text) for text in texts]
+    seconds = time.perf_counter() - started
+    print(f"TextBlob per comment:           {count / seconds:8.0f} texts/sec")
+
+    for workers in sorted({0, 1, os.cpu_count() or 1}):
+        with SentimentService(workers=workers) as service:
+            started = time.perf_counter()
+            scores = service.score(texts)
+            seconds = time.perf_counter() - started
+        print(f"SentimentService, {workers:2d} workers:  {count / seconds:8.0f} texts/sec, identical: {scores == reference}")
+
+if __name__ == "__main__":
+    main(*(int(arg) for arg in sys.argv[1:2]))
@@ -0,0 +1,41 @@
+"""
+Microbenchmark of detect_tags (TagMatcher) against the original hand-written keyword scans.
+
+Usage: python apps/scrapers/tests/bench_tags.py
+"""
+import time
+import random
+import support  # noqa: F401 (puts the scrapers directory on sys.path)
+from tags import detect_tags
+from reference_tags import original_detect_tags, random_comment
+
+REPEATS = 5
+
+# (label, number of comments, min words, max words, share of tag keywords)
+CORPORA = [
+    ("long comments (300-1500 words)", 300, 300, 1500, 0.01),
+    ("long, keyword-free", 300, 300, 1500, 0.0),
+    ("short comments (5-60 words)", 20000, 5, 60, 0.05),
+]
+
+def best_time(function, texts, repeats=REPEATS):
+    times = []
+    for _ in range(repeats):
+        started = time.perf_counter()
+        for text in texts:
+            function(text)
+        times.append(time.perf_counter() - started)
+    return min(times)
+
+def main():
+    rnd = random.Random(1)
+    for label, count, min_words, max_words, keyword_share in CORPORA:
+        texts = [random_comment(rnd, min_words, max_words, keyword_share) for _ in range(count)]
+        assert all(detect_tags(text) == original_detect_tags(text) for text in texts)
+        original_seconds = best_time(original_detect_tags, texts)
+        matcher_seconds = best_time(detect_tags, texts)
+        print(f"{label}: original {original_seconds * 1000:.1f} ms, TagMatcher {matcher_seconds * 1000:.1f} ms "
+              f"({original_seconds / matcher_seconds:.2f}x)")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,76 @@
+"""
+Memory and lookup speed of the Reddit UrlIndex over a local SQLite sink with a million stored urls.
+
+Measures a full sync (tracemalloc), the index file, loading it back, lookups of stored and unknown urls,
+an incremental sync, and for comparison a Python set of the url strings.
+
+Usage: python apps/scrapers/tests/bench_url_index.py [urls]
+"""
+import os
+import sys
+import time
+import random
+import tempfile
+import tracemalloc
+import support  # noqa: F401 (puts the scrapers directory on sys.path)
+from storage import SQLiteSink
+from url_index import UrlIndex
+
+URLS = 1_000_000
+LOOKUPS = 200_000
+NEW_ROWS = 10_000
+
+def post_url(i):
+    return f"https://www.reddit.com/r/queensuniversity/comments/{i:07x}/course_question_title_{i % 977}/"
+
+def insert_rows(sink, rows):
+    # Straight into the table, insert_rag_chunks would build a dict per row
+    with sink.lock, sink.connection:
+        sink.connection.executemany("INSERT INTO rag_chunks (text, source, source_url) VALUES ('comment', ?, ?)", rows)
+
+def main(count=URLS):
+    rnd = random.Random(24)
+    state_dir = tempfile.mkdtemp()
+    sink = SQLiteSink(os.path.join(state_dir, "coursify.db"))
+    insert_rows(sink, (("reddit", post_url(i)) for i in range(count)))
+    path = os.path.join(state_dir, "reddit_url_index.bin")
+
+    # Step 1: Full sync from an empty index
+    tracemalloc.start()
+    started = time.perf_counter()
+    index = UrlIndex(path)
+    rows = index.sync(sink)
+    seconds = time.perf_counter() - started
+    current, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    index.save()
+    print(f"Full sync of {rows} rows: {seconds:.1f}s, {len(index)} urls, array {len(index.hashes) * 8 / 1e6:.1f} MB "
+          f"(traced {current / 1e6:.1f} MB after the sync, peak {peak / 1e6:.0f} MB), file {os.path.getsize(path) / 1e6:.1f} MB")
+
+    # Step 2: Load the file, as the next run does
+    started = time.perf_counter()
+    index = UrlIndex(path)
+    print(f"Load from file: {(time.perf_counter() - started) * 1000:.0f} ms, last id {index.last_id}")
+
+    # Step 3: Lookups of stored urls and of urls never stored
+    stored = [post_url(rnd.randrange(count)) for _ in range(LOOKUPS)]
+    unknown = [post_url(count + i) for i in range(LOOKUPS)]
+    for label, urls in [("stored", stored), ("unknown", unknown)]:
+        started = time.perf_counter()
+        found = sum(url in index for url in urls)
+        seconds = time.perf_counter() - started
+        print(f"Lookups of {label} urls: {found}/{len(urls)} found, {len(urls) / seconds / 1000:.0f}k lookups/sec")
+
+    # Step 4: Incremental sync of the rows stored since
+    insert_rows(sink, ((rnd.choice(["reddit", "ratemyprofessors"]), post_url(count + i)) for i in range(NEW_ROWS)))
+    started = time.perf_counter()
+    rows = index.sync(sink)
+    print(f"Incremental sync: {rows} new rows in {(time.perf_counter() - started) * 1000:.0f} ms, {len(index)} urls")
+
+    tracemalloc.start()
+    url_set = {post_url(i) for i in range(count)}
+    print(f"For comparison, a set of the {len(url_set)} url strings: {tracemalloc.get_traced_memory()[0] / 1e6:.0f} MB")
+    tracemalloc.stop()
+
+if __name__ == "__main__":
+    main(*(int(arg) for arg in sys.argv[1:2]))
@@ -0,0 +1,103 @@
+"""
+Local stand-in for the academic calendar, used by the benchmarks.
+
+Serves the Arts & Science index, one page per department and the pages of the other faculties, each made of
+synthetic courseblocks in the calendar's markup, after an artificial latency.
+"""
+import time
+import random
+import threading
+import http.server
+
+ART_SCI_INDEX_PATH = "/academic-calendar/arts-science/course-descriptions/"
+FACULTY_PAGES = {
+    "/academic-calendar/education/course-descriptions/": "EDUC",
+    "/academic-calendar/health-sciences/bhsc/courses-instruction/": "BHSC",
+    "/academic-calendar/nursing/bachelor-nursing-science-course-descriptions/": "NURS",
+    "/academic-calendar/business/bachelor-commerce/courses-of-instruction/by20number/": "COMM",
+}
+ENGINEERING_DEPARTMENTS = ["apsc", "chee", "civl", "cmpe", "elec", "ench", "enph", "geoe", "mthe", "mech", "mren", "mine", "mntc", "soft"]
+
+def courseblock(subject, number):
+    """
+    One courseblock of the calendar markup, with the optional fields present or not depending on the course.
+    """
+    rnd = random.Random(f"{subject}{number}")
+    code = f"{subject} {number}"
+    parts = [
+        '<div class="courseblock"><p class="courseblocktitle">',
+        f'<span class="text detail-code margin--small text--semibold text--big">{code}</span>',
+        f'<span class="text detail-title margin--small text--semibold text--big">Title of {code}</span>',
+        '<span class="text detail-hours_html margin--small text--semibold text--big">Units: 3.00</span></p>',
+        f'<div class="courseblockextra noindent">Description of {code}. ' + "Lorem ipsum dolor sit amet. " * rnd.randint(2, 8) + "</div>",
+    ]
+    if rnd.random() < 0.7:
+        parts.append(f'<span class="text detail-requirements margin--default"><strong>Requirements: </strong>Prerequisite {subject} {number - 1}.</span>')
+    if rnd.random() < 0.8:
+        parts.append('<span class="text detail-learning_hours margin--default"><strong>Learning Hours: </strong>120 (36L;84P)</span>')
+    if rnd.random() < 0.3:
+        parts.append(f'<span class="text detail-course_equivalencies margin--default"><strong>Course Equivalencies: </strong>{subject} {number + 100}</span>')
+    parts.append(f'<span class="text detail-offering_faculty margin--default"><strong>Offering Faculty: </strong>Faculty of {subject}</span>')
+    outcomes = "".join(f"<li>Outcome {i} of {code}</li>" for i in range(rnd.randint(0, 4)))
+    if outcomes:
+        parts.append(f'<span class="text detail-cim_los margin--default"><strong>Course Learning Outcomes:</strong><ol>{outcomes}</ol></span>')
+    parts.append("</div>")
+    return "".join(parts)
+
+def course_page(subject, courses):
+    """
+    A department page with the given number of courseblocks, as bytes.
+    """
+    blocks = "".join(courseblock(subject, 100 + i) for i in range(courses))
+    return f"<html><head><title>{subject}</title></head><body><div id='content'>{blocks}</div></body></html>".encode()
+
+def calendar_pages(departments=50, courses_per_page=40):
+    """
+    Pages of the whole calendar: path -> body.
+    """
+    subjects = [f"D{chr(65 + i // 26)}{chr(65 + i % 26)}" for i in range(departments)]
+    links = "".join(f"<li><a href='{ART_SCI_INDEX_PATH}{subject.lower()}/'>{subject} Department</a></li>" for subject in subjects)
+    pages = {ART_SCI_INDEX_PATH: f"<html><body><div class='sitemap'><ul>{links}</ul></div></body></html>".encode()}
+    for subject in subjects:
+        pages[f"{ART_SCI_INDEX_PATH}{subject.lower()}/"] = course_page(subject, courses_per_page)
+    for path, subject in FACULTY_PAGES.items():
+        pages[path] = course_page(subject, courses_per_page)
+    for department in ENGINEERING_DEPARTMENTS:
+        pages[f"/academic-calendar/engineering-applied-sciences/courses-instruction/{department}/"] = course_page(department.upper(), courses_per_page)
+    return pages
+
+class CalendarStandIn(http.server.ThreadingHTTPServer):
+    """
+    Serves pages from a dict of path -> body, each after latency seconds, over keep-alive connections.
+    """
+    daemon_threads = True
+
+    def __init__(self, pages, latency=0.2):
+        super().__init__(("127.0.0.1", 0), CalendarStandInHandler)
+        self.pages = pages
+        self.latency = latency
+        self.requests = 0
+
+    @property
+    def base_url(self):
+        return f"http://127.0.0.1:{self.server_address[1]}"
+
+    def start(self):
+        threading.Thread(target=self.serve_forever, daemon=True).start()
+        return self
+
+class CalendarStandInHandler(http.server.BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, *args):
+        pass
+
+    def do_GET(self):
+        time.sleep(self.server.latency)
+        self.server.requests += 1
+        body = self.server.pages.get(self.path.split("#")[0])
+        self.send_response(404 if body is None else 200)
+        self.send_header("Content-Type", "text/html")
+        self.send_header("Content-Length", str(len(body or b"")))
+        self.end_headers()
+        self.wfile.write(body or b"")
@@ -0,0 +1,10 @@
+import pytest
+from support import load_script
+
+@pytest.fixture(scope="session")
+def course_scraper():
+    return load_script("course-scraper")
+
+@pytest.fixture(scope="session")
+def rmp_scraper():
+    return load_script("rmp-scraper")
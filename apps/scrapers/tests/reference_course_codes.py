@@ -0,0 +1,130 @@
+import re
+
+LETTERS = "ABCDEFGHIJKLMNOPQRSTUVWXYZ"
+
+def original_map_course_codes(course_codes, valid_courses):
+    """
+    clean_and_map_course_codes as it was written before CourseCodeIndex, kept as the parity reference.
+    The only change is the guard against len(None), which raised TypeError on unknown or ambiguous labels.
+    """
+
+    # --- Step 1: Build valid dept codes, number codes, and derived clean courses ---
+    valid_dept_codes = set()
+    valid_num_codes = set()
+    derived_valid_courses = set()
+
+    valid_courses_no_space = {course.replace(" ", "").upper(): course for course in valid_courses}
+
+    for raw_code in course_codes:
+        cleaned = raw_code.strip().replace(" ", "").upper()
+
+        # Extract prefix and number parts
+        prefix_match = re.match(r"^[A-Z]+", cleaned)
+        number_parts = re.findall(r"\d+", cleaned)
+
+        if prefix_match:
+            prefix = prefix_match.group(0)
+
+            # Check if prefix matches any valid course
+            for valid in valid_courses:
+                if valid.replace(" ", "").startswith(prefix):
+                    valid_dept_codes.add(prefix)
+                    break
+
+        for num in number_parts:
+            if len(num) >= 3:
+                num = num[:3]
+                # Try matching this number with known prefixes
+                for dept in valid_dept_codes:
+                    candidate = f"{dept} {num}"
+                    if candidate in valid_courses:
+                        valid_num_codes.add(num)
+                        derived_valid_courses.add(candidate)
+
+    # --- Step 2: Build mapping ---
+    course_mapping = {}
+
+    for raw_code in course_codes:
+        matches = []
+        cleaned = raw_code.strip().replace(" ", "").upper()
+
+        # Exact match to known valid courses first
+        if cleaned in valid_courses_no_space:
+            matches.append(valid_courses_no_space[cleaned])
+
+        else:
+            prefix_match = re.match(r"^[A-Z]+", cleaned)
+            number_parts = re.findall(r"\d+", cleaned)
+
+            if prefix_match and number_parts:
+                prefix = prefix_match.group(0)
+                suffix = cleaned[len(prefix):]
+
+                # Try to build full courses
+                idx = 0
+                while idx < len(suffix):
+                    num = suffix[idx:idx+3]
+                    idx += 3
+
+                    for dept in valid_dept_codes:
+                        candidate = f"{dept} {num}"
+                        if candidate in derived_valid_courses:
+                            matches.append(candidate)
+
+            elif cleaned.isdigit() and len(cleaned) == 3:
+                # Just numbers
+                num = cleaned
+                if num in valid_num_codes:
+                    for dept in valid_dept_codes:
+                        candidate = f"{dept} {num}"
+                        if candidate in derived_valid_courses:
+                            matches.append(candidate)
+                else:
+                    matches = None
+
+            elif cleaned.isalpha():
+                # Only letters (ANAT) => ambiguous
+                matches = None
+
+            else:
+                matches = None
+
+        if matches and len(matches) == 1:
+            course_mapping[raw_code] = matches
+        else:
+            course_mapping[raw_code] = None
+
+    return course_mapping
+
+def random_catalog(rnd, size, departments=160):
+    """
+    Random set of valid courses "<DEPT> <number>", with a few real departments among random 4-letter ones.
+    """
+    depts = sorted({"".join(rnd.choice(LETTERS) for _ in range(4)) for _ in range(departments)}) + ["CISC", "MATH", "COMM", "APSC", "MTHE", "PSYC", "ANAT"]
+    valid_courses = {"CISC 121", "CISC 124", "MATH 121", "COMM 151"}
+    while len(valid_courses) < size:
+        valid_courses.add(f"{rnd.choice(depts)} {rnd.randint(100, 599)}")
+    return valid_courses
+
+def random_label(rnd, valid_list):
+    """
+    Random course label the way students type them on RMP: "cisc121", "121", "CISC121124", "CISC-121", "COMM", ...
+    """
+    course = rnd.choice(valid_list)
+    dept, number = course.split()
+    return rnd.choice([
+        course.replace(" ", ""),
+        course.lower(),
+        f" {dept}{number} ",
+        number,
+        f"{dept}{number}{rnd.choice(valid_list).split()[1]}",
+        f"{dept}-{number}",
+        dept,
+        f"{dept}{number}A",
+        f"{dept}{number}/{int(number) + 1}",
+        f"{dept[:3]}{number}",
+        f"{dept} {number[:2]}",
+        f"{rnd.choice(LETTERS)}{number}",
+        f"{number}{rnd.randint(0, 9)}",
+        "ALL",
+    ])
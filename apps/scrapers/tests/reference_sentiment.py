@@ -0,0 +1,30 @@
+from textblob import TextBlob
+
+WORDS = ("great prof hard exam lectures boring amazing material the course very not good bad terrible easy helpful clear "
+         "unclear fair would take again avoid awesome worst best final midterm assignments tough caring").split()
+ENDINGS = [".", "!", " :)", " :(", "", "?!", "!!!"]
+
+def original_detect_sentiment(text):
+    """
+    detect_sentiment as it was written before sentiment.py, building a TextBlob per comment, kept as the parity reference.
+    """
+    blob = TextBlob(text)
+    sentiment_score = blob.sentiment.polarity
+    if sentiment_score > 0.5:
+        sentiment_label = "very positive"
+    elif sentiment_score > 0.2:
+        sentiment_label = "positive"
+    elif sentiment_score < -0.5:
+        sentiment_label = "very negative"
+    elif sentiment_score < -0.2:
+        sentiment_label = "negative"
+    else:
+        sentiment_label = "neutral"
+
+    return sentiment_score, sentiment_label
+
+def random_review(rnd, min_words=5, max_words=120):
+    """
+    Random review made of common review words (with negations and intensifiers) and an ending.
+    """
+    return " ".join(rnd.choice(WORDS) for _ in range(rnd.randint(min_words, max_words))) + rnd.choice(ENDINGS)
@@ -0,0 +1,49 @@
+import re
+
+def original_detect_tags(text):
+    """
+    detect_tags as it was written before the tag vocabulary moved to tag_vocabulary.json, kept as the parity reference.
+    """
+    body = text.lower()
+    tags = []
+
+    # Preprocessing: detect negations manually
+    is_not_easy = bool(re.search(r"not\s+(easy|light|bird course|straightforward)", body))
+    is_not_hard = bool(re.search(r"not\s+(hard|tough|difficult|challenging|brutal|intense)", body))
+
+    # Difficulty (easy)
+    if not is_not_easy and any(word in body for word in ["easy", "light", "bird course", "manageable", "straightforward"]):
+        tags.append("easy")
+
+    # Difficulty (hard)
+    if not is_not_hard and any(word in body for word in ["hard", "tough", "difficult", "challenging", "brutal", "intense"]):
+        tags.append("hard")
+
+    # Professor reviews
+    if any(word in body for word in ["professor", "lecturer", "teaching", "instructor", "teaches", "taught"]):
+        tags.append("professor_review")
+
+    # Course structure (exams, assignments, workload)
+    if any(word in body for word in ["exam", "midterm", "final", "assignment", "homework", "reading", "workload", "labs", "quizzes", "group project"]):
+        tags.append("course_structure")
+
+    # Tips and advice
+    if any(word in body for word in ["recommend", "tip", "advice", "suggest", "strategy", "resource", "how to study"]):
+        tags.append("tips")
+
+    return tags
+
+KEYWORDS = (
+    "easy light bird course manageable straightforward hard tough difficult challenging brutal intense "
+    "professor lecturer teaching instructor teaches taught exam midterm final assignment homework reading workload "
+    "labs quizzes group project recommend tip advice suggest strategy resource how to study"
+).split()
+FILLER = ["the", "a", "course", "prof", "was", "really", "and", "i", "it", "this", "to", "of", "not", "Not", "NOT",
+          "cannot", "knot", "nothing", "very", "lots", "\n", "\t", "", "bird\ncourse", "not\n\teasy", "NOT  Hard", "noteasy",
+          "not-easy", "EASY", "İ", "ß"]
+
+def random_comment(rnd, min_words, max_words, keyword_share):
+    """
+    Random comment mixing filler (including negations, odd whitespace and case) with tag keywords.
+    """
+    return " ".join(rnd.choice(KEYWORDS if rnd.random() < keyword_share else FILLER) for _ in range(rnd.randint(min_words, max_words)))
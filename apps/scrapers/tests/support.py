@@ -0,0 +1,29 @@
+import os
+import sys
+import importlib.util
+
+SCRAPERS_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+FIXTURES_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures")
+
+# The scrapers import their sibling modules directly, as when they run as python apps/scrapers/<name>.py
+if SCRAPERS_DIR not in sys.path:
+    sys.path.insert(0, SCRAPERS_DIR)
+
+def load_script(name):
+    """
+    Import a scraper script (e.g. course-scraper, whose file name is not a valid module name) as a module, once.
+    """
+    module_name = name.replace("-", "_")
+    if module_name not in sys.modules:
+        spec = importlib.util.spec_from_file_location(module_name, os.path.join(SCRAPERS_DIR, f"{name}.py"))
+        module = importlib.util.module_from_spec(spec)
+        sys.modules[module_name] = module
+        spec.loader.exec_module(module)
+    return sys.modules[module_name]
+
+def read_fixture(name):
+    """
+    Read a saved page from tests/fixtures, as bytes.
+    """
+    with open(os.path.join(FIXTURES_DIR, name), "rb") as f:
+        return f.read()
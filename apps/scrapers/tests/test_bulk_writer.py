@@ -0,0 +1,221 @@
+"""
+BulkWriter error classification, retries, adaptive batch size and failed batch replay.
+"""
+import os
+import json
+import time
+import threading
+from types import SimpleNamespace
+import httpx
+import pytest
+import requests
+from postgrest.exceptions import APIError
+import bulk_writer
+from bulk_writer import BulkWriter, BulkWriteError, is_retryable_error, get_status_code
+
+def http_error(status_code):
+    response = requests.Response()
+    response.status_code = status_code
+    return requests.HTTPError(f"{status_code} error", response=response)
+
+@pytest.mark.parametrize("error, retryable", [
+    # SQLSTATEs are not HTTP statuses, a bad batch fails the same way on every retry
+    (APIError({"code": "23505", "message": "duplicate key value violates unique constraint"}), False),
+    (APIError({"code": "42501", "message": "permission denied for table rag_chunks"}), False),
+    (APIError({"code": "22P02", "message": "invalid input syntax for type uuid"}), False),
+    (APIError({"code": "PGRST204", "message": "Could not find the column"}), False),
+    # Transient PostgREST/database failures
+    (APIError({"code": "PGRST000", "message": "Could not connect with the database"}), True),
+    (APIError({"code": "PGRST001", "message": "Database client error"}), True),
+    (APIError({"code": "PGRST003", "message": "Timed out acquiring connection from connection pool"}), True),
+    (APIError({"code": "57014", "message": "canceling statement due to statement timeout"}), True),
+    (APIError({"code": "40P01", "message": "deadlock detected"}), True),
+    # JSON error without a code, as answered by the API gateway (e.g. rate limiting)
+    (APIError({"message": "API rate limit exceeded"}), True),
+    # Non-JSON error body: postgrest stores the integer HTTP status as the code
+    (APIError({"code": 503, "message": "JSON could not be generated"}), True),
+    (APIError({"code": 429, "message": "JSON could not be generated"}), True),
+    (APIError({"code": 404, "message": "JSON could not be generated"}), False),
+    (http_error(500), True),
+    (http_error(429), True),
+    (http_error(404), False),
+    (httpx.HTTPStatusError("503", request=httpx.Request("POST", "http://test"), response=httpx.Response(503)), True),
+    (httpx.ConnectTimeout("timed out"), True),
+    (requests.ConnectionError("connection reset"), True),
+    (requests.Timeout("read timed out"), True),
+    (ValueError("bad row"), False),
+])
+def test_is_retryable_error(error, retryable):
+    assert is_retryable_error(error) is retryable
+
+def test_status_code_never_read_from_a_sqlstate():
+    assert get_status_code(APIError({"code": "23505"})) is None
+    assert get_status_code(APIError({"code": "50000"})) is None
+    assert get_status_code(http_error(502)) == 502
+
+class FakeTable:
+    """
+    Stand-in for a rag_chunks-like table written through BulkWriter.write_batch.
+    The first failures writes raise error; with stored_before_error they store the batch before raising,
+    like an insert whose response timed out.
+    """
+
+    def __init__(self, failures=0, error=None, stored_before_error=False, latency=0.0):
+        self.failures = failures
+        self.error = error or requests.ConnectionError("connection reset")
+        self.stored_before_error = stored_before_error
+        self.latency = latency
+        self.rows = []
+        self.batches = []
+        self.lock = threading.Lock()
+
+    def write_batch(self, batch):
+        if self.latency:
+            time.sleep(self.latency)
+        with self.lock:
+            self.batches.append(list(batch))
+            failed = self.failures > 0
+            self.failures -= failed
+            if failed and not self.stored_before_error:
+                raise self.error
+            self.rows.extend(batch)
+        if failed:
+            raise self.error
+
+    def unwritten_rows(self, batch):
+        with self.lock:
+            stored = {row["id"] for row in self.rows}
+        return [row for row in batch if row["id"] not in stored]
+
+def make_rows(count):
+    return [{"id": i, "text": f"comment {i}"} for i in range(count)]
+
+@pytest.fixture
+def sleeps(monkeypatch):
+    """
+    Record the backoff delays instead of sleeping.
+    """
+    delays = []
+    monkeypatch.setattr(bulk_writer, "time", SimpleNamespace(perf_counter=time.perf_counter, sleep=delays.append))
+    return delays
+
+def test_every_row_written_once_by_concurrent_writers(tmp_path):
+    table = FakeTable()
+    with BulkWriter("test", table.write_batch, batch_size=7, workers=4, failed_batches_dir=str(tmp_path)) as writer:
+        writer.add_many(make_rows(1000))
+
+    assert sorted(row["id"] for row in table.rows) == list(range(1000))
+    assert writer.stats["rows"] == 1000
+    assert not os.listdir(tmp_path)
+
+def test_retryable_errors_are_retried_with_backoff(tmp_path, sleeps):
+    table = FakeTable(failures=3, error=http_error(503))
+    writer = BulkWriter("test", table.write_batch, batch_size=10, backoff=0.5, failed_batches_dir=str(tmp_path))
+    writer.write(make_rows(10))
+
+    assert len(table.rows) == 10
+    assert writer.stats["retries"] == 3
+    # Exponential backoff with up to 100% jitter
+    assert [0.5 * 2 ** attempt <= delay <= 1.0 * 2 ** attempt for attempt, delay in enumerate(sleeps)] == [True] * 3
+
+def test_retry_after_is_honoured(tmp_path, sleeps):
+    error = http_error(429)
+    error.response.headers["Retry-After"] = "7"
+    table = FakeTable(failures=1, error=error)
+    BulkWriter("test", table.write_batch, failed_batches_dir=str(tmp_path)).write(make_rows(3))
+
+    assert sleeps == [7.0]
+    assert len(table.rows) == 3
+
+def test_non_retryable_error_is_saved_for_replay(tmp_path, sleeps):
+    table = FakeTable(failures=1, error=APIError({"code": "23505", "message": "duplicate key"}))
+    writer = BulkWriter("test", table.write_batch, batch_size=5, workers=1, failed_batches_dir=str(tmp_path))
+    writer.add_many(make_rows(5))
+    with pytest.raises(BulkWriteError):
+        writer.flush()
+    writer.close()
+
+    assert sleeps == []
+    assert len(table.batches) == 1
+    assert writer.stats["failed_batches"] == 1
+    with open(writer.failed_batches_path, encoding="utf-8") as f:
+        assert [json.loads(line) for line in f] == [make_rows(5)]
+
+    replay_writer = BulkWriter("test", table.write_batch, failed_batches_dir=str(tmp_path))
+    assert replay_writer.replay_failed_batches() == 5
+    assert table.rows == make_rows(5)
+    assert not os.path.exists(replay_writer.failed_batches_path)
+
+def test_batch_failing_again_on_replay_stays_in_the_file(tmp_path, sleeps):
+    failing = FakeTable(failures=100)
+    writer = BulkWriter("test", failing.write_batch, batch_size=4, min_batch_size=4, max_retries=1, failed_batches_dir=str(tmp_path))
+    writer.add_many(make_rows(8))
+    writer.close(raise_errors=False)
+    assert writer.stats["failed_batches"] == 2
+
+    assert BulkWriter("test", failing.write_batch, max_retries=0, failed_batches_dir=str(tmp_path)).replay_failed_batches() == 0
+    with open(writer.failed_batches_path, encoding="utf-8") as f:
+        assert sum(len(json.loads(line)) for line in f) == 8
+
+def test_close_raises_after_the_pool_is_stopped(tmp_path, sleeps):
+    table = FakeTable(failures=1, error=ValueError("bad row"))
+    writer = BulkWriter("test", table.write_batch, failed_batches_dir=str(tmp_path))
+    writer.add(make_rows(1)[0])
+    with pytest.raises(BulkWriteError):
+        writer.close()
+    with pytest.raises(RuntimeError):
+        writer.executor.submit(print)
+
+def test_retry_only_resends_unwritten_rows(tmp_path, sleeps):
+    # The first insert is stored but its response times out
+    table = FakeTable(failures=1, error=requests.Timeout("read timed out"), stored_before_error=True)
+    rows = make_rows(10)
+    writer = BulkWriter("test", table.write_batch, failed_batches_dir=str(tmp_path), unwritten_rows=table.unwritten_rows)
+    writer.write(rows)
+
+    assert table.rows == rows
+    # The retry found nothing left to send
+    assert table.batches == [rows]
+
+def test_replay_skips_rows_already_stored(tmp_path, sleeps):
+    failing = FakeTable(failures=100)
+    writer = BulkWriter("test", failing.write_batch, batch_size=10, max_retries=0, failed_batches_dir=str(tmp_path))
+    writer.add_many(make_rows(10))
+    writer.close(raise_errors=False)
+
+    # Half of the batch reached the table after all (e.g. written by a later run)
+    table = FakeTable()
+    table.rows = make_rows(5)
+    replay_writer = BulkWriter("test", table.write_batch, failed_batches_dir=str(tmp_path), unwritten_rows=table.unwritten_rows)
+    replay_writer.replay_failed_batches()
+
+    assert table.batches == [make_rows(10)[5:]]
+    assert sorted(row["id"] for row in table.rows) == list(range(10))
+
+def test_batch_size_grows_while_writes_are_fast(tmp_path):
+    table = FakeTable()
+    writer = BulkWriter("test", table.write_batch, batch_size=10, max_batch_size=200, workers=1, failed_batches_dir=str(tmp_path))
+    writer.add_many(make_rows(2000))
+    writer.close()
+
+    assert writer.batch_size == 200
+    assert max(len(batch) for batch in table.batches) == 200
+
+def test_batch_size_shrinks_on_slow_writes(tmp_path):
+    table = FakeTable(latency=0.02)
+    writer = BulkWriter("test", table.write_batch, batch_size=64, min_batch_size=4, target_latency=0.01, workers=1, failed_batches_dir=str(tmp_path))
+    writer.add_many(make_rows(200))
+    writer.close()
+
+    assert writer.batch_size == 4
+    assert sorted(row["id"] for row in table.rows) == list(range(200))
+
+def test_batch_size_shrinks_on_large_payloads_and_failures(tmp_path, sleeps):
+    table = FakeTable()
+    writer = BulkWriter("test", table.write_batch, batch_size=100, max_payload_bytes=500, failed_batches_dir=str(tmp_path))
+    writer.write(make_rows(100))
+    assert writer.batch_size == 50
+
+    table.failures = 1
+    writer.write(make_rows(10))
+    assert writer.batch_size == 25
@@ -0,0 +1,150 @@
+"""
+Calendar page cache against a local server that answers conditional requests with 304 Not Modified.
+"""
+import re
+import hashlib
+import threading
+import http.server
+import pytest
+from support import read_fixture
+
+CALENDAR_PAGE = read_fixture("calendar_page.html")
+
+class CalendarServer(http.server.ThreadingHTTPServer):
+    """
+    Serves pages from a dict of path -> body, with an ETag (md5 of the body) and/or a Last-Modified date.
+    Records the conditional headers of every request.
+    """
+
+    def __init__(self, pages, etag=True, last_modified="Mon, 01 Sep 2025 00:00:00 GMT"):
+        super().__init__(("127.0.0.1", 0), CalendarHandler)
+        self.pages = pages
+        self.etag = etag
+        self.last_modified = last_modified
+        self.requests = []
+
+    @property
+    def base_url(self):
+        return f"http://127.0.0.1:{self.server_address[1]}"
+
+class CalendarHandler(http.server.BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, *args):
+        pass
+
+    def do_GET(self):
+        server = self.server
+        body = server.pages.get(self.path)
+        if_none_match = self.headers.get("If-None-Match")
+        if_modified_since = self.headers.get("If-Modified-Since")
+        server.requests.append((self.path, if_none_match, if_modified_since))
+        if body is None:
+            self.send_response(404)
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+            return
+
+        headers = {}
+        if server.etag:
+            headers["ETag"] = '"' + hashlib.md5(body).hexdigest() + '"'
+        if server.last_modified:
+            headers["Last-Modified"] = server.last_modified
+
+        # If-None-Match takes precedence over If-Modified-Since (RFC 9110)
+        if if_none_match is not None:
+            not_modified = if_none_match == headers.get("ETag")
+        else:
+            not_modified = if_modified_since is not None and if_modified_since == server.last_modified
+        self.send_response(304 if not_modified else 200)
+        for name, value in headers.items():
+            self.send_header(name, value)
+        self.send_header("Content-Length", "0" if not_modified else str(len(body)))
+        self.end_headers()
+        if not not_modified:
+            self.wfile.write(body)
+
+@pytest.fixture
+def calendar_server():
+    servers = []
+
+    def start(pages, **kwargs):
+        server = CalendarServer(pages, **kwargs)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        servers.append(server)
+        return server
+
+    yield start
+    for server in servers:
+        server.shutdown()
+        server.server_close()
+
+def department_page(code):
+    return CALENDAR_PAGE.replace(b"CISC", code.encode())
+
+def scrape(course_scraper, monkeypatch, capsys, server, cache_dir, use_cache=True):
+    """
+    Run iter_courses over every page of the server, returns the courses and the cache counters printed at the end.
+    """
+    monkeypatch.setattr(course_scraper, "FACULTIES", [
+        {"name": "Test", "urls": [server.base_url + path for path in sorted(server.pages)], "skip_fields": ()},
+    ])
+    courses = list(course_scraper.iter_courses(max_workers=4, use_cache=use_cache, cache_dir=str(cache_dir)))
+    stats = re.search(r"Calendar cache: (\d+) hits, (\d+) misses, (\d+) bytes saved", capsys.readouterr().out)
+    return courses, tuple(map(int, stats.groups())) if stats else None
+
+def test_unchanged_pages_are_not_parsed_again(course_scraper, monkeypatch, capsys, calendar_server, tmp_path):
+    pages = {f"/calendar/{code.lower()}/": department_page(code) for code in ["CISC", "MATH", "STAT"]}
+    server = calendar_server(pages)
+
+    first_courses, first_stats = scrape(course_scraper, monkeypatch, capsys, server, tmp_path)
+    assert first_stats == (0, 3, 0)
+    assert len(first_courses) == 12
+    assert all(if_none_match is None for _, if_none_match, _ in server.requests)
+
+    # Nothing to parse on the second run, the cached courses are reused
+    server.requests.clear()
+    monkeypatch.setattr(course_scraper, "parse_course_page", lambda *args: pytest.fail("an unchanged page was parsed"))
+    second_courses, second_stats = scrape(course_scraper, monkeypatch, capsys, server, tmp_path)
+    assert second_courses == first_courses
+    assert second_stats == (3, 0, sum(len(body) for body in pages.values()))
+    assert all(if_none_match and if_modified_since for _, if_none_match, if_modified_since in server.requests)
+
+def test_changed_page_is_parsed_again(course_scraper, monkeypatch, capsys, calendar_server, tmp_path):
+    pages = {"/calendar/cisc/": department_page("CISC"), "/calendar/math/": department_page("MATH")}
+    server = calendar_server(pages)
+    scrape(course_scraper, monkeypatch, capsys, server, tmp_path)
+
+    pages["/calendar/math/"] = department_page("MTHE")
+    courses, stats = scrape(course_scraper, monkeypatch, capsys, server, tmp_path)
+    assert stats == (1, 1, len(pages["/calendar/cisc/"]))
+    assert [course["course_code"] for course in courses if not course["course_code"].startswith("CISC")] == \
+           ["MTHE 101", "MTHE\xa0121", "MTHE 124", "MTHE 204"]
+
+def test_last_modified_only(course_scraper, monkeypatch, capsys, calendar_server, tmp_path):
+    server = calendar_server({"/calendar/cisc/": department_page("CISC")}, etag=False)
+    scrape(course_scraper, monkeypatch, capsys, server, tmp_path)
+
+    server.requests.clear()
+    _, stats = scrape(course_scraper, monkeypatch, capsys, server, tmp_path)
+    assert stats[0] == 1
+    assert server.requests == [("/calendar/cisc/", None, server.last_modified)]
+
+def test_cache_disabled(course_scraper, monkeypatch, capsys, calendar_server, tmp_path):
+    server = calendar_server({"/calendar/cisc/": department_page("CISC")})
+    for _ in range(2):
+        courses, stats = scrape(course_scraper, monkeypatch, capsys, server, tmp_path, use_cache=False)
+        assert len(courses) == 4
+    assert stats is None
+    assert server.requests == [("/calendar/cisc/", None, None)] * 2
+    assert not any(tmp_path.iterdir())
+
+def test_removed_pages_are_dropped_from_the_cache(course_scraper, monkeypatch, capsys, calendar_server, tmp_path):
+    pages = {"/calendar/cisc/": department_page("CISC"), "/calendar/math/": department_page("MATH")}
+    server = calendar_server(pages)
+    scrape(course_scraper, monkeypatch, capsys, server, tmp_path)
+    assert len(list(tmp_path.iterdir())) == 2
+
+    del pages["/calendar/math/"]
+    scrape(course_scraper, monkeypatch, capsys, server, tmp_path)
+    assert [str(path) for path in tmp_path.iterdir()] == [course_scraper.cached_page_path(server.base_url + "/calendar/cisc/", str(tmp_path))]
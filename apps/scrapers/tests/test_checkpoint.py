@@ -0,0 +1,101 @@
+"""
+CheckpointJournal after a crash mid-write, and what an RMP run resumes from it.
+"""
+import json
+import pytest
+from checkpoint import CheckpointJournal
+
+PROFESSORS = [{"id": f"prof-{i}", "num_ratings_delta": i} for i in range(6)]
+
+def record_run(path, committed):
+    """
+    Journal a run that listed PROFESSORS, recorded them as its worklist and committed the given ones.
+    """
+    journal = CheckpointJournal(path)
+    journal.open(reset=True)
+    journal.append("listing", professors=PROFESSORS)
+    journal.append("worklist", professors=PROFESSORS)
+    for prof in committed:
+        journal.append("committed", id=prof["id"])
+    journal.close()
+    return journal
+
+def tear_last_line(path, keep):
+    """
+    Cut the last line of the file after keep bytes, as a process killed while writing it leaves it.
+    """
+    with open(path, "rb") as f:
+        data = f.read()
+    start = data.rstrip(b"\n").rfind(b"\n") + 1
+    with open(path, "wb") as f:
+        f.write(data[:start + keep])
+
+@pytest.fixture
+def path(tmp_path):
+    return str(tmp_path / "state" / "rmp_journal.jsonl")
+
+def test_load_recovers_entries_before_a_torn_line(path):
+    journal = record_run(path, PROFESSORS[:3])
+    tear_last_line(path, keep=10)
+
+    entries = journal.load()
+    assert [entry["type"] for entry in entries] == ["listing", "worklist", "committed", "committed"]
+    assert [entry["id"] for entry in entries[2:]] == ["prof-0", "prof-1"]
+
+def test_load_without_journal(path):
+    assert CheckpointJournal(path).load() == []
+
+def test_reopen_truncates_the_torn_line(path):
+    journal = record_run(path, PROFESSORS[:3])
+    tear_last_line(path, keep=10)
+
+    journal.open()
+    journal.append("committed", id="prof-2")
+    journal.close()
+
+    with open(path, encoding="utf-8") as f:
+        lines = f.read().splitlines()
+    # Every line parses, the torn entry is gone and the new one starts on its own line
+    assert [json.loads(line)["type"] for line in lines] == ["listing", "worklist", "committed", "committed", "committed"]
+    assert json.loads(lines[-1]) == {"type": "committed", "id": "prof-2"}
+
+def test_reset_starts_an_empty_journal(path):
+    journal = record_run(path, PROFESSORS[:3])
+    journal.open(reset=True)
+    journal.close()
+    assert journal.load() == []
+
+def test_remove(path):
+    journal = record_run(path, PROFESSORS)
+    journal.open()
+    journal.remove()
+    assert journal.load() == []
+    journal.remove()
+
+def test_resume_skips_committed_professors(path, rmp_scraper):
+    journal = record_run(path, PROFESSORS[:4])
+    tear_last_line(path, keep=5)
+
+    listing, worklist, committed_ids = rmp_scraper.read_journal(journal.load())
+    assert listing == PROFESSORS
+    assert worklist == PROFESSORS
+    # The torn entry was not committed durably, its professor is scraped again
+    assert committed_ids == {"prof-0", "prof-1", "prof-2"}
+    assert [prof["id"] for prof in worklist if prof["id"] not in committed_ids] == ["prof-3", "prof-4", "prof-5"]
+
+def test_resume_before_the_worklist(path, rmp_scraper):
+    journal = CheckpointJournal(path)
+    journal.open(reset=True)
+    journal.append("listing", professors=PROFESSORS)
+    journal.append("worklist", professors=PROFESSORS[:2])
+    journal.close()
+    tear_last_line(path, keep=20)
+
+    # The listing is reused, the worklist is computed again
+    listing, worklist, committed_ids = rmp_scraper.read_journal(journal.load())
+    assert listing == PROFESSORS
+    assert worklist is None
+    assert committed_ids == set()
+
+def test_no_journal_starts_from_scratch(rmp_scraper):
+    assert rmp_scraper.read_journal([]) == (None, None, set())
@@ -0,0 +1,108 @@
+"""
+CourseCodeIndex and CourseLabelCache must map RMP course labels like the original clean_and_map_course_codes.
+"""
+import random
+import pytest
+from course_codes import CourseCodeIndex, CourseLabelCache, normalize_label
+from reference_course_codes import original_map_course_codes, random_catalog, random_label
+
+VALID_COURSES = {"CISC 121", "CISC 124", "CISC 235", "MATH 121", "MATH 110", "COMM 151", "ANAT 100", "APSC 100", "MTHE 217"}
+
+# Labels of one professor, in the order they are mapped (pass 1 only derives courses from the departments seen so far)
+EDGE_CASES = [
+    # Exact courses, in any case and spacing
+    ["CISC 121", "cisc121", " Cisc 124 "],
+    # Bare numbers, resolved from the departments of the other labels
+    ["CISC121", "124"],
+    ["124", "CISC121"],
+    ["CISC", "235"],
+    # A number offered by two departments the professor teaches is ambiguous
+    ["CISC121", "MATH110", "121"],
+    ["MATH121", "121"],
+    # Several numbers glued after the department
+    ["CISC121124", "CISC235"],
+    ["CISC121/124"],
+    ["CISC-121", "CISC124"],
+    ["MATH121110"],
+    # Department prefixes and truncated labels
+    ["CIS121", "CISC124"],
+    ["C121", "C124"],
+    ["MTH217", "MTHE217"],
+    ["CISC12", "CISC 23"],
+    # Unknown labels
+    ["ALL"],
+    ["ANAT"],
+    ["XYZ999", "999"],
+    ["1234", "12"],
+    ["", " "],
+    ["CISC121A", "COMM151B"],
+    ["PHYS104", "104"],
+]
+
+@pytest.fixture(scope="module")
+def index():
+    return CourseCodeIndex(VALID_COURSES)
+
+@pytest.mark.parametrize("labels", EDGE_CASES)
+def test_edge_cases_match_original(index, labels):
+    assert index.map_course_codes(labels) == original_map_course_codes(labels, VALID_COURSES)
+
+def test_contextual_numbers():
+    index = CourseCodeIndex(VALID_COURSES)
+    assert index.map_course_codes(["CISC121", "124"]) == {"CISC121": ["CISC 121"], "124": ["CISC 124"]}
+    assert index.map_course_codes(["CISC121", "MATH110", "121"])["121"] is None
+    # Pass 1 only derives a course from the first 3 digits of a number, pass 2 then tries every 3-digit chunk
+    assert index.map_course_codes(["CISC121124"]) == {"CISC121124": ["CISC 121"]}
+    assert index.map_course_codes(["CISC121124", "CISC124"])["CISC121124"] is None
+    assert index.map_course_codes(["ALL", "ANAT", "999"]) == {"ALL": None, "ANAT": None, "999": None}
+
+def test_random_professors_match_original():
+    rnd = random.Random(16)
+    valid_courses = random_catalog(rnd, 3000)
+    valid_list = sorted(valid_courses)
+    index = CourseCodeIndex(valid_courses)
+    professors = [[random_label(rnd, valid_list) for _ in range(rnd.randint(1, 12))] for _ in range(1000)]
+    mismatches = [labels for labels in professors if index.map_course_codes(labels) != original_map_course_codes(labels, valid_courses)]
+    assert mismatches == []
+
+def test_index_behaves_like_the_course_set(index):
+    assert "CISC 121" in index
+    assert "CISC 999" not in index
+    assert len(index) == len(VALID_COURSES)
+    assert set(index) == VALID_COURSES
+
+def original_map_sorted_labels(labels, valid_courses):
+    """
+    The original mapping run over the normalized labels in sorted order, the order CourseLabelCache resolves them in.
+    """
+    mapping = original_map_course_codes(sorted({normalize_label(label) for label in labels}), valid_courses)
+    return {label: mapping[normalize_label(label)] for label in labels}
+
+def test_label_cache_matches_original(tmp_path):
+    rnd = random.Random(61)
+    valid_courses = random_catalog(rnd, 2000)
+    valid_list = sorted(valid_courses)
+    professors = [[random_label(rnd, valid_list) for _ in range(rnd.randint(1, 10))] for _ in range(300)]
+    path = str(tmp_path / "course_label_cache.json")
+
+    cache = CourseLabelCache(valid_courses, path)
+    for labels in professors:
+        assert cache.map_course_codes(labels) == original_map_sorted_labels(labels, valid_courses)
+    cache.save()
+
+    # A second run answers from the file
+    reloaded = CourseLabelCache(valid_courses, path)
+    for labels in professors:
+        assert reloaded.map_course_codes(labels) == original_map_sorted_labels(labels, valid_courses)
+    assert reloaded.stats["label_misses"] == 0
+    assert reloaded.stats["set_misses"] == 0
+
+def test_label_cache_is_dropped_when_the_catalog_changes(tmp_path, capsys):
+    path = str(tmp_path / "course_label_cache.json")
+    cache = CourseLabelCache(VALID_COURSES, path)
+    cache.map_course_codes(["CISC121", "124"])
+    cache.save()
+
+    changed = CourseLabelCache(VALID_COURSES | {"CISC 124A"}, path)
+    assert changed.labels == {} and changed.label_sets == {}
+    assert "Course catalog changed" in capsys.readouterr().out
@@ -0,0 +1,124 @@
+"""
+DriverPool health checks, recycling and crash handling, with fake drivers instead of Chrome.
+"""
+import pytest
+from selenium.common.exceptions import (
+    WebDriverException, InvalidSessionIdException, NoSuchElementException, TimeoutException,
+)
+import driver_pool
+from driver_pool import DriverPool, pooled_driver
+
+class FakeDriver:
+    """
+    Records the commands it receives. A dead driver raises on every command, like a crashed Chrome.
+    """
+
+    def __init__(self):
+        self.alive = True
+        self.cookies = 0
+        self.pages = []
+        self.quit_called = False
+
+    def check_alive(self):
+        if not self.alive:
+            raise WebDriverException("chrome not reachable")
+
+    def get(self, url):
+        self.check_alive()
+        self.pages.append(url)
+        if url != "about:blank":
+            self.cookies += 1
+
+    def execute_script(self, script, *args):
+        self.check_alive()
+        return 1
+
+    def delete_all_cookies(self):
+        self.check_alive()
+        self.cookies = 0
+
+    def execute_cdp_cmd(self, command, params):
+        self.check_alive()
+
+    def quit(self):
+        self.quit_called = True
+        self.alive = False
+
+@pytest.fixture
+def pool():
+    pool = DriverPool(size=1, max_pages=3, create_driver=FakeDriver)
+    yield pool
+    pool.close()
+
+def borrow(pool):
+    with pool.driver() as driver:
+        return driver
+
+def test_driver_is_reused_and_reset(pool):
+    with pool.driver() as first:
+        first.get("https://example.com/professor/1")
+    with pool.driver() as second:
+        assert second.cookies == 0
+
+    assert second is first
+    assert first.pages[-1] == "about:blank"
+    assert pool.stats == {"started": 1, "recycled": 0, "crashed": 0, "pages": 2}
+
+def test_driver_is_recycled_after_max_pages(pool):
+    drivers = [borrow(pool) for _ in range(4)]
+
+    assert drivers[0] is drivers[2] and drivers[3] is not drivers[0]
+    assert drivers[0].quit_called
+    assert pool.stats["recycled"] == 1
+    assert pool.stats["crashed"] == 0
+
+@pytest.mark.parametrize("error", [NoSuchElementException("no Show More button"), TimeoutException("wait timed out")])
+def test_page_level_errors_keep_the_driver(pool, error):
+    with pytest.raises(type(error)):
+        with pool.driver() as driver:
+            driver.get("https://example.com/professor/1")
+            raise error
+
+    assert borrow(pool) is driver
+    assert driver.cookies == 0
+    assert pool.stats["crashed"] == 0
+
+def test_lost_session_discards_the_driver(pool):
+    with pytest.raises(InvalidSessionIdException):
+        with pool.driver() as driver:
+            raise InvalidSessionIdException("invalid session id")
+
+    assert driver.quit_called
+    assert borrow(pool) is not driver
+    assert pool.stats["crashed"] == 1
+
+def test_webdriver_error_from_a_dead_browser_discards_the_driver(pool):
+    with pytest.raises(WebDriverException):
+        with pool.driver() as driver:
+            driver.alive = False
+            driver.get("https://example.com/professor/1")
+
+    assert borrow(pool) is not driver
+    assert pool.stats["crashed"] == 1
+
+def test_browser_dying_silently_is_restarted(pool):
+    with pool.driver() as driver:
+        driver.alive = False
+
+    assert borrow(pool) is not driver
+    assert pool.stats["crashed"] == 1
+    assert pool.stats["started"] == 2
+
+def test_unrelated_errors_propagate_and_keep_the_driver(pool):
+    with pytest.raises(ValueError):
+        with pool.driver() as driver:
+            raise ValueError("unparseable page")
+
+    assert borrow(pool) is driver
+    assert pool.stats["crashed"] == 0
+
+def test_one_off_driver_without_a_pool(monkeypatch):
+    monkeypatch.setattr(driver_pool, "create_chrome_driver", FakeDriver)
+    with pooled_driver(None) as driver:
+        driver.get("https://example.com")
+    assert driver.quit_called
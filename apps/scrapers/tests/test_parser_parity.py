@@ -0,0 +1,98 @@
+"""
+The calendar courseblock parser and the RMP review parser must extract the same records with every HTML_PARSER backend.
+"""
+import pytest
+from bs4 import BeautifulSoup
+from support import read_fixture
+
+PARSERS = ["html.parser", "lxml"]
+
+CALENDAR_PAGE = read_fixture("calendar_page.html")
+RMP_PAGE = read_fixture("rmp_professor_page.html")
+RMP_SUMMARY = {"overall_rating": 4.2, "percent_retake": 85.0, "level_of_difficulty": 3.1, "professor_tags": ["Caring", "Amazing lectures"]}
+
+def parse_calendar_page(course_scraper, monkeypatch, parser, skip_fields=()):
+    monkeypatch.setattr(course_scraper, "HTML_PARSER", parser)
+    return course_scraper.parse_course_page(CALENDAR_PAGE, skip_fields)
+
+def reference_courses(parser):
+    """
+    Courses extracted field by field with find(), as the scraper originally did with html.parser.
+    """
+    def text(course, tag_name, css_class, label=""):
+        element = course.find(tag_name, class_=css_class)
+        return element.get_text(strip=True).replace(label, "") if element else None
+
+    courses = []
+    for course in BeautifulSoup(CALENDAR_PAGE, parser).find_all("div", class_="courseblock"):
+        if course.find("span", class_="detail-code") is None:
+            continue
+        outcomes_section = course.find("span", class_="detail-cim_los")
+        courses.append({
+            "course_code": text(course, "span", "detail-code"),
+            "course_name": text(course, "span", "detail-title"),
+            "course_description": text(course, "div", "courseblockextra"),
+            "offering_faculty": text(course, "span", "detail-offering_faculty", "Offering Faculty: "),
+            "learning_hours": text(course, "span", "detail-learning_hours", "Learning Hours: "),
+            "course_learning_outcomes": [outcome.get_text(strip=True) for outcome in outcomes_section.find_all("li")] if outcomes_section else [],
+            "course_requirements": text(course, "span", "detail-requirements", "Requirements: "),
+            "course_equivalencies": text(course, "span", "detail-course_equivalencies", "Course Equivalencies: "),
+            "course_units": text(course, "span", "detail-hours_html", "Units: "),
+        })
+    return courses
+
+def rmp_review_blocks(parser):
+    return BeautifulSoup(RMP_PAGE, parser).select_one("ul#ratingsList").select("li")
+
+@pytest.mark.parametrize("parser", PARSERS)
+def test_courseblocks_match_reference(course_scraper, monkeypatch, parser):
+    assert parse_calendar_page(course_scraper, monkeypatch, parser) == reference_courses("html.parser")
+
+def test_courseblocks_identical_across_parsers(course_scraper, monkeypatch):
+    courses = {parser: parse_calendar_page(course_scraper, monkeypatch, parser) for parser in PARSERS}
+    assert courses["html.parser"] == courses["lxml"]
+
+    by_code = {course["course_code"]: course for course in courses["lxml"]}
+    # The courseblock without a course code is skipped
+    assert list(by_code) == ["CISC 101", "CISC\xa0121", "CISC 124", "CISC 204"]
+    assert by_code["CISC 101"]["course_learning_outcomes"] == ["Describe algorithms & data in plain language.", "Write and trace short programs in Python."]
+    assert by_code["CISC\xa0121"]["course_description"] == "Introduction to design, analysis, and implementation of algorithms.Recursion, sortingandsearching; a first look at <complexity>."
+    # Unclosed title paragraph, only the first outcome list counts
+    assert by_code["CISC 124"]["course_description"].startswith("Object-oriented design")
+    assert by_code["CISC 124"]["course_learning_outcomes"] == ["Design classes.", "Use inheritanceand interfaces.", ""]
+
+@pytest.mark.parametrize("parser", PARSERS)
+def test_courseblocks_skip_fields(course_scraper, monkeypatch, parser):
+    courses = parse_calendar_page(course_scraper, monkeypatch, parser, skip_fields=("learning_hours",))
+    assert all(course["learning_hours"] is None for course in courses)
+
+def test_rmp_reviews_identical_across_parsers(rmp_scraper):
+    reviews = {
+        parser: [rmp_scraper.parse_review_block(block, RMP_SUMMARY) for block in rmp_review_blocks(parser)]
+        for parser in PARSERS
+    }
+    assert reviews["html.parser"] == reviews["lxml"]
+    assert reviews["lxml"] == [
+        {"date": "2024-01-01", "course": "CISC121", "quality": 5.0, "difficulty": 2.0,
+         "comment": "Great prof & clear lectures.Exams were fair <3", "tags": ["Caring", "Clear grading criteria"]},
+        None,  # ad
+        {"date": "2023-03-22", "course": "CISC 124", "quality": 2.0, "difficulty": 3.1,
+         "comment": "No difficulty shown on this card, the professor's level of difficulty is used. Café — “quotes”.", "tags": []},
+        {"date": "2022-11-13", "course": "CISC204", "quality": 4.2, "difficulty": 4.0,
+         "comment": "Tough grader.Lots of homework", "tags": ["Tough grader", "Lots of homework", "Test heavy"]},
+        None,  # unreadable date
+    ]
+
+@pytest.mark.parametrize("parser", PARSERS)
+def test_rmp_review_cards_parsed_alone_match_full_page(rmp_scraper, monkeypatch, parser):
+    # Cards appended by "Load More Ratings" are read one by one from their outerHTML (fetch_new_review_blocks)
+    blocks = rmp_review_blocks(parser)
+    monkeypatch.setattr(rmp_scraper, "HTML_PARSER", parser)
+
+    class Driver:
+        def execute_script(self, script, start):
+            return [str(block) for block in blocks[start:]]
+
+    cards = rmp_scraper.fetch_new_review_blocks(Driver(), 0)
+    assert [rmp_scraper.parse_review_block(card, RMP_SUMMARY) for card in cards] == \
+           [rmp_scraper.parse_review_block(block, RMP_SUMMARY) for block in blocks]
@@ -0,0 +1,154 @@
+"""
+GraphQL professor listing against a local stand-in that replays recorded search responses.
+"""
+import json
+import base64
+import threading
+import http.server
+import pytest
+from support import read_fixture
+from scheduler import TokenBucket
+
+RECORDING = json.loads(read_fixture("rmp_teacher_search.json"))
+PAGE_SIZE = 3
+
+class RecordedGraphQLServer(http.server.ThreadingHTTPServer):
+    """
+    Answers each TeacherSearchPaginationQuery with the recorded response of the same (count, cursor) variables,
+    and 400 for any request that was not recorded. Fails the first failures requests with a 503.
+    """
+
+    def __init__(self, responses, failures=0):
+        super().__init__(("127.0.0.1", 0), RecordedGraphQLHandler)
+        self.responses = {(record["variables"]["count"], record["variables"]["cursor"]): record["response"] for record in responses}
+        self.failures = failures
+        self.requests = []
+        self.lock = threading.Lock()
+
+    @property
+    def url(self):
+        return f"http://127.0.0.1:{self.server_address[1]}/graphql"
+
+class RecordedGraphQLHandler(http.server.BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, *args):
+        pass
+
+    def do_POST(self):
+        server = self.server
+        body = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+        variables = body["variables"]
+        with server.lock:
+            server.requests.append((self.headers.get("Authorization"), variables))
+            failed = server.failures > 0
+            server.failures -= failed
+
+        response = server.responses.get((variables["count"], variables["cursor"]))
+        if failed:
+            self.send(503, b"")
+        elif RECORDING["query"] not in body["query"] or variables["query"]["schoolID"] != RECORDING["schoolID"] or response is None:
+            self.send(400, b'{"errors": [{"message": "not recorded"}]}')
+        else:
+            self.send(200, json.dumps(response).encode())
+
+    def send(self, status, body):
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+@pytest.fixture
+def graphql_server(rmp_scraper, monkeypatch):
+    servers = []
+
+    def start(responses=RECORDING["responses"], failures=0):
+        server = RecordedGraphQLServer(responses, failures)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        servers.append(server)
+        monkeypatch.setattr(rmp_scraper, "GRAPHQL_URL", server.url)
+        return server
+
+    # No request budget against the stand-in
+    monkeypatch.setattr(rmp_scraper, "RATE_LIMITER", TokenBucket(1000))
+    yield start
+    for server in servers:
+        server.shutdown()
+        server.server_close()
+
+def listed_ids(professors):
+    return [prof["id"] for prof in professors]
+
+@pytest.mark.parametrize("workers", [1, 4])
+def test_lists_every_professor_in_order(rmp_scraper, graphql_server, workers):
+    server = graphql_server()
+    professors = rmp_scraper.scrape_professors_graphql(testing=False, workers=workers, page_size=PAGE_SIZE)
+
+    # The professor listed on two pages (the listing shifted between requests) is kept once
+    assert listed_ids(professors) == ["2113551", "1789211", "2554890", "2890004", "1035227", "2671243", "3012874"]
+    assert len(server.requests) == 3
+    assert all(authorization == rmp_scraper.GRAPHQL_HEADERS["Authorization"] for authorization, _ in server.requests)
+
+def test_professor_dict_shape(rmp_scraper, graphql_server):
+    graphql_server()
+    professors = {prof["id"]: prof for prof in rmp_scraper.scrape_professors_graphql(testing=False, page_size=PAGE_SIZE)}
+
+    assert professors["2554890"] == {
+        "id": "2554890",
+        "name": "Nora Quist",
+        "department": "Computer Science",
+        "school": "Queen's University at Kingston",
+        "overall_rating": "3.2",
+        "num_ratings": 9,
+        "url": f"{rmp_scraper.RMP_BASE_URL}/professor/2554890",
+    }
+    # No ratings yet
+    assert professors["2890004"]["overall_rating"] == "N/A"
+    assert professors["3012874"]["overall_rating"] == f"{3.95:.1f}"
+
+def test_testing_mode_reads_the_first_page_only(rmp_scraper, graphql_server):
+    server = graphql_server()
+    professors = rmp_scraper.scrape_professors_graphql(testing=True, page_size=PAGE_SIZE)
+
+    assert listed_ids(professors) == ["2113551", "1789211", "2554890"]
+    assert [variables["cursor"] for _, variables in server.requests] == [None]
+
+def test_follows_cursors_past_the_first_result_count(rmp_scraper, graphql_server):
+    # Professors added while paging: the last recorded page now has a next page, reached through its endCursor
+    responses = json.loads(json.dumps(RECORDING["responses"]))
+    last_teachers = responses[-1]["response"]["data"]["search"]["teachers"]
+    last_teachers["pageInfo"]["hasNextPage"] = True
+    added_node = dict(last_teachers["edges"][-1]["node"], legacyId=3100001, firstName="Added")
+    end_cursor = base64.b64encode(b"arrayconnection:8").decode()
+    responses.append({
+        "variables": {"count": PAGE_SIZE, "cursor": last_teachers["pageInfo"]["endCursor"]},
+        "response": {"data": {"search": {"teachers": {
+            "edges": [{"cursor": end_cursor, "node": added_node}],
+            "pageInfo": {"hasNextPage": False, "endCursor": end_cursor},
+            "resultCount": 9,
+        }}}},
+    })
+    graphql_server(responses)
+
+    professors = rmp_scraper.scrape_professors_graphql(testing=False, page_size=PAGE_SIZE)
+    assert listed_ids(professors)[-2:] == ["3012874", "3100001"]
+
+def test_server_errors_are_retried(rmp_scraper, graphql_server):
+    server = graphql_server(failures=2)
+    professors = rmp_scraper.scrape_professors_graphql(testing=False, workers=1, page_size=PAGE_SIZE)
+
+    assert len(professors) == 7
+    assert len(server.requests) == 5
+
+@pytest.mark.parametrize("reply", [
+    {"errors": [{"message": "Cannot query field \"teachers\" on type \"Search\""}], "data": None},
+    {"data": None},
+    "<html>Service unavailable</html>",
+])
+def test_unexpected_replies_raise(rmp_scraper, graphql_server, reply):
+    responses = [{"variables": {"count": PAGE_SIZE, "cursor": None}, "response": reply}]
+    graphql_server(responses)
+
+    with pytest.raises(rmp_scraper.RmpApiError):
+        rmp_scraper.scrape_professors_graphql(testing=True, page_size=PAGE_SIZE)
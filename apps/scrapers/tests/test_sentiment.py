@@ -0,0 +1,62 @@
+"""
+SentimentService must score texts like the original detect_sentiment, TextBlob(text).sentiment.polarity.
+"""
+import random
+import pytest
+from sentiment import SentimentService, detect_sentiment
+from analysis_cache import AnalysisCache
+from reference_sentiment import original_detect_sentiment, random_review
+
+CORPUS = [
+    "",
+    " ",
+    "Great prof!",
+    "Great prof!!!",
+    "Not a great prof.",
+    "Very very good lectures, very clear.",
+    "The worst course I have ever taken. Avoid.",
+    "Terrible exams but an amazing, caring professor :)",
+    "not bad",
+    "It was okay I guess",
+    "GREAT COURSE, HARD FINAL",
+    "Hard but fair. Would take again!",
+    "Boring lectures :( unclear slides",
+    "10/10 would recommend",
+    "Café lectures, naïve grading, très bien",
+    "The midterm was extremely difficult and the assignments were really long.",
+    "Best prof at Queen's\n\nShe is helpful, funny and really knows the material.",
+    "?!",
+    "😀 loved it",
+]
+
+def random_corpus(count, seed=18):
+    rnd = random.Random(seed)
+    return CORPUS + [random_review(rnd) for _ in range(count)]
+
+@pytest.mark.parametrize("text", CORPUS)
+def test_detect_sentiment_matches_textblob(text):
+    assert detect_sentiment(text) == original_detect_sentiment(text)
+
+@pytest.mark.parametrize("workers", [0, 2])
+def test_score_matches_textblob(workers):
+    texts = random_corpus(1000)
+    with SentimentService(workers=workers, batch_size=64) as service:
+        assert service.score(texts) == [original_detect_sentiment(text) for text in texts]
+
+def test_submit_returns_the_scores_in_order():
+    texts = random_corpus(200, seed=81)
+    with SentimentService(workers=1) as service:
+        futures = [service.submit(texts[i:i + 50]) for i in range(0, len(texts), 50)]
+        scores = [score for future in futures for score in future.result()]
+    assert scores == [original_detect_sentiment(text) for text in texts]
+
+def test_cached_scores_match_textblob():
+    texts = random_corpus(300, seed=7)
+    cache = AnalysisCache(":memory:")
+    with SentimentService(workers=0, cache=cache) as service:
+        first = service.score(texts[:200])
+        # Half of the texts come from the cache, half are scored
+        second = service.score(texts[100:])
+    assert first + second[100:] == [original_detect_sentiment(text) for text in texts]
+    assert second[:100] == first[100:]
+    assert cache.stats["hits"] == 100
@@ -0,0 +1,62 @@
+"""
+TagMatcher must return the same tags as the original hand-written detect_tags.
+"""
+import json
+import random
+import pytest
+from tags import detect_tags, load_tag_vocabulary, TagMatcher
+from reference_tags import original_detect_tags, random_comment
+
+EDGE_CASES = [
+    "",
+    "easy",
+    "EASY A",
+    "not easy",
+    "not  easy but hard",
+    "not\nbird course",
+    "not bird\ncourse, easy",
+    "bird  course",
+    "bird course",
+    "cannot easy",
+    "knot light",
+    "noteasy",
+    "not-easy",
+    "NOT TOUGH",
+    "not easy, not hard, great professor",
+    "Easy? not",
+    "manageable but not easy",
+    "not straightforward, still manageable",
+    "nothard hard",
+    "finals",
+    "tips",
+    "How To Study for the midterm",
+    "group  project",
+    "recommend this lecturer, exams are brutal",
+    "İstanbul ß highlights",
+    "The prof teaches well, not intense at all",
+]
+
+@pytest.mark.parametrize("text", EDGE_CASES)
+def test_edge_cases_match_original(text):
+    assert detect_tags(text) == original_detect_tags(text)
+
+def test_random_comments_match_original():
+    rnd = random.Random(20)
+    comments = [random_comment(rnd, 0, 80, 0.2) for _ in range(20000)]
+    mismatches = [text for text in comments if detect_tags(text) != original_detect_tags(text)]
+    assert mismatches == []
+
+def test_tag_order_follows_vocabulary():
+    assert detect_tags("Easy course but hard exams, the professor gave tips") == ["easy", "hard", "professor_review", "course_structure", "tips"]
+
+def test_vocabulary_is_data(tmp_path):
+    path = tmp_path / "vocabulary.json"
+    path.write_text(json.dumps({"tags": [
+        {"tag": "online", "keywords": ["online", "remote"], "negated": ["online"]},
+        {"tag": "curve", "keywords": ["curved", "bell curve"]},
+    ]}))
+    matcher = TagMatcher(load_tag_vocabulary(str(path)))
+
+    assert matcher.match("Remote lectures, exam was curved") == ["online", "curve"]
+    assert matcher.match("not online this year") == []
+    assert matcher.match("Easy professor") == []
@@ -0,0 +1,106 @@
+"""
+UrlIndex synced from a local SQLite sink: keyset resume, deduplicated sorted hashes and the index file.
+"""
+import pytest
+from storage import SQLiteSink
+from url_index import UrlIndex, url_hash
+
+def post_url(i):
+    return f"https://www.reddit.com/r/queensuniversity/comments/{i:07x}/post_{i}/"
+
+def chunks(urls, source="reddit"):
+    return [{"text": f"comment on {url}", "source": source, "source_url": url} for url in urls]
+
+class RecordingSink:
+    """
+    Wraps a sink and records the after_id of every get_chunks_after request.
+    """
+
+    def __init__(self, sink):
+        self.sink = sink
+        self.after_ids = []
+
+    def get_chunks_after(self, columns, after_id, limit=1000, **filters):
+        self.after_ids.append(after_id)
+        return self.sink.get_chunks_after(columns, after_id, limit, **filters)
+
+@pytest.fixture
+def sink(tmp_path):
+    return SQLiteSink(str(tmp_path / "coursify.db"))
+
+def assert_sorted_unique(index):
+    assert all(a < b for a, b in zip(index.hashes, index.hashes[1:]))
+
+def test_sync_deduplicates_urls(sink, tmp_path):
+    # Every post has several comments, each stored as a row with the post url
+    urls = [post_url(i % 25) for i in range(100)]
+    sink.insert_rag_chunks(chunks(urls) + chunks([None, ""]))
+    index = UrlIndex(str(tmp_path / "index.bin"))
+
+    assert index.sync(sink, page_size=7) == 102
+    assert len(index) == 25
+    assert_sorted_unique(index)
+    assert all(post_url(i) in index for i in range(25))
+    assert post_url(25) not in index
+
+def test_sync_only_reads_its_source(sink, tmp_path):
+    sink.insert_rag_chunks(chunks([post_url(1)]) + chunks(["https://www.ratemyprofessors.com/professor/1"], source="ratemyprofessors"))
+    index = UrlIndex(str(tmp_path / "index.bin"))
+
+    assert index.sync(sink) == 1
+    assert post_url(1) in index
+    assert "https://www.ratemyprofessors.com/professor/1" not in index
+
+def test_sync_resumes_after_the_last_id(sink, tmp_path):
+    path = str(tmp_path / "index.bin")
+    sink.insert_rag_chunks(chunks(post_url(i) for i in range(10)))
+    index = UrlIndex(path)
+    index.sync(sink, page_size=4)
+    index.save()
+    first_last_id = index.last_id
+
+    # New rows, some of them for urls already indexed, interleaved with another source
+    sink.insert_rag_chunks(chunks(["https://www.ratemyprofessors.com/professor/2"], source="ratemyprofessors"))
+    sink.insert_rag_chunks(chunks([post_url(3), post_url(10), post_url(11)]))
+
+    reloaded = UrlIndex(path)
+    assert reloaded.last_id == first_last_id
+    recording = RecordingSink(sink)
+    assert reloaded.sync(recording, page_size=2) == 3
+    # Keyset pages: from the saved id, then from the last id of each page, until an empty page
+    assert recording.after_ids[0] == first_last_id
+    assert recording.after_ids == sorted(set(recording.after_ids))
+    assert len(recording.after_ids) == 3
+    assert len(reloaded) == 12
+    assert_sorted_unique(reloaded)
+
+    # Nothing new, a single empty page is read
+    recording.after_ids.clear()
+    assert reloaded.sync(recording) == 0
+    assert recording.after_ids == [reloaded.last_id]
+
+def test_save_and_load(sink, tmp_path):
+    path = str(tmp_path / "state" / "index.bin")
+    sink.insert_rag_chunks(chunks(post_url(i) for i in range(50)))
+    index = UrlIndex(path)
+    index.sync(sink)
+    index.save()
+
+    reloaded = UrlIndex(path)
+    assert reloaded.hashes == index.hashes
+    assert reloaded.last_id == index.last_id
+
+def test_unreadable_file_rebuilds(tmp_path, capsys):
+    path = tmp_path / "index.bin"
+    path.write_bytes(b"not an index file, longer than the header")
+    index = UrlIndex(str(path))
+    assert len(index) == 0 and index.last_id == 0
+    assert "Unreadable url index" in capsys.readouterr().out
+
+def test_add_many_merges_duplicates(tmp_path):
+    index = UrlIndex(str(tmp_path / "index.bin"))
+    index.add_many([post_url(2), post_url(1), post_url(2)])
+    index.add_many([post_url(1), post_url(3)])
+    assert len(index) == 3
+    assert_sorted_unique(index)
+    assert list(index.hashes) == sorted(url_hash(post_url(i)) for i in (1, 2, 3))
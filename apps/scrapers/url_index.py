@@ -0,0 +1,102 @@
+import os
+import sys
+import struct
+import hashlib
+from array import array
+from bisect import bisect_left
+from heapq import merge
+from itertools import groupby
+
+STATE_DIR = os.getenv("SCRAPER_STATE_DIR", ".scraper_state")
+URL_INDEX_PATH = os.getenv("REDDIT_URL_INDEX_PATH", os.path.join(STATE_DIR, "reddit_url_index.bin"))
+# Number of rag_chunks rows read per request when syncing the index
+URL_INDEX_PAGE_SIZE = int(os.getenv("REDDIT_URL_INDEX_PAGE_SIZE", "1000"))
+
+# File layout: magic, id of the last row synced (little-endian int64), then the sorted hashes (little-endian uint64)
+URL_INDEX_MAGIC = b"URLIDX1\n"
+URL_INDEX_HEADER = struct.Struct("<8sq")
+
+def url_hash(url):
+    """
+    64-bit hash of a url. Two of a million urls collide with a probability of about 3e-8.
+    """
+    return int.from_bytes(hashlib.blake2b(url.encode("utf-8"), digest_size=8).digest(), "little")
+
+class UrlIndex:
+    """
+    Set of the source urls already stored in rag_chunks, kept as a sorted array of 64-bit url hashes
+    (8 bytes per url) in a file under .scraper_state, so a run only reads the rows added since the last one.
+
+    sync() reads the new rows by increasing id (keyset pagination) and remembers the last id.
+    Delete the file to rebuild the index from the whole table (e.g. after rows were deleted).
+    """
+
+    def __init__(self, path=URL_INDEX_PATH):
+        self.path = path
+        self.hashes = array("Q")
+        self.last_id = 0
+        try:
+            with open(path, "rb") as f:
+                data = f.read()
+            magic, last_id = URL_INDEX_HEADER.unpack_from(data)
+            if magic == URL_INDEX_MAGIC and (len(data) - URL_INDEX_HEADER.size) % 8 == 0:
+                self.hashes.frombytes(data[URL_INDEX_HEADER.size:])
+                if sys.byteorder != "little":
+                    self.hashes.byteswap()
+                self.last_id = last_id
+            else:
+                print("Unreadable url index, rebuilding it")
+        except (FileNotFoundError, struct.error):
+            pass
+
+    def __contains__(self, url):
+        url_key = url_hash(url)
+        i = bisect_left(self.hashes, url_key)
+        return i < len(self.hashes) and self.hashes[i] == url_key
+
+    def __len__(self):
+        return len(self.hashes)
+
+    def add_many(self, urls):
+        """
+        Add urls, merging their sorted hashes into the array (duplicates are dropped by the merge).
+        """
+        self._merge(array("Q", (url_hash(url) for url in urls)))
+
+    def sync(self, sink, source="reddit", page_size=URL_INDEX_PAGE_SIZE):
+        """
+        Add the urls of the rows of source stored since the last sync. Returns the number of rows read.
+        """
+        # Several rows (comments) share a url, only the hashes are kept until the merge
+        new_hashes = array("Q")
+        rows_read = 0
+        while True:
+            rows = sink.get_chunks_after(["source_url"], self.last_id, limit=page_size, source=source)
+            if not rows:
+                break
+            new_hashes.extend(url_hash(row["source_url"]) for row in rows if row["source_url"])
+            rows_read += len(rows)
+            self.last_id = rows[-1]["id"]
+
+        self._merge(new_hashes)
+        return rows_read
+
+    def _merge(self, new_hashes):
+        # Merge unsorted hashes into the sorted array, dropping duplicates
+        new_hashes = sorted(new_hashes)
+        if new_hashes:
+            self.hashes = array("Q", (url_key for url_key, _ in groupby(merge(self.hashes, new_hashes))))
+
+    def save(self):
+        """
+        Write the index file (atomically, through a temporary file).
+        """
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        hashes = array("Q", self.hashes)
+        if sys.byteorder != "little":
+            hashes.byteswap()
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, "wb") as f:
+            f.write(URL_INDEX_HEADER.pack(URL_INDEX_MAGIC, self.last_id))
+            f.write(hashes.tobytes())
+        os.replace(tmp_path, self.path)
@@ -0,0 +1,61 @@
+import os
+import time
+import threading
+from selenium.webdriver.support.ui import WebDriverWait
+from selenium.common.exceptions import TimeoutException
+
+# Longest wait for a page change (new cards, a menu opening), in seconds
+WAIT_TIMEOUT = float(os.getenv("SELENIUM_WAIT_TIMEOUT", "10"))
+# Interval between two checks of a wait condition, in seconds
+WAIT_POLL_INTERVAL = float(os.getenv("SELENIUM_WAIT_POLL_INTERVAL", "0.1"))
+
+class WaitMetrics:
+    """
+    Thread-safe record of how long each kind of Selenium wait actually waited, and how often it timed out.
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.stats = {}
+
+    def record(self, name, seconds, timed_out):
+        with self.lock:
+            stats = self.stats.setdefault(name, {"waits": 0, "seconds": 0.0, "max_seconds": 0.0, "timeouts": 0})
+            stats["waits"] += 1
+            stats["seconds"] += seconds
+            stats["max_seconds"] = max(stats["max_seconds"], seconds)
+            stats["timeouts"] += timed_out
+
+    def print_stats(self):
+        with self.lock:
+            for name, stats in sorted(self.stats.items()):
+                print(f"Wait '{name}': {stats['waits']} waits, {stats['seconds']:.1f}s total, "
+                      f"{stats['seconds'] / stats['waits']:.2f}s mean, {stats['max_seconds']:.2f}s max, {stats['timeouts']} timeouts")
+
+WAIT_METRICS = WaitMetrics()
+
+def wait_for(driver, name, condition, timeout=WAIT_TIMEOUT, required=False):
+    """
+    Wait until condition(driver) returns a truthy value, checking every WAIT_POLL_INTERVAL seconds.
+    Returns that value, or None after timeout seconds (TimeoutException is raised instead if required is True).
+    The time spent is recorded in WAIT_METRICS under name.
+    """
+    started = time.monotonic()
+    try:
+        result = WebDriverWait(driver, timeout, poll_frequency=WAIT_POLL_INTERVAL).until(condition)
+    except TimeoutException:
+        WAIT_METRICS.record(name, time.monotonic() - started, True)
+        if required:
+            raise
+        return None
+    WAIT_METRICS.record(name, time.monotonic() - started, False)
+    return result
+
+def element_count_above(locator, count):
+    """
+    Wait condition: more than count elements match locator. Returns the list of matching elements.
+    """
+    def condition(driver):
+        elements = driver.find_elements(*locator)
+        return elements if len(elements) > count else False
+    return condition